@@ -0,0 +1,309 @@
+# cSpell: disable
+# pylint: disable=all
+# ruff: noqa
+
+"""
+Benchmark reproducible del pipeline sin webcam ni modelo
+
+Reproduce un clip fijo (video o carpeta de imágenes) con detecciones
+grabadas (backend "recorded") a través de process_frame, draw_annotations,
+MQTTSender (contra un broker local) y ServoFileManager. Reporta frames/s,
+latencia por etapa (p50/p95/p99) y asignaciones de memoria (tracemalloc),
+y compara contra un baseline guardado.
+
+Generar un clip sintético con sus detecciones:
+    python benchmark.py --make-clip bench_clip
+Medir y guardar el baseline:
+    python benchmark.py --source bench_clip --detections bench_clip/detections.json --save-baseline baseline.json
+Medir y comparar la mediana de --repeats pasadas (sale con código 1 si hay regresiones):
+    python benchmark.py --source bench_clip --detections bench_clip/detections.json --baseline baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from camera_handler import CameraHandler
+from config import CAMERA_CONFIG, DETECTOR_CONFIG
+from detector_backends import RecordedBackend
+from face_tracker import FaceTracker
+from local_broker import LocalBroker
+from mqtt_sender import MQTTSender
+from servo_file_manager import ServoFileManager
+
+COMPARED_STAGES = ("capture", "infer", "postprocess", "annotate", "publish", "file_write", "loop")
+MIN_DELTA_MS = 0.05  # Diferencias menores se consideran ruido
+# p95: un bucket del histograma ya es ~12% y la cola varía más entre pasadas
+TAIL_TOLERANCE = 0.25
+TAIL_MIN_DELTA_MS = 0.25
+
+
+def make_clip(directory, frames=120, width=None, height=None):
+    """Clip sintético: dos caras (rectángulos) moviéndose y sus detecciones"""
+    width = width or CAMERA_CONFIG["width"]
+    height = height or CAMERA_CONFIG["height"]
+    os.makedirs(directory, exist_ok=True)
+
+    recorded = []
+    for i in range(frames):
+        frame = np.full((height, width, 3), 40, dtype=np.uint8)
+        phase = 2 * np.pi * i / frames
+        rows = []
+        for class_id, (color, offset) in enumerate((((255, 0, 0), 0.0), ((0, 255, 0), np.pi))):
+            cx = int(width / 2 + width / 3 * np.sin(phase + offset))
+            cy = int(height / 2 + height / 5 * np.cos(phase * 2 + offset))
+            x1, y1, x2, y2 = cx - 40, cy - 50, cx + 40, cy + 50
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, -1)
+            # Detecciones en coordenadas de la imagen de inferencia (escala 0.5)
+            rows.append([x1 / 2, y1 / 2, x2 / 2, y2 / 2, 0.9 - 0.1 * class_id, class_id])
+        # Cada 10 frames nadie a la vista
+        recorded.append(rows if i % 10 != 9 else [])
+        cv2.imwrite(os.path.join(directory, f"frame_{i:05d}.png"), frame)
+
+    path = os.path.join(directory, "detections.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"class_names": ["tuta", "laura"], "frames": recorded}, f)
+    return path
+
+
+class BenchmarkRun:
+    """Pipeline completo armado contra el clip, detecciones y broker locales"""
+
+    def __init__(self, source, detections, target="tuta"):
+        config = dict(DETECTOR_CONFIG, backend="recorded", recorded_path=detections)
+        self.detector = RecordedBackend(config)
+        self.camera = CameraHandler(source, loop=True)
+        self.tracker = FaceTracker(load_model=True, detector=self.detector)
+        self.tracker.set_target_person(target)
+
+        self.broker = LocalBroker().start()
+        self.mqtt = MQTTSender(broker="127.0.0.1", port=self.broker.port, topic="benchmark/servo")
+        self._tmp = tempfile.TemporaryDirectory()
+        self.file_manager = ServoFileManager(os.path.join(self._tmp.name, "servo_position.json"))
+
+    def start(self):
+        if not self.camera.start():
+            raise RuntimeError(f"No se pudo abrir {self.camera.source}")
+        if not self.mqtt.connect():
+            raise RuntimeError("No se pudo conectar al broker local")
+
+    def rewind(self):
+        self.camera.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        self.detector.rewind()
+        self.tracker.reset()
+
+    def run(self, frames):
+        """Procesar frames; el clip vuelve al inicio si es más corto"""
+        tracker = self.tracker
+        stats = tracker.stats
+        pooled = None
+        for frame_count in range(frames):
+            loop_start = stats.now()
+            if pooled is not None:
+                pooled.release()
+            pooled = self.camera.read_pooled()
+            if pooled is None:
+                raise RuntimeError("No se pudo leer el clip")
+            frame = pooled.array
+            stats.lap("capture", loop_start)
+
+            result = tracker.process_frame(frame, frame_count)
+
+            t = stats.now()
+            tracker.draw_annotations(frame, result, 30.0)
+            t = stats.lap("annotate", t)
+            self.mqtt.send_tracking_result(result, tracker.target_person)
+            t = stats.lap("publish", t)
+            self.file_manager.update_from_tracking(result, tracker.target_person)
+            stats.lap("file_write", t)
+            stats.lap("loop", loop_start)
+        if pooled is not None:
+            pooled.release()
+
+    def close(self):
+        self.camera.stop()
+        self.mqtt.close()
+        self.broker.stop()
+        self._tmp.cleanup()
+
+
+def _median_stages(summaries):
+    """Mediana de cada métrica de cada etapa entre repeticiones"""
+    stages = {}
+    for stage in summaries[0]:
+        runs = [s[stage] for s in summaries if stage in s]
+        stages[stage] = {key: statistics.median(r[key] for r in runs) for key in runs[0]}
+    return stages
+
+
+def run_benchmark(source, detections, frames=300, warmup=30, target="tuta", top_allocations=0, repeats=5):
+    """Medir throughput/latencias (mediana de repeats pasadas) y, aparte, asignaciones"""
+    bench = BenchmarkRun(source, detections, target)
+    bench.start()
+    try:
+        # Calentamiento (cachés del overlay, pools de buffers, conexión)
+        bench.run(warmup)
+
+        sent_before = bench.mqtt.message_count
+        elapsed_runs, summaries = [], []
+        for _ in range(repeats):
+            bench.tracker.stats.reset()
+            bench.rewind()
+            start = time.perf_counter()
+            bench.run(frames)
+            elapsed_runs.append(time.perf_counter() - start)
+            summaries.append(bench.tracker.stats.summary())
+        elapsed = statistics.median(elapsed_runs)
+        sent = bench.mqtt.message_count - sent_before
+        delivered = bench.broker.wait_for(bench.mqtt.message_count)
+        stages = _median_stages(summaries)
+
+        # Pasada de asignaciones (tracemalloc distorsiona los tiempos)
+        bench.rewind()
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        base_current, _ = tracemalloc.get_traced_memory()
+        bench.run(frames)
+        current, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+        diff = after.compare_to(before, "lineno")
+        net_blocks = sum(d.count_diff for d in diff)
+        top = [
+            {"site": str(d.traceback), "kb": d.size_diff / 1024, "blocks": d.count_diff}
+            for d in diff[:top_allocations]
+        ]
+    finally:
+        bench.close()
+
+    return {
+        "source": str(source),
+        "frames": frames,
+        "repeats": repeats,
+        "elapsed_s": elapsed,
+        "fps": frames / elapsed if elapsed else 0.0,
+        "mqtt": {"sent": sent, "delivered": delivered},
+        "stages": stages,
+        "allocations": {
+            "peak_kb": (peak - base_current) / 1024,
+            "net_kb": (current - base_current) / 1024,
+            "net_blocks": net_blocks,
+            "top": top,
+        },
+        "platform": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+        },
+    }
+
+
+def compare_reports(report, baseline, tolerance=0.10):
+    """Lista de (métrica, baseline, actual, regresión?)"""
+    rows = []
+    base_fps = baseline.get("fps", 0.0)
+    rows.append(("fps", base_fps, report["fps"], report["fps"] < base_fps * (1 - tolerance)))
+
+    for stage in COMPARED_STAGES:
+        old = baseline.get("stages", {}).get(stage)
+        new = report["stages"].get(stage)
+        if not old or not new:
+            continue
+        for key, key_tolerance, min_delta in (
+            ("p50_ms", tolerance, MIN_DELTA_MS),
+            ("p95_ms", max(tolerance, TAIL_TOLERANCE), TAIL_MIN_DELTA_MS),
+        ):
+            limit = max(old[key] * (1 + key_tolerance), old[key] + min_delta)
+            rows.append((f"{stage}.{key}", old[key], new[key], new[key] > limit))
+
+    old_peak = baseline.get("allocations", {}).get("peak_kb")
+    if old_peak is not None:
+        new_peak = report["allocations"]["peak_kb"]
+        rows.append(
+            ("alloc.peak_kb", old_peak, new_peak, new_peak > max(old_peak * (1 + tolerance), old_peak + 64))
+        )
+    return rows
+
+
+def print_report(report):
+    print("\n" + "=" * 60)
+    print(f"⏱️  BENCHMARK: {report['source']} ({report['frames']} frames x {report.get('repeats', 1)}, mediana)")
+    print("=" * 60)
+    print(f"  {report['fps']:.1f} frames/s | MQTT {report['mqtt']['sent']} msgs "
+          f"({'entregados' if report['mqtt']['delivered'] else 'NO entregados'})")
+    print(f"  {'etapa':<12} {'p50':>8} {'p95':>8} {'p99':>8} {'media':>8}  (ms)")
+    for stage, s in report["stages"].items():
+        print(f"  {stage:<12} {s['p50_ms']:>8.3f} {s['p95_ms']:>8.3f} {s['p99_ms']:>8.3f} {s['mean_ms']:>8.3f}")
+    alloc = report["allocations"]
+    print(f"  Memoria: pico {alloc['peak_kb']:.1f} KB | neto {alloc['net_kb']:.1f} KB "
+          f"({alloc['net_blocks']} bloques)")
+    for site in alloc["top"]:
+        print(f"    {site['kb']:>8.1f} KB {site['blocks']:>6} bloques  {site['site']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark reproducible del pipeline")
+    parser.add_argument("--source", help="Video o carpeta de imágenes")
+    parser.add_argument("--detections", help="JSON de detecciones grabadas")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=30)
+    parser.add_argument("--repeats", type=int, default=5, help="Pasadas medidas (se compara la mediana)")
+    parser.add_argument("--target", default="tuta")
+    parser.add_argument("--make-clip", metavar="CARPETA", help="Generar clip sintético y salir")
+    parser.add_argument("--output", help="Guardar el reporte en JSON")
+    parser.add_argument("--baseline", help="Comparar contra este reporte")
+    parser.add_argument("--save-baseline", metavar="ARCHIVO", help="Guardar el reporte como baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Regresión tolerada (0.10 = 10%%)")
+    parser.add_argument("--top", type=int, default=0, help="Mostrar los N sitios que más asignan")
+    args = parser.parse_args(argv)
+
+    if args.make_clip:
+        path = make_clip(args.make_clip, args.frames)
+        print(f"✅ Clip en {args.make_clip} | detecciones en {path}")
+        return 0
+
+    if not args.source or not args.detections:
+        parser.error("--source y --detections son obligatorios")
+
+    report = run_benchmark(
+        args.source, args.detections, args.frames, args.warmup, args.target, args.top, args.repeats
+    )
+    print_report(report)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            print(f"💾 Reporte guardado en {path}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows = compare_reports(report, baseline, args.tolerance)
+        regressions = [r for r in rows if r[3]]
+        print(f"\n📏 Comparación con {args.baseline} (tolerancia {args.tolerance:.0%})")
+        for name, old, new, bad in rows:
+            change = (new - old) / old * 100 if old else 0.0
+            print(f"  {'❌' if bad else '✅'} {name:<22} {old:>10.3f} -> {new:>10.3f} ({change:+.1f}%)")
+        if regressions:
+            print(f"\n❌ {len(regressions)} regresiones")
+            return 1
+        print("\n✅ Sin regresiones")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
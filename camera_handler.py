@@ -2,19 +2,83 @@
 # pylint: disable=all
 # ruff: noqa
 
+import os
+
 import cv2
 from config import CAMERA_CONFIG
+from frame_pool import FramePool
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class ImageDirectoryCapture:
+    """Carpeta de imágenes con la interfaz mínima de cv2.VideoCapture"""
+
+    def __init__(self, path):
+        self.files = sorted(
+            os.path.join(path, name)
+            for name in os.listdir(path)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        self.position = 0
+
+    def isOpened(self):
+        return bool(self.files)
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            self.position = int(value)
+        return False
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(len(self.files))
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.position)
+        return 0.0
+
+    def read(self, image=None):
+        if self.position >= len(self.files):
+            return False, None
+        frame = cv2.imread(self.files[self.position])
+        self.position += 1
+        if frame is None:
+            return False, None
+        if image is not None and image.shape == frame.shape:
+            image[...] = frame
+            return True, image
+        return True, frame
+
+    def release(self):
+        self.files = []
 
 
 class CameraHandler:
-    def __init__(self):
+    def __init__(self, source=None, loop=False):
+        # source: índice de cámara (por defecto el de CAMERA_CONFIG), archivo
+        # de video o carpeta de imágenes. loop=True vuelve al inicio al
+        # terminar un archivo/carpeta (clips fijos para benchmarks).
+        self.source = CAMERA_CONFIG["index"] if source is None else source
+        if isinstance(self.source, str) and self.source.isdigit():
+            self.source = int(self.source)
+        self.loop = loop
         self.cap = None
         self.is_running = False
+        self.finished = False  # El archivo/carpeta se terminó (sin loop)
+        self.pool = None  # Buffers reutilizados por read_pooled()
+        self.frames_failed = 0  # Lecturas fallidas (métricas)
+
+    @property
+    def is_file(self):
+        return not isinstance(self.source, int)
 
     def start(self):
         """Iniciar captura de cámara"""
         try:
-            self.cap = cv2.VideoCapture(CAMERA_CONFIG["index"])
+            if self.is_file:
+                return self._start_file()
+
+            self.cap = cv2.VideoCapture(self.source)
 
             # Configurar resolución
             self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, CAMERA_CONFIG["width"])
@@ -35,13 +99,72 @@ class CameraHandler:
             print(f"❌ Error iniciando cámara: {e}")
             return False
 
+    def _start_file(self):
+        """Video o carpeta de imágenes: se lee a la resolución del archivo"""
+        if os.path.isdir(self.source):
+            self.cap = ImageDirectoryCapture(self.source)
+        else:
+            self.cap = cv2.VideoCapture(self.source)
+
+        if not self.cap.isOpened():
+            print(f"❌ No se pudo abrir {self.source}")
+            return False
+
+        self.is_running = True
+        self.finished = False
+        frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        print(f"✅ Fuente de archivo: {self.source} ({frames} frames)")
+        return True
+
+    def _read_into(self, image=None):
+        """Leer un frame; con archivos, al final vuelve al inicio o marca finished"""
+        ret, frame = self.cap.read(image=image) if image is not None else self.cap.read()
+        if not ret and self.is_file:
+            if not self.loop:
+                self.finished = True
+                return False, None
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read(image=image) if image is not None else self.cap.read()
+        return ret, frame
+
     def read(self):
         """Leer frame de la cámara"""
         if not self.is_running or self.cap is None:
             return None
 
-        ret, frame = self.cap.read()
-        return frame if ret else None
+        ret, frame = self._read_into()
+        if not ret:
+            self.frames_failed += not self.finished
+            return None
+        return frame
+
+    def read_pooled(self, pool_size=4):
+        """Leer frame dentro de un buffer del pool (sin asignar memoria)
+
+        Retorna un PooledFrame (usar .array y luego release()) o None.
+        """
+        if not self.is_running or self.cap is None:
+            return None
+
+        if self.pool is None:
+            shape = (CAMERA_CONFIG["height"], CAMERA_CONFIG["width"], 3)
+            self.pool = FramePool(shape, pool_size)
+
+        pooled = self.pool.acquire()
+        ret, frame = self._read_into(pooled.array)
+        if not ret:
+            pooled.release()
+            self.frames_failed += not self.finished
+            return None
+
+        if frame is not pooled.array:
+            # La cámara entrega otra resolución: rehacer el pool con esa forma
+            pooled.release()
+            self.pool = FramePool(frame.shape, pool_size)
+            pooled = self.pool.acquire()
+            pooled.array[...] = frame
+
+        return pooled
 
     def stop(self):
         """Detener cámara"""
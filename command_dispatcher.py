@@ -0,0 +1,244 @@
+# cSpell: disable
+# pylint: disable=all
+# ruff: noqa
+
+"""
+Reparto de comandos de servos a varios destinos (MQTT, serial, archivo...)
+
+Cada frame se arma un único ServoCommand inmutable y se entrega a todos los
+destinos registrados. Cada destino (CommandSink) tiene su propio hilo y su
+cola: el loop solo encola y sigue, aunque un destino sea lento o falle.
+Cada destino tiene su codificador (comando -> lo que envía; None = nada
+que enviar) y su límite de tasa. Con límite, los comandos que llegan
+mientras espera se reemplazan por el más nuevo (destinos de estado
+absoluto). Sin límite se entregan todos en orden.
+
+Agregar un actuador nuevo es registrar otro CommandSink: no suma
+latencia al loop.
+"""
+
+import threading
+import time
+from collections import deque, namedtuple
+
+from config import DISPATCH_CONFIG
+
+# kind: "track" (resultado de un frame), "center" o "stop" (controles)
+ServoCommand = namedtuple(
+    "ServoCommand",
+    (
+        "kind",
+        "frame",
+        "time",  # Reloj del tracker (s)
+        "locked",
+        "pan_direction",
+        "pan_duration",
+        "pan_velocity",  # °/s en modo plan (None con pulsos)
+        "pan",  # Rumbo estimado (°, derecha +)
+        "tilt",
+        "seq",
+        "target",
+        "confidence",
+        "error",  # (x, y) px
+        "distance",
+    ),
+)
+
+
+def command_from_result(result, target=None, frame=None):
+    """ServoCommand de un resultado de FaceTracker.process_detections"""
+    face = result["target_face"]
+    return ServoCommand(
+        kind="track",
+        frame=frame,
+        time=result["time"],
+        locked=bool(result["target_locked"]),
+        pan_direction=result["pan_direction"],
+        pan_duration=float(result["pan_duration"]),
+        pan_velocity=result.get("pan_velocity"),
+        pan=float(result.get("pan", 0.0)),
+        tilt=float(result["tilt_angle"]),
+        seq=result.get("seq"),
+        target=target,
+        confidence=float(face["confidence"]) if face else 0.0,
+        error=(int(result["error"][0]), int(result["error"][1])),
+        distance=float(result.get("distance_to_center", 0)),
+    )
+
+
+def control_command(kind, tilt, pan=0.0, now=None):
+    """Comando de control: "center" (pan quieto, tilt a tilt) o "stop" (mantener tilt)"""
+    return ServoCommand(
+        kind=kind,
+        frame=None,
+        time=time.monotonic() if now is None else now,
+        locked=False,
+        pan_direction="stop",
+        pan_duration=0.0,
+        pan_velocity=None,
+        pan=float(pan),
+        tilt=float(tilt),
+        seq=None,
+        target=None,
+        confidence=0.0,
+        error=(0, 0),
+        distance=0.0,
+    )
+
+
+class CommandSink:
+    """Un destino con su hilo, cola, codificador, límite de tasa y contadores"""
+
+    def __init__(self, name, deliver, encoder=None, rate=0.0, queue_size=16):
+        self.name = name
+        self.deliver = deliver  # payload -> False si falló, None si no envió nada
+        self.encoder = encoder  # ServoCommand -> payload (None = no enviar)
+        self.min_interval = 1.0 / rate if rate else 0.0
+        self.queue_size = queue_size  # None: nunca descarta (cola sin límite)
+
+        # Contadores (solo los escribe el hilo del destino, salvo submitted/dropped)
+        self.submitted = 0
+        self.delivered = 0
+        self.failed = 0
+        self.skipped = 0  # Nada que enviar (codificador o destino sin cambios)
+        self.dropped = 0  # Cola llena sin límite de tasa: se descartó el más viejo
+        self.coalesced = 0  # Reemplazados por uno más nuevo (límite de tasa)
+        self.busy_ns = 0  # Tiempo total entregando
+        self.last_error = None
+        self.started = None
+
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._next_time = 0.0
+        self._thread = None
+        self.running = False
+
+    def start(self):
+        self.running = True
+        self.started = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name=f"sink-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def submit(self, command):
+        """Encolar (desde el loop): no bloquea por I/O"""
+        with self._cond:
+            if self.queue_size is not None and len(self._queue) >= self.queue_size:
+                self._queue.popleft()
+                if self.min_interval:
+                    self.coalesced += 1  # Igual se iba a reemplazar por el más nuevo
+                else:
+                    self.dropped += 1
+            self._queue.append(command)
+            self.submitted += 1
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and self.running:
+                    self._cond.wait()
+                if not self._queue:
+                    return  # Detenido y sin pendientes
+                command = self._queue.popleft()
+
+            if self.min_interval:
+                wait = self._next_time - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                with self._cond:
+                    if self._queue:  # Llegaron más nuevos mientras esperaba
+                        self.coalesced += len(self._queue)
+                        command = self._queue[-1]
+                        self._queue.clear()
+                self._next_time = time.monotonic() + self.min_interval
+
+            self._deliver(command)
+
+    def _deliver(self, command):
+        start = time.perf_counter_ns()
+        try:
+            payload = self.encoder(command) if self.encoder else command
+            sent = None if payload is None else self.deliver(payload)
+            if sent is False:
+                self.failed += 1
+            elif sent is None:
+                self.skipped += 1
+            else:
+                self.delivered += 1
+        except Exception as e:
+            self.failed += 1
+            self.last_error = str(e)
+        self.busy_ns += time.perf_counter_ns() - start
+
+    def stop(self, timeout=1.0):
+        """Entregar lo pendiente y terminar el hilo"""
+        with self._cond:
+            self.running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self):
+        elapsed = time.monotonic() - self.started if self.started else 0.0
+        done = self.delivered + self.failed
+        return {
+            "sink": self.name,
+            "submitted": self.submitted,
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "pending": len(self._queue),
+            "per_s": self.delivered / elapsed if elapsed else 0.0,
+            "mean_ms": self.busy_ns / done / 1e6 if done else 0.0,
+            "last_error": self.last_error,
+        }
+
+
+class CommandDispatcher:
+    """Un comando por frame, repartido a todos los destinos"""
+
+    def __init__(self):
+        self.sinks = []
+        self.dispatched = 0
+
+    def add(self, name, deliver, encoder=None, rate=None, queue_size=None, config=DISPATCH_CONFIG):
+        """Registrar y arrancar un destino (tasa y cola por defecto de DISPATCH_CONFIG)"""
+        defaults = config.get(name, config["default"])
+        sink = CommandSink(
+            name,
+            deliver,
+            encoder,
+            defaults["rate"] if rate is None else rate,
+            defaults["queue_size"] if queue_size is None else queue_size,
+        )
+        if sink.queue_size is None and sink.min_interval:
+            raise ValueError(f"Destino {name}: una cola sin límite no puede tener límite de tasa")
+        self.sinks.append(sink.start())
+        return sink
+
+    def send(self, command):
+        for sink in self.sinks:
+            sink.submit(command)
+        self.dispatched += 1
+        return command
+
+    def dispatch(self, result, target=None, frame=None):
+        """Comando del resultado de un frame, a todos los destinos"""
+        return self.send(command_from_result(result, target, frame))
+
+    def stats(self):
+        return [sink.stats() for sink in self.sinks]
+
+    def summary_line(self):
+        return " | ".join(
+            f"{s['sink']} {s['delivered']}✓ {s['failed']}✗ {s['per_s']:.1f}/s {s['mean_ms']:.2f}ms"
+            for s in self.stats()
+        )
+
+    def close(self, timeout=1.0):
+        """Entregar lo pendiente (p.ej. el último center) y detener los hilos"""
+        for sink in self.sinks:
+            sink.stop(timeout)
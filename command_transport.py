@@ -0,0 +1,148 @@
+# cSpell: disable
+# pylint: disable=all
+# ruff: noqa
+
+"""
+Transportes de comandos PC -> ESP32 (los usa MQTTSender por detrás)
+
+"mqtt": a través del broker (broker.hivemq.com): funciona desde cualquier
+red, pero cada comando hace la ida y vuelta por internet.
+"udp": datagramas directos al ESP32 en la misma LAN. Cada datagrama lleva
+delante del JSON una sesión (al azar en cada arranque del proceso) y un
+número de secuencia propio (4 + 4 bytes big-endian). El firmware descarta
+los que llegan repetidos o fuera de orden dentro de la sesión, empieza de
+cero cuando la sesión cambia (PC reiniciado) y responde el ack al puerto
+de origen.
+
+Todos tienen la misma interfaz: connect(listener) -> bool,
+publish(topic, payload), close() y sent. listener recibe
+_set_connected(bool) y _on_ack(payload).
+"""
+
+import random
+import socket
+import struct
+import threading
+
+from config import TRANSPORT_CONFIG
+
+UDP_HEADER = struct.Struct(">II")  # Sesión del emisor, secuencia del datagrama
+
+
+class MQTTTransport:
+    name = "mqtt"
+
+    def __init__(self, broker, port, topic):
+        self.broker = broker
+        self.port = port
+        self.ack_topic = topic + "/ack"  # El ESP32 confirma cada comando con su rumbo
+        self.client = None
+        self.listener = None
+        self.sent = 0
+        self._connected_event = threading.Event()
+
+    def connect(self, listener):
+        import paho.mqtt.client as mqtt
+
+        self.listener = listener
+        self.client = mqtt.Client()
+        self.client.on_connect = self._on_connect
+        self.client.on_disconnect = self._on_disconnect
+        self.client.on_message = self._on_message
+
+        self.client.connect(self.broker, self.port, 60)
+        self.client.loop_start()
+
+        # Esperar conexión (retorna apenas llega el CONNACK)
+        return self._connected_event.wait(timeout=5)
+
+    def _on_connect(self, client, userdata, flags, rc):
+        """Callback de conexión"""
+        if rc == 0:
+            client.subscribe(self.ack_topic)
+            self.listener._set_connected(True)
+            self._connected_event.set()
+        else:
+            self.listener._set_connected(False)
+            print(f"Error MQTT: código {rc}")
+
+    def _on_disconnect(self, client, userdata, rc):
+        """Callback de desconexión"""
+        self.listener._set_connected(False)
+        self._connected_event.clear()
+        if rc != 0:
+            print("MQTT desconectado inesperadamente")
+
+    def _on_message(self, client, userdata, msg):
+        self.listener._on_ack(msg.payload)
+
+    def publish(self, topic, payload):
+        self.client.publish(topic, payload)
+        self.sent += 1
+
+    def close(self):
+        if self.client:
+            self.client.loop_stop()
+            self.client.disconnect()
+
+
+class UDPTransport:
+    name = "udp"
+
+    def __init__(self, host, port):
+        self.address = (host, port)
+        self.sock = None
+        self.listener = None
+        self.session = random.getrandbits(32)  # El firmware reinicia la secuencia al cambiar
+        self.seq = 0  # Secuencia del último datagrama
+        self.sent = 0
+        self.running = False
+
+    def connect(self, listener):
+        """Sin conexión que establecer: socket local y un hilo para los acks"""
+        self.listener = listener
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("0.0.0.0", 0))  # Puerto efímero: el ESP32 responde a este
+        self.sock.settimeout(0.5)
+        self.running = True
+        threading.Thread(target=self._ack_loop, daemon=True).start()
+        listener._set_connected(True)
+        return True
+
+    def _ack_loop(self):
+        while self.running:
+            try:
+                data, _ = self.sock.recvfrom(2048)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self.listener._on_ack(data)
+
+    def publish(self, topic, payload):
+        """El topic no se usa: el destino es el ESP32 configurado"""
+        self.seq = (self.seq + 1) & 0xFFFFFFFF
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        self.sock.sendto(UDP_HEADER.pack(self.session, self.seq) + payload, self.address)
+        self.sent += 1
+
+    def close(self):
+        self.running = False
+        if self.sock:
+            self.sock.close()
+        if self.listener:
+            self.listener._set_connected(False)
+
+
+TRANSPORTS = ("mqtt", "udp")
+
+
+def get_transport(name=None, broker=None, port=None, topic=None, config=TRANSPORT_CONFIG):
+    """Crear un transporte por nombre (sin conectarlo)"""
+    name = name or config["transport"]
+    if name == "mqtt":
+        return MQTTTransport(broker, port, topic)
+    if name == "udp":
+        return UDPTransport(config["udp_host"], config["udp_port"])
+    raise ValueError(f"Transporte desconocido: {name} (opciones: {', '.join(TRANSPORTS)})")
@@ -2,7 +2,14 @@
 # pylint: disable=all
 # ruff: noqa
 
-CAMERA_CONFIG = {"index": 0, "width": 640, "height": 480, "fps": 30}
+CAMERA_CONFIG = {
+    "index": 0,
+    "width": 640,
+    "height": 480,
+    "fps": 30,
+    "hfov": 62.0,  # ° de campo de visión horizontal (webcam típica)
+    "vfov": 48.0,  # ° vertical: pasa el error en píxeles a grados de tilt
+}
 
 ESP32_CONFIG = {
     "port": "COM7",
@@ -14,7 +21,7 @@ SERVO_CONFIG = {
     "pan_center": 90,
     "tilt_center": 90,
     "pan_range": (0, 180),
-    "tilt_range": (30, 150),
+    "tilt_range": (60, 160),  # Límites del servo 180 (igual que set_tilt del firmware)
     "max_speed": 8,  # Aumentado para movimiento más rápido
 }
 
@@ -29,23 +36,196 @@ TRACKING_CONFIG = {
     "detection_interval": 1,  # Detectar en cada frame para mejor fluidez
     "smoothing_factor": 0.5,  # Aumentado para movimiento más suave
     "target_person": None,
+    # Cola de prioridad: se sigue a la persona visible de mayor prioridad
+    "target_queue": [],  # p.ej. ["tuta", "laura"] (si está vacía: solo target_person)
+    "switch_hysteresis": 0.5,  # s que alguien de más prioridad debe verse antes de cambiar
+    "dwell_time": 2.0,  # s que se espera al objetivo perdido antes de pasar al siguiente
     "debug_mode": True,
     "frame_skip": 1,  # Procesar cada frame (1 = sin saltos)
 }
 
 PID_CONFIG = {
     "pan": {"kp": 0.20, "ki": 0.015, "kd": 0.12},  # Aumentado para respuesta más rápida
-    "tilt": {"kp": 0.20, "ki": 0.015, "kd": 0.12},
+    # Tilt en grados: fracción del error angular corregida por frame (gimbal_sim.py)
+    "tilt": {"kp": 0.35, "ki": 0.0, "kd": 0.02},
+    # Modo plan: error angular del pan (°) -> velocidad (°/s) que mantiene el firmware
+    "pan_velocity": {"kp": 3.0, "ki": 0.0, "kd": 0.1},
+}
+
+# Pulsos de pan y pasos de tilt a partir de la salida del PID
+PULSE_CONFIG = {
+    "pan_seconds_per_unit": 0.004,  # s de pulso por unidad de salida del PID
+    # El servo de rotación continua gira más rápido a la derecha: misma
+    # corrección en grados con pulsos más cortos (antes 0.15 s / 0.08 s fijos)
+    "pan_gain": {"left": 1.0, "right": 0.55},
+    "pan_min_duration": 0.03,  # s (pulsos más cortos no mueven el servo)
+    "pan_max_duration": 0.25,
+    "pan_duration_step": 0.06,  # Cambio máximo de duración entre comandos seguidos
+    # El PID de tilt trabaja en grados (error vertical pasado por el vfov)
+    "tilt_max_rate": 60.0,  # °/s
+    "center_jump_px": 120,  # Salto de error que inicia la medición de tiempo a centro
+}
+
+# Rumbo estimado del pan (pan_heading.py): se integra cada pulso con la
+# velocidad de su dirección. Calibrar con: python pan_heading.py --direction left
+PAN_HEADING_CONFIG = {
+    "rate": {"left": 60.0, "right": 110.0},  # °/s (igual que pan_rate_* del firmware)
+    "max_pending": 64,  # Comandos sin ack que se recuerdan
+}
+
+# Planes de movimiento para el firmware no bloqueante (esp32/main.py): una
+# velocidad de pan y una trayectoria corta de tilt que el ESP32 interpola a
+# ritmo de servo. Solo se envía un plan nuevo cuando cambia.
+PLAN_CONFIG = {
+    "command_mode": "plan",  # "plan" | "pulse" (un pulso bloqueante por frame, firmware anterior)
+    "velocity_step": 4.0,  # °/s: la velocidad se cuantiza (cambios menores no se envían)
+    "max_accel": 300.0,  # °/s² de cambio de velocidad del pan entre frames
+    "tilt_tolerance": 0.5,  # °: cambios de tilt menores no se envían
+    "tilt_ms": 60,  # ms en que el firmware lleva el tilt al ángulo pedido (~ un frame)
+    "hold_ms": 500,  # El firmware detiene el pan si no llega otro plan en este tiempo
+    "keepalive": 0.25,  # s: en movimiento se reenvía el plan antes de hold_ms
 }
 
-DEADZONE = {"x": 15, "y": 15}  # Reducido para mejor centrado
+# Búsqueda del objetivo perdido (target_search.py)
+SEARCH_CONFIG = {
+    "grace_time": 0.5,  # s quieto tras perderlo (suele reaparecer solo)
+    "velocity_lookahead": 0.5,  # s que se adelanta el último rumbo según su velocidad
+    "velocity_smoothing": 0.5,  # Suavizado exponencial de la velocidad
+    "sweep_step": 35.0,  # ° por parada del barrido (menos que el hfov: vistas solapadas)
+    "sweep_width": 90.0,  # ° a cada lado del último rumbo
+    "max_sweeps": 2,  # Barridos completos antes de rendirse
+    "arrive_tolerance": 3.0,  # ° (lo que gira el pulso mínimo)
+    "min_pulse": 0.03,  # s
+    "max_pulse": 0.25,  # s
+    "command_latency": 0.08,  # s de PC -> ESP32
+    "frame_latency": 0.07,  # s captura -> detección mientras no haya mediciones
+}
+
+# Zona muerta del centro (deadzone.py): escala con el alto del rostro objetivo
+DEADZONE = {
+    "x": 120,  # px a cada lado con un rostro de reference_height de alto
+    "y": 80,
+    "reference_height": 100,  # px de alto del bbox
+    # Rostros lejanos: zona más chica. Con planes de velocidad el pan no oscila
+    # (gimbal_sim.py); con pulsos bloqueantes (command_mode "pulse") usar 1.0
+    "min_scale": 0.7,
+    "max_scale": 1.6,  # Rostros cercanos: zona más grande (menos micro-pulsos)
+    "smoothing": 0.3,  # Suavizado del alto del bbox
+    "release_ratio": 0.9,  # Histéresis: se corrige hasta entrar a x/y * ratio
+}
+
+# Transporte de comandos al ESP32 (command_transport.py); se elige con --transport
+TRANSPORT_CONFIG = {
+    "transport": "mqtt",  # "mqtt" (broker público) | "udp" (directo por la LAN)
+    "udp_host": "192.168.1.50",  # IP del ESP32 (la imprime al conectarse al WiFi)
+    "udp_port": 4210,  # Igual que UDP_PORT del firmware
+}
+
+# Destinos de los comandos de servos (command_dispatcher.py): cada uno con
+# su hilo. rate en comandos/s (0 = sin límite, todos en orden)
+DISPATCH_CONFIG = {
+    # Sin descartes: pan_heading ya integró cada pulso/plan por su seq, y uno
+    # perdido desviaría la estimación (MQTTSender ya filtra los sin cambios)
+    "mqtt": {"rate": 0, "queue_size": None},
+    "serial": {"rate": 20, "queue_size": 4},  # ESP32 por USB (protocolo CSV anterior)
+    "file": {"rate": 10, "queue_size": 4},  # servo_position.json
+    "default": {"rate": 0, "queue_size": 16},
+}
 
 # Archivo JSON para compartir datos con ESP32
 SERVO_DATA_FILE = "servo_position.json"
 
-# Colores para cada persona (BGR)
-PERSON_COLORS = {
-    "tuta": (255, 0, 0),  # Azul
-    "laura": (0, 255, 0),  # Verde
-    "unknown": (128, 128, 128),  # Gris
+# Personas enroladas (person_registry.py): nombre de clase del modelo, color
+# (BGR) y tecla de la ventana. "class_id" opcional fuerza el id del modelo;
+# sin "color" se asigna uno de la paleta. Con "file" se carga la lista de un
+# JSON por sitio en lugar de "people".
+PEOPLE_CONFIG = {
+    "file": None,
+    "people": [
+        {"name": "tuta", "color": (255, 0, 0), "hotkey": "t"},  # Azul
+        {"name": "laura", "color": (0, 255, 0), "hotkey": "l"},  # Verde
+    ],
+    "unknown_color": (128, 128, 128),  # Gris
+}
+
+# Modo de ejecución (vista previa y control)
+DISPLAY_CONFIG = {
+    "headless": False,  # True = sin anotaciones ni ventana (equipos en campo)
+    "preview_fps": 10,  # Tasa de refresco de la vista previa (independiente del tracking)
+    "control": None,  # None | "stdin" | "socket" (en headless por defecto "stdin")
+    "control_host": "127.0.0.1",
+    "control_port": 8765,
+}
+
+# Vista remota por HTTP MJPEG (opcional)
+STREAM_CONFIG = {
+    "enabled": False,
+    "host": "0.0.0.0",
+    "port": 8080,
+    "max_fps": 10,  # Tope de FPS por cliente
+    "jpeg_quality": 70,
+}
+
+# Endpoint de métricas Prometheus (opcional)
+METRICS_CONFIG = {
+    "enabled": False,
+    "host": "0.0.0.0",
+    "port": 9100,
+    "name": "cam0",  # Etiqueta camera= en modo de una cámara
+}
+
+# Grabación de sesiones para replay offline (session_recorder.py)
+RECORD_CONFIG = {
+    "mode": "events",  # "frames" = todos los frames | "events" = solo alrededor de eventos
+    "jpeg_quality": 80,
+    "pre_event_frames": 30,  # Frames previos a un evento que se conservan
+    "post_event_frames": 60,  # Frames que se graban después de un evento
+    "chunk_records": 256,  # Registros por bloque del contenedor
+    "queue_size": 64,  # Cola del escritor (si se llena, se descarta)
+}
+
+# Planta simulada cámara-sobre-gimbal (gimbal_sim.py) para ajustar PID y pulsos
+SIM_CONFIG = {
+    "pan_speed": {"left": 60.0, "right": 110.0},  # °/s del servo 360 (asimétrico)
+    "tilt_slew_rate": 250.0,  # °/s del servo 180 hacia el ángulo pedido
+    "tilt_range": (60, 160),  # Límites del firmware
+    "fps": 15.0,  # Frames por segundo del loop de tracking
+    "detect_latency": 0.06,  # s entre la captura y el resultado del detector
+    "network_latency": 0.04,  # s de PC -> broker -> ESP32
+    "network_jitter": 0.02,  # s (uniforme, con semilla)
+    "firmware_poll": 0.01,  # s entre check_msg del firmware anterior (bloqueante)
+    "servo_period": 0.02,  # s del loop del firmware actual (check_msg + update)
+    "face_size": 0.08,  # Alto de la cara como fracción del alto del frame
+    "duration": 8.0,  # s simulados por escenario
+    "dt": 0.001,  # Paso de integración (s)
+    "settle_hold": 0.5,  # s dentro de la zona muerta para considerarse asentado
+    "seed": 0,
+}
+
+# Backend de detección: "roboflow" (remoto), "onnx" (ONNX Runtime), "opencv" (OpenCV DNN)
+# o "recorded" (detecciones grabadas, para benchmarks)
+DETECTOR_CONFIG = {
+    "backend": "roboflow",
+    "cache_dir": "models",  # Caché local: models/<model_name>/<version>/model.onnx
+    "model_name": "proyectoia-x1a1m",
+    "model_version": "6",  # o "latest"
+    "input_size": 640,
+    "min_confidence": 0.25,  # Umbral previo a NMS (backends locales)
+    "nms_iou": 0.45,
+    "threads": 0,  # 0 = lo que decida el runtime
+    "recorded_path": "detections.json",  # Backend "recorded" (benchmarks)
+    "warmup_runs": 2,  # Inferencias de calentamiento al cargar
+    "warmup_width": 320,  # Tamaño de la imagen de inferencia (frame a escala 0.5)
+    "warmup_height": 240,
+}
+
+# Modo multi-cámara: un detector compartido, inferencia por lotes
+MULTI_STREAM_CONFIG = {
+    "streams": [
+        {"name": "cam0", "source": 0, "topic": "facetracking/tuta/servo"},
+        {"name": "cam1", "source": 1, "topic": "facetracking/tuta/servo1"},
+    ],
+    "max_batch": 8,  # Máximo de frames por llamada a infer_batch
+    "batch_timeout": 0.01,  # Segundos que se espera a que se sumen más cámaras
+    "pool_workers": 0,  # >0: procesos de detección con memoria compartida (detector_pool)
 }
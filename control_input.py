@@ -0,0 +1,158 @@
+# cSpell: disable
+# pylint: disable=all
+# ruff: noqa
+
+import queue
+import socket
+import sys
+import threading
+
+from person_registry import default_registry
+
+# Teclas de la ventana de vista previa -> comando (más una por persona enrolada)
+KEY_COMMANDS = {
+    "q": ("quit", None),
+    "c": ("center", None),
+    "r": ("reset", None),
+    "n": ("target", None),
+    "h": ("help", None),
+}
+KEY_COMMANDS.update(
+    {key: ("target", person.name) for key, person in default_registry().hotkeys().items()}
+)
+
+COMMAND_ALIASES = {
+    "quit": "quit",
+    "exit": "quit",
+    "center": "center",
+    "centrar": "center",
+    "reset": "reset",
+    "target": "target",
+    "objetivo": "target",
+    "help": "help",
+    "ayuda": "help",
+}
+
+
+def parse_command(text):
+    """Convertir una línea de texto en (comando, argumento)
+
+    Acepta las mismas teclas de la ventana ("t", "c", ...) o comandos
+    largos ("target laura", "target none", "center", "reset", "quit").
+    """
+    parts = text.strip().split()
+    if not parts:
+        return None
+
+    word = parts[0].lower()
+    if len(parts) == 1 and word in KEY_COMMANDS:
+        return KEY_COMMANDS[word]
+
+    command = COMMAND_ALIASES.get(word)
+    if command is None:
+        return None
+
+    arg = parts[1].lower() if len(parts) > 1 else None
+    if arg in ("none", "ninguno", "-"):
+        arg = None
+    return (command, arg)
+
+
+class ControlInput:
+    """Recibe comandos de control por stdin o por un socket TCP local
+
+    Los comandos se leen en un hilo aparte y el loop principal los
+    consume sin bloquear con drain().
+    """
+
+    def __init__(self, mode="stdin", host="127.0.0.1", port=8765):
+        self.mode = mode
+        self.host = host
+        self.port = port
+        self.commands = queue.Queue()
+        self.running = False
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        """Iniciar hilo de lectura"""
+        if self.mode is None:
+            return False
+
+        self.running = True
+        if self.mode == "socket":
+            try:
+                self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                self._server.bind((self.host, self.port))
+                self._server.listen(4)
+                self._server.settimeout(0.5)
+            except Exception as e:
+                print(f"❌ Error abriendo socket de control: {e}")
+                self.running = False
+                return False
+            target = self._serve_socket
+            print(f"🎮 Control por socket: {self.host}:{self.port}")
+        else:
+            target = self._read_stdin
+            print("🎮 Control por stdin (escribe 'h' para ayuda)")
+
+        self._thread = threading.Thread(target=target, daemon=True)
+        self._thread.start()
+        return True
+
+    def _push(self, line):
+        command = parse_command(line)
+        if command is None:
+            if line.strip():
+                print(f"⚠️ Comando desconocido: {line.strip()}")
+            return False
+        self.commands.put(command)
+        return True
+
+    def _read_stdin(self):
+        while self.running:
+            line = sys.stdin.readline()
+            if not line:
+                break
+            self._push(line)
+
+    def _serve_socket(self):
+        while self.running:
+            try:
+                conn, _ = self._server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            threading.Thread(
+                target=self._handle_client, args=(conn,), daemon=True
+            ).start()
+
+    def _handle_client(self, conn):
+        with conn:
+            stream = conn.makefile("r", encoding="utf-8", errors="replace")
+            for line in stream:
+                ok = self._push(line)
+                try:
+                    conn.sendall(b"ok\n" if ok else b"error\n")
+                except OSError:
+                    break
+
+    def drain(self):
+        """Comandos pendientes (no bloqueante)"""
+        pending = []
+        while True:
+            try:
+                pending.append(self.commands.get_nowait())
+            except queue.Empty:
+                return pending
+
+    def stop(self):
+        """Detener lectura de comandos"""
+        self.running = False
+        if self._server is not None:
+            try:
+                self._server.close()
+            except OSError:
+                pass
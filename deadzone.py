@@ -0,0 +1,71 @@
+# cSpell: disable
+# pylint: disable=all
+# ruff: noqa
+
+"""
+Zona muerta del centro, proporcional al tamaño del rostro objetivo
+
+Un rostro cercano (bbox grande) tiene una zona muerta mayor: un movimiento
+chico de la persona no dispara pulsos. Uno lejano, más chica. Cada eje
+tiene histéresis: se empieza a corregir al salir de la zona y se sigue
+corrigiendo hasta entrar en la zona interior (release_ratio).
+
+Es la única fuente de la zona muerta: calculate_servo_angles, la medición
+de tiempo a centro y el overlay usan la misma.
+"""
+
+from config import DEADZONE
+
+
+class AdaptiveDeadzone:
+    def __init__(self, config=DEADZONE):
+        self.config = config
+        self.reset()
+
+    def reset(self):
+        self.scale = 1.0
+        self.active = [False, False]  # Corrigiendo en x / y
+        self._height = None
+
+    @property
+    def size(self):
+        """(x, y) en píxeles de la zona exterior"""
+        return (self.config["x"] * self.scale, self.config["y"] * self.scale)
+
+    @property
+    def inner(self):
+        """(x, y) de la zona interior (hasta donde se corrige)"""
+        ratio = self.config["release_ratio"]
+        x, y = self.size
+        return (x * ratio, y * ratio)
+
+    def update(self, face_height):
+        """Escalar con el alto del bbox (suavizado para que no tiemble)"""
+        config = self.config
+        if self._height is None:
+            self._height = float(face_height)
+        else:
+            self._height += config["smoothing"] * (face_height - self._height)
+        scale = self._height / config["reference_height"]
+        self.scale = min(max(scale, config["min_scale"]), config["max_scale"])
+        return self.size
+
+    def filter(self, error_x, error_y):
+        """Errores a corregir: 0 en los ejes que están dentro de la zona"""
+        errors = [error_x, error_y]
+        outer = self.size
+        inner = self.inner
+        for axis in (0, 1):
+            magnitude = abs(errors[axis])
+            if self.active[axis]:
+                self.active[axis] = magnitude >= inner[axis]
+            else:
+                self.active[axis] = magnitude >= outer[axis]
+            if not self.active[axis]:
+                errors[axis] = 0
+        return errors[0], errors[1]
+
+    def centered(self, error_x, error_y):
+        """¿Dentro de la zona exterior en ambos ejes?"""
+        x, y = self.size
+        return abs(error_x) < x and abs(error_y) < y
@@ -0,0 +1,504 @@
+# cSpell: disable
+# pylint: disable=all
+# ruff: noqa
+
+"""
+Backends de detección intercambiables para FaceTracker
+
+- roboflow : modelo remoto vía `inference` (requiere red la primera vez)
+- onnx     : ONNX Runtime en CPU con pesos exportados en la caché local
+- opencv   : OpenCV DNN con los mismos pesos (sin dependencias extra)
+- recorded : detecciones grabadas de antemano (benchmarks reproducibles, sin modelo)
+
+Caché local de modelos (versionada):
+    models/<model_name>/<version>/model.onnx
+    models/<model_name>/<version>/classes.json   (lista de nombres)
+    models/<model_name>/<version>/meta.json      (opcional: input_size, sha256)
+
+Si meta.json trae sha256, al cargar se verifica model.onnx contra él.
+
+Instalar pesos exportados en la caché:
+    python detector_backends.py --install best.onnx --classes tuta,laura --version 6
+Comparar backends sobre los mismos frames:
+    python detector_backends.py --compare video.mp4 --backends onnx,opencv
+Grabar las detecciones de un backend real para el backend "recorded":
+    python detector_backends.py --record video.mp4 --backends roboflow --output detections.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from config import DETECTOR_CONFIG, ROBOFLOW_CONFIG
+
+# Resultado compacto de una inferencia (coordenadas en la imagen de entrada)
+Detections = namedtuple("Detections", ["xyxy", "confidence", "class_id", "class_name"])
+
+
+def empty_detections():
+    return Detections(
+        np.zeros((0, 4), dtype=np.float32),
+        np.zeros((0,), dtype=np.float32),
+        np.zeros((0,), dtype=np.int32),
+        [],
+    )
+
+
+class DetectorBackend:
+    """Interfaz común de los backends de detección"""
+
+    name = "base"
+
+    def __init__(self, config=DETECTOR_CONFIG):
+        self.config = config
+        self.class_names = []
+        self.loaded = False
+
+    def load(self):
+        """Cargar pesos; debe dejar class_names listo"""
+        raise NotImplementedError
+
+    def infer(self, image):
+        """Detectar en una imagen BGR y retornar Detections"""
+        raise NotImplementedError
+
+    def infer_batch(self, images):
+        """Detectar en varias imágenes (por defecto, una a una)"""
+        return [self.infer(image) for image in images]
+
+    def warmup(self, shape=None, runs=None):
+        """Inferencias en vacío para que la primera real no pague la inicialización"""
+        runs = self.config.get("warmup_runs", 1) if runs is None else runs
+        if shape is None:
+            shape = (
+                self.config.get("warmup_height", 240),
+                self.config.get("warmup_width", 320),
+                3,
+            )
+        dummy = np.zeros(shape, dtype=np.uint8)
+        for _ in range(runs):
+            self.infer(dummy)
+
+    def _names_for(self, class_ids):
+        names = self.class_names
+        return [names[i] if 0 <= i < len(names) else None for i in class_ids]
+
+
+class RoboflowBackend(DetectorBackend):
+    """Modelo de Roboflow a través de `inference` (comportamiento original)"""
+
+    name = "roboflow"
+
+    def load(self):
+        from inference import get_model
+        import supervision as sv
+
+        self.sv = sv
+        self.model = get_model(
+            model_id=ROBOFLOW_CONFIG["model_id"], api_key=ROBOFLOW_CONFIG["api_key"]
+        )
+        self.class_names = list(getattr(self.model, "class_names", []) or [])
+        self.loaded = True
+
+    def _convert(self, response):
+        detections = self.sv.Detections.from_inference(response)
+        if len(detections) == 0:
+            return empty_detections()
+
+        class_id = (
+            detections.class_id.astype(np.int32)
+            if detections.class_id is not None
+            else np.full(len(detections), -1, dtype=np.int32)
+        )
+        if "class_name" in detections.data:
+            class_name = [str(n) for n in detections.data["class_name"]]
+        else:
+            class_name = self._names_for(class_id)
+
+        return Detections(
+            detections.xyxy.astype(np.float32),
+            detections.confidence.astype(np.float32),
+            class_id,
+            class_name,
+        )
+
+    def infer(self, image):
+        return self._convert(self.model.infer(image)[0])
+
+    def infer_batch(self, images):
+        return [self._convert(r) for r in self.model.infer(list(images))]
+
+
+def resolve_model_dir(config=DETECTOR_CONFIG):
+    """Carpeta de la versión del modelo en la caché ("latest" = la más alta)"""
+    base = os.path.join(config["cache_dir"], config["model_name"])
+    version = str(config["model_version"])
+
+    if version == "latest":
+        if not os.path.isdir(base):
+            raise FileNotFoundError(f"No hay modelos en caché en {base}")
+        versions = [v for v in os.listdir(base) if os.path.isdir(os.path.join(base, v))]
+        if not versions:
+            raise FileNotFoundError(f"No hay modelos en caché en {base}")
+        version = max(versions, key=lambda v: (not v.isdigit(), int(v) if v.isdigit() else v))
+
+    path = os.path.join(base, version)
+    if not os.path.isfile(os.path.join(path, "model.onnx")):
+        raise FileNotFoundError(f"No se encontró {path}/model.onnx")
+    return path
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """sha256 de un archivo, leído por partes"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class LocalONNXBackend(DetectorBackend):
+    """Base de los backends locales: pre y post-procesado de un YOLO exportado"""
+
+    def load(self):
+        self.model_dir = resolve_model_dir(self.config)
+
+        with open(os.path.join(self.model_dir, "classes.json"), "r", encoding="utf-8") as f:
+            self.class_names = list(json.load(f))
+
+        meta = {}
+        meta_path = os.path.join(self.model_dir, "meta.json")
+        if os.path.isfile(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+
+        self.input_size = int(meta.get("input_size", self.config["input_size"]))
+        weights = os.path.join(self.model_dir, "model.onnx")
+        if "sha256" in meta:
+            # Un .onnx truncado o a medio copiar no llega a onnxruntime/OpenCV
+            digest = file_sha256(weights)
+            if digest != meta["sha256"]:
+                raise ValueError(
+                    f"{weights} no coincide con el sha256 de meta.json "
+                    f"({digest[:12]}... != {meta['sha256'][:12]}...): reinstalar con --install"
+                )
+        self._load_weights(weights)
+        self.loaded = True
+
+    def _load_weights(self, path):
+        raise NotImplementedError
+
+    def _run(self, blob):
+        raise NotImplementedError
+
+    def _blob(self, images):
+        size = (self.input_size, self.input_size)
+        return cv2.dnn.blobFromImages(images, 1.0 / 255.0, size, swapRB=True, crop=False)
+
+    def infer(self, image):
+        return self.infer_batch([image])[0]
+
+    def infer_batch(self, images):
+        outputs = self._run(self._blob(images))
+        return [
+            self._decode(outputs[i], image.shape[1], image.shape[0])
+            for i, image in enumerate(images)
+        ]
+
+    def _decode(self, output, width, height):
+        """Decodificar la salida YOLO (v8: 4+nc x N; v5: N x 5+nc)"""
+        if output.shape[0] < output.shape[1]:
+            preds = output.T  # YOLOv8: (4 + nc, N) -> (N, 4 + nc)
+            scores = preds[:, 4:]
+        else:
+            preds = output  # YOLOv5: (N, 5 + nc) con objectness
+            scores = preds[:, 5:] * preds[:, 4:5]
+
+        class_id = scores.argmax(axis=1).astype(np.int32)
+        confidence = scores[np.arange(len(scores)), class_id].astype(np.float32)
+
+        keep = confidence >= self.config.get("min_confidence", 0.05)
+        if not keep.any():
+            return empty_detections()
+        preds, class_id, confidence = preds[keep], class_id[keep], confidence[keep]
+
+        sx = width / self.input_size
+        sy = height / self.input_size
+        cx, cy, w, h = preds[:, 0], preds[:, 1], preds[:, 2], preds[:, 3]
+        xyxy = np.stack(
+            [(cx - w / 2) * sx, (cy - h / 2) * sy, (cx + w / 2) * sx, (cy + h / 2) * sy],
+            axis=1,
+        ).astype(np.float32)
+
+        # NMS por clase
+        boxes = np.stack([xyxy[:, 0], xyxy[:, 1], xyxy[:, 2] - xyxy[:, 0], xyxy[:, 3] - xyxy[:, 1]], axis=1)
+        indices = cv2.dnn.NMSBoxesBatched(
+            boxes.tolist(),
+            confidence.tolist(),
+            class_id.tolist(),
+            self.config.get("min_confidence", 0.05),
+            self.config.get("nms_iou", 0.45),
+        )
+        indices = np.array(indices, dtype=np.int64).reshape(-1)
+
+        return Detections(
+            xyxy[indices],
+            confidence[indices],
+            class_id[indices],
+            self._names_for(class_id[indices]),
+        )
+
+
+class ONNXRuntimeBackend(LocalONNXBackend):
+    """ONNX Runtime en CPU"""
+
+    name = "onnx"
+
+    def _load_weights(self, path):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise ImportError(
+                "onnxruntime no está instalado (pip install onnxruntime) - "
+                "usa el backend 'opencv' con los mismos pesos"
+            )
+
+        options = ort.SessionOptions()
+        threads = self.config.get("threads", 0)
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # Modelos exportados con batch fijo = 1 no aceptan lotes
+        self.fixed_batch = model_input.shape[0] == 1
+
+    def _run(self, blob):
+        if self.fixed_batch and len(blob) > 1:
+            return np.concatenate(
+                [self.session.run(None, {self.input_name: blob[i : i + 1]})[0] for i in range(len(blob))]
+            )
+        return self.session.run(None, {self.input_name: blob})[0]
+
+
+class OpenCVDNNBackend(LocalONNXBackend):
+    """OpenCV DNN en CPU (mismos pesos ONNX, sin dependencias extra)"""
+
+    name = "opencv"
+
+    def _load_weights(self, path):
+        self.net = cv2.dnn.readNetFromONNX(path)
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        threads = self.config.get("threads", 0)
+        if threads:
+            cv2.setNumThreads(threads)
+
+    def _run(self, blob):
+        outputs = []
+        for i in range(len(blob)):
+            self.net.setInput(blob[i : i + 1])
+            outputs.append(self.net.forward())
+        return np.concatenate(outputs)
+
+
+class RecordedBackend(DetectorBackend):
+    """Devuelve detecciones grabadas, una lista por frame, en orden y en ciclo
+
+    No mira la imagen: sirve para medir el resto del pipeline de forma
+    determinista sin webcam ni modelo. Formato (JSON):
+        {"class_names": [...], "frames": [[[x1, y1, x2, y2, conf, class_id], ...], ...]}
+    """
+
+    name = "recorded"
+
+    def load(self):
+        path = self.config.get("recorded_path", "detections.json")
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.class_names = list(data.get("class_names", []))
+
+        # Pre-construir todos los Detections: infer() no asigna nada
+        self.frames = []
+        for rows in data["frames"]:
+            if not rows:
+                self.frames.append(empty_detections())
+                continue
+            packed = np.asarray(rows, dtype=np.float32).reshape(-1, 6)
+            class_id = packed[:, 5].astype(np.int32)
+            self.frames.append(
+                Detections(
+                    np.ascontiguousarray(packed[:, 0:4]),
+                    np.ascontiguousarray(packed[:, 4]),
+                    class_id,
+                    self._names_for(class_id),
+                )
+            )
+        if not self.frames:
+            self.frames.append(empty_detections())
+        self.position = 0
+        self.loaded = True
+
+    def warmup(self, shape=None, runs=None):
+        pass
+
+    def rewind(self):
+        self.position = 0
+
+    def infer(self, image):
+        detections = self.frames[self.position]
+        self.position = (self.position + 1) % len(self.frames)
+        return detections
+
+
+def record_detections(backend, frames, path):
+    """Guardar las detecciones de un backend real para RecordedBackend"""
+    recorded = []
+    for frame in frames:
+        d = backend.infer(frame)
+        recorded.append(
+            [
+                [*map(float, box), float(conf), int(cid)]
+                for box, conf, cid in zip(d.xyxy, d.confidence, d.class_id)
+            ]
+        )
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"class_names": list(backend.class_names), "frames": recorded}, f)
+    return len(recorded)
+
+
+BACKENDS = {
+    RoboflowBackend.name: RoboflowBackend,
+    ONNXRuntimeBackend.name: ONNXRuntimeBackend,
+    OpenCVDNNBackend.name: OpenCVDNNBackend,
+    RecordedBackend.name: RecordedBackend,
+}
+
+
+def get_backend(name=None, config=DETECTOR_CONFIG):
+    """Crear un backend por nombre (sin cargarlo)"""
+    name = name or config["backend"]
+    if name not in BACKENDS:
+        raise ValueError(f"Backend desconocido: {name} (opciones: {', '.join(BACKENDS)})")
+    return BACKENDS[name](config)
+
+
+def load_backend(name=None, config=DETECTOR_CONFIG, warmup=True):
+    """Crear, cargar y calentar un backend"""
+    backend = get_backend(name, config)
+    backend.load()
+    if warmup:
+        backend.warmup()
+    return backend
+
+
+def install_model(onnx_path, class_names, version, config=DETECTOR_CONFIG, input_size=None):
+    """Copiar pesos exportados a la caché versionada"""
+    target = os.path.join(config["cache_dir"], config["model_name"], str(version))
+    os.makedirs(target, exist_ok=True)
+    shutil.copyfile(onnx_path, os.path.join(target, "model.onnx"))
+
+    digest = file_sha256(onnx_path)
+
+    with open(os.path.join(target, "classes.json"), "w", encoding="utf-8") as f:
+        json.dump(list(class_names), f, indent=2)
+    with open(os.path.join(target, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "input_size": input_size or config["input_size"],
+                "sha256": digest,
+                "source": os.path.basename(onnx_path),
+            },
+            f,
+            indent=2,
+        )
+    return target
+
+
+def read_frames(source, limit=200, scale=0.5):
+    """Leer frames de un video para comparar backends (a la escala de detect_faces)"""
+    cap = cv2.VideoCapture(source)
+    frames = []
+    while len(frames) < limit:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(cv2.resize(frame, None, fx=scale, fy=scale))
+    cap.release()
+    return frames
+
+
+def compare_backends(frames, names, config=DETECTOR_CONFIG):
+    """Medir throughput de cada backend sobre los mismos frames"""
+    report = {}
+    for name in names:
+        start = time.perf_counter()
+        backend = load_backend(name, config)
+        load_time = time.perf_counter() - start
+
+        latencies = []
+        detections = 0
+        for frame in frames:
+            t0 = time.perf_counter()
+            result = backend.infer(frame)
+            latencies.append(time.perf_counter() - t0)
+            detections += len(result.confidence)
+
+        latencies.sort()
+        total = sum(latencies)
+        report[name] = {
+            "load_s": load_time,
+            "frames": len(frames),
+            "fps": len(frames) / total if total else 0.0,
+            "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+            "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0.0,
+            "detections": detections,
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backends de detección")
+    parser.add_argument("--install", help="Archivo .onnx a copiar a la caché")
+    parser.add_argument("--classes", help="Nombres de clase separados por coma")
+    parser.add_argument("--version", default=DETECTOR_CONFIG["model_version"])
+    parser.add_argument("--compare", help="Video para comparar backends")
+    parser.add_argument("--backends", default="onnx,opencv")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--record", help="Video cuyas detecciones se graban")
+    parser.add_argument("--output", default="detections.json")
+    args = parser.parse_args()
+
+    if args.install:
+        classes = [c.strip() for c in (args.classes or "").split(",") if c.strip()]
+        path = install_model(args.install, classes, args.version)
+        print(f"✅ Modelo instalado en {path}")
+
+    if args.compare:
+        frames = read_frames(args.compare, args.frames)
+        print(f"🎞️  {len(frames)} frames de {args.compare}")
+        report = compare_backends(frames, args.backends.split(","))
+        for name, r in report.items():
+            print(
+                f"  {name:<9} carga {r['load_s']:.2f}s | {r['fps']:.1f} FPS | "
+                f"p50 {r['p50_ms']:.1f}ms p95 {r['p95_ms']:.1f}ms | {r['detections']} detecciones"
+            )
+
+    if args.record:
+        frames = read_frames(args.record, args.frames)
+        backend = load_backend(args.backends.split(",")[0])
+        count = record_detections(backend, frames, args.output)
+        print(f"✅ {count} frames de detecciones ({backend.name}) en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
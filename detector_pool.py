@@ -0,0 +1,265 @@
+# cSpell: disable
+# pylint: disable=all
+# ruff: noqa
+
+"""
+Pool de procesos de detección (un modelo por proceso)
+
+Los frames no viajan por pickle: el proceso principal redimensiona cada
+frame directamente dentro de un buffer de memoria compartida (slot) y solo
+envía (seq, slot). Cada worker devuelve un arreglo compacto float32 Nx6
+(x1, y1, x2, y2, confianza, class_id). Los resultados se reordenan por
+número de secuencia antes de entregarse.
+"""
+
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from config import CAMERA_CONFIG, DETECTOR_CONFIG
+from detector_backends import Detections, empty_detections
+
+# Tramo máximo (s) de espera de get() entre chequeos de workers vivos
+POLL_INTERVAL = 0.5
+
+
+def _worker_main(worker_id, backend_name, config, slot_names, shape, tasks, results):
+    """Proceso worker: carga su propio modelo y atiende (seq, slot)"""
+    from detector_backends import load_backend
+
+    slots = [shared_memory.SharedMemory(name=name) for name in slot_names]
+    views = [np.ndarray(shape, dtype=np.uint8, buffer=s.buf) for s in slots]
+
+    try:
+        backend = load_backend(backend_name, config)
+        results.put(("ready", worker_id, list(backend.class_names)))
+    except Exception as e:
+        results.put(("error", worker_id, str(e)))
+        return
+
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            seq, slot = task
+
+            start = time.perf_counter()
+            try:
+                detections = backend.infer(views[slot])
+                packed = np.empty((len(detections.confidence), 6), dtype=np.float32)
+                packed[:, 0:4] = detections.xyxy
+                packed[:, 4] = detections.confidence
+                packed[:, 5] = detections.class_id
+            except Exception as e:
+                print(f"Error en worker {worker_id}: {e}")
+                packed = np.zeros((0, 6), dtype=np.float32)
+
+            results.put(("result", seq, slot, packed, time.perf_counter() - start))
+    finally:
+        del views
+        for s in slots:
+            s.close()
+
+
+class DetectorPool:
+    """Reparte la inferencia entre procesos; entrega resultados en orden"""
+
+    def __init__(self, workers=None, backend=None, frame_shape=None, slots=None, config=DETECTOR_CONFIG):
+        self.workers = workers or max(1, (mp.cpu_count() or 2) - 1)
+        self.backend_name = backend or config["backend"]
+        self.config = config
+        # Tamaño del frame que entra al modelo (por defecto la cámara a escala 0.5)
+        self.frame_shape = frame_shape or (CAMERA_CONFIG["height"] // 2, CAMERA_CONFIG["width"] // 2, 3)
+        self.slot_count = slots or self.workers * 2
+
+        self.class_names = []
+        self.next_seq = 0
+        self.next_result = 0
+        self.in_flight = 0
+        self.frames_done = 0
+        self.busy_time = 0.0
+
+        self._ctx = mp.get_context("spawn")
+        self._shm = []
+        self._views = []
+        self._free = []
+        self._pending = {}  # seq -> Detections (llegaron antes de su turno)
+        self._processes = []
+        self._tasks = None
+        self._results = None
+
+    def start(self, timeout=120):
+        """Crear memoria compartida, lanzar workers y esperar a que carguen"""
+        size = int(np.prod(self.frame_shape))
+        for _ in range(self.slot_count):
+            shm = shared_memory.SharedMemory(create=True, size=size)
+            self._shm.append(shm)
+            self._views.append(np.ndarray(self.frame_shape, dtype=np.uint8, buffer=shm.buf))
+        self._free = list(range(self.slot_count))
+
+        self._tasks = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        names = [s.name for s in self._shm]
+
+        for worker_id in range(self.workers):
+            process = self._ctx.Process(
+                target=_worker_main,
+                args=(
+                    worker_id,
+                    self.backend_name,
+                    self.config,
+                    names,
+                    self.frame_shape,
+                    self._tasks,
+                    self._results,
+                ),
+                daemon=True,
+            )
+            process.start()
+            self._processes.append(process)
+
+        ready = 0
+        deadline = time.monotonic() + timeout
+        while ready < self.workers:
+            try:
+                message = self._results.get(timeout=max(0.1, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if message[0] == "ready":
+                ready += 1
+                self.class_names = message[2]
+            elif message[0] == "error":
+                print(f"❌ Worker {message[1]} no pudo cargar el modelo: {message[2]}")
+                break
+
+        if ready < self.workers:
+            self.close()
+            return False
+
+        print(f"✅ Pool de detección: {self.workers} procesos ({self.backend_name})")
+        return True
+
+    @property
+    def has_free_slot(self):
+        """¿Hay slot libre? (recoge antes los resultados ya terminados)"""
+        if not self._free:
+            self._drain(block=False)
+        return bool(self._free)
+
+    def submit(self, frame):
+        """Redimensionar frame dentro de un slot libre y encolarlo
+
+        Retorna el número de secuencia, o None si todos los slots están ocupados.
+        """
+        if not self._free:
+            self._drain(block=False)
+            if not self._free:
+                return None
+
+        slot = self._free.pop()
+        height, width = self.frame_shape[:2]
+        view = self._views[slot]
+        if frame.shape == view.shape:
+            np.copyto(view, frame)
+        else:
+            cv2.resize(frame, (width, height), dst=view)
+
+        seq = self.next_seq
+        self.next_seq += 1
+        self.in_flight += 1
+        self._tasks.put((seq, slot))
+        return seq
+
+    def _unpack(self, packed):
+        if len(packed) == 0:
+            return empty_detections()
+        class_id = packed[:, 5].astype(np.int32)
+        names = self.class_names
+        return Detections(
+            packed[:, 0:4].copy(),
+            packed[:, 4].copy(),
+            class_id,
+            [names[i] if 0 <= i < len(names) else None for i in class_id],
+        )
+
+    def _drain(self, block, timeout=None):
+        """Pasar mensajes de la cola de resultados al buffer de reorden"""
+        got = False
+        while True:
+            try:
+                if block and not got:
+                    message = self._results.get(timeout=timeout)
+                else:
+                    message = self._results.get_nowait()
+            except queue.Empty:
+                return got
+
+            if message[0] != "result":
+                continue
+            _, seq, slot, packed, elapsed = message
+            self._free.append(slot)
+            self._pending[seq] = self._unpack(packed)
+            self.busy_time += elapsed
+            got = True
+
+    def get(self, timeout=None):
+        """Siguiente resultado en orden de secuencia: (seq, Detections) o None"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.next_result not in self._pending:
+            if self.in_flight == 0:
+                return None
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return None
+            # Esperar en tramos cortos: si un worker murió su resultado no llega nunca
+            wait = POLL_INTERVAL if remaining is None else min(remaining, POLL_INTERVAL)
+            if not self._drain(block=True, timeout=wait):
+                self._check_workers()
+
+        seq = self.next_result
+        self.next_result += 1
+        self.in_flight -= 1
+        self.frames_done += 1
+        return seq, self._pending.pop(seq)
+
+    def _check_workers(self):
+        """RuntimeError si algún worker terminó (sus frames en vuelo se perdieron)"""
+        for worker_id, process in enumerate(self._processes):
+            if not process.is_alive():
+                raise RuntimeError(
+                    f"Worker de detección {worker_id} terminó (exitcode {process.exitcode}) "
+                    f"con {self.in_flight} frames en vuelo"
+                )
+
+    def ready_results(self):
+        """Todos los resultados ya disponibles en orden (no bloqueante)"""
+        self._drain(block=False)
+        ready = []
+        while self.next_result in self._pending:
+            ready.append(self.get())
+        return ready
+
+    def close(self):
+        """Detener workers y liberar memoria compartida"""
+        if self._tasks is not None:
+            for _ in self._processes:
+                self._tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=2.0)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+
+        self._views = []
+        for shm in self._shm:
+            shm.close()
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        self._shm = []
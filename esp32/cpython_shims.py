@@ -0,0 +1,326 @@
+"""
+Shims para importar el firmware (main.py) en CPython
+
+install() registra módulos falsos para machine (Pin, PWM), network (WLAN
+siempre conectado), umqtt.simple (MQTTClient sobre paho) y ujson, y agrega
+a time las funciones de MicroPython (ticks_ms, ticks_diff, sleep_ms).
+patch(firmware) le da al firmware ya cargado un socket como el de
+MicroPython (sendto acepta str) sin tocar el socket real de CPython, que
+usan paho y el resto del proceso.
+
+MQTTClient se comporta como el de umqtt.simple: los mensajes quedan
+pendientes hasta que el firmware llama a check_msg(), que procesa como
+mucho uno por llamada. Anota por mensaje cuándo llegó, cuándo empezó y
+cuándo terminó el callback (timings), para medir el firmware sin hardware.
+UDPSocket hace lo mismo con los datagramas: un hilo los recibe al llegar y
+recvfrom() los entrega (llegada, inicio y fin = cuando sale el ack).
+
+No se copia al ESP32: solo lo usa firmware_bench.py.
+"""
+
+import json
+import socket as _socket
+import sys
+import threading
+import time
+import types
+from collections import deque
+
+# (host, port) que reemplaza al broker del firmware (p.ej. un LocalBroker)
+BROKER = None
+# Mensajes que caben en el buffer de recepción (None = sin límite, como TCP)
+RX_BUFFER = None
+
+
+# ======================= machine =======================
+class Pin:
+    IN = 0
+    OUT = 1
+
+    def __init__(self, pin, mode=None, *args, **kwargs):
+        self.pin = pin
+
+
+class PWM:
+    def __init__(self, pin, freq=50, duty=None):
+        self.pin = pin
+        self.freq = freq
+        self.value_u16 = 0
+        self.writes = 0  # Cambios de duty (cuánto trabaja el PWM)
+        if duty is not None:
+            self.duty(duty)
+
+    def duty(self, value=None):
+        """Duty de 10 bits (0-1023)"""
+        if value is None:
+            return self.value_u16 >> 6
+        self.duty_u16(int(value) << 6)
+
+    def duty_u16(self, value=None):
+        if value is None:
+            return self.value_u16
+        self.value_u16 = int(value)
+        self.writes += 1
+
+    def deinit(self):
+        pass
+
+
+# ======================= network =======================
+STA_IF = 0
+AP_IF = 1
+
+
+class WLAN:
+    def __init__(self, interface=STA_IF):
+        self.interface = interface
+        self._active = False
+
+    def active(self, value=None):
+        if value is not None:
+            self._active = bool(value)
+        return self._active
+
+    def connect(self, ssid=None, password=None):
+        pass
+
+    def isconnected(self):
+        return True
+
+    def ifconfig(self):
+        return ("127.0.0.1", "255.0.0.0", "127.0.0.1", "127.0.0.1")
+
+
+# ======================= umqtt.simple =======================
+class MQTTException(Exception):
+    pass
+
+
+class MQTTClient:
+    def __init__(self, client_id, server, port=0, user=None, password=None, keepalive=0, ssl=False, ssl_params={}):
+        if BROKER is not None:
+            server, port = BROKER
+        self.client_id = _text(client_id)
+        self.server = server
+        self.port = port or 1883
+        self.cb = None
+        self.client = None
+
+        self.pending = deque()  # (topic, msg, llegada ns) sin procesar
+        self._lock = threading.Lock()
+        self._connected = threading.Event()
+        self.received = 0
+        self.dropped = 0  # Llegaron con el buffer de recepción lleno
+        self.published = 0
+        self.timings = []  # (msg, llegada, inicio, fin) en ns por mensaje procesado
+
+    def set_callback(self, f):
+        self.cb = f
+
+    def connect(self, clean_session=True):
+        import paho.mqtt.client as mqtt
+
+        self.client = mqtt.Client(client_id=self.client_id)
+        self.client.on_connect = lambda client, userdata, flags, rc: self._connected.set()
+        self.client.on_message = self._on_message
+        self.client.connect(self.server, self.port, 60)
+        self.client.loop_start()
+        if not self._connected.wait(timeout=5):
+            raise MQTTException("Sin conexión con " + str(self.server))
+        return 0
+
+    def _on_message(self, client, userdata, msg):
+        now = time.perf_counter_ns()
+        with self._lock:
+            self.received += 1
+            if RX_BUFFER is not None and len(self.pending) >= RX_BUFFER:
+                self.dropped += 1
+                return
+            self.pending.append((msg.topic.encode(), msg.payload, now))
+
+    def subscribe(self, topic, qos=0):
+        subscribed = threading.Event()
+        self.client.on_subscribe = lambda *args: subscribed.set()
+        self.client.subscribe(_text(topic), qos)
+        subscribed.wait(timeout=5)
+
+    def publish(self, topic, msg, retain=False, qos=0):
+        self.client.publish(_text(topic), msg, qos, retain)
+        self.published += 1
+
+    def check_msg(self):
+        """Procesar como mucho un mensaje pendiente (no bloquea)"""
+        with self._lock:
+            if not self.pending:
+                return None
+            topic, msg, arrived = self.pending.popleft()
+        start = time.perf_counter_ns()
+        self.cb(topic, msg)
+        self.timings.append((msg, arrived, start, time.perf_counter_ns()))
+        return None
+
+    def wait_msg(self):
+        while not self.pending:
+            time.sleep(0.001)
+        return self.check_msg()
+
+    def disconnect(self):
+        if self.client is not None:
+            self.client.loop_stop()
+            self.client.disconnect()
+
+    def ping(self):
+        pass
+
+
+# ======================= socket =======================
+class UDPSocket:
+    """Socket UDP no bloqueante como el de MicroPython, con llegadas anotadas"""
+
+    def __init__(self, family=_socket.AF_INET, kind=_socket.SOCK_DGRAM, proto=0):
+        self.sock = _socket.socket(family, kind, proto)
+        self.sock.settimeout(0.2)
+        self.blocking = True
+        self.running = False
+
+        self.pending = deque()  # (datagrama, remitente, llegada ns)
+        self._lock = threading.Lock()
+        self._current = None  # (datagrama, llegada, inicio) del último entregado sin ack
+        self.received = 0
+        self.dropped = 0  # Llegaron con el buffer de recepción lleno
+        self.published = 0  # Acks enviados
+        self.timings = []  # (datagrama, llegada, inicio, fin) en ns
+
+    def bind(self, address):
+        self.sock.bind(address)
+        self.running = True
+        threading.Thread(target=self._receive_loop, daemon=True).start()
+
+    def _receive_loop(self):
+        while self.running:
+            try:
+                data, address = self.sock.recvfrom(2048)
+            except _socket.timeout:
+                continue
+            except OSError:
+                break
+            now = time.perf_counter_ns()
+            with self._lock:
+                self.received += 1
+                if RX_BUFFER is not None and len(self.pending) >= RX_BUFFER:
+                    self.dropped += 1
+                    continue
+                self.pending.append((data, address, now))
+
+    def setblocking(self, flag):
+        self.blocking = bool(flag)
+
+    def settimeout(self, value):
+        self.blocking = value is None or value > 0
+
+    def getsockname(self):
+        return self.sock.getsockname()
+
+    def recvfrom(self, bufsize):
+        while True:
+            with self._lock:
+                if self.pending:
+                    data, address, arrived = self.pending.popleft()
+                    break
+            if not self.blocking:
+                raise OSError(11, "EAGAIN")  # Como MicroPython sin datos pendientes
+            time.sleep(0.001)
+        self._current = (data[:bufsize], arrived, time.perf_counter_ns())
+        return data[:bufsize], address
+
+    def sendto(self, data, address):
+        """Acepta str como MicroPython"""
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        sent = self.sock.sendto(data, address)
+        self.published += 1
+        if self._current is not None:
+            msg, arrived, start = self._current
+            self.timings.append((msg, arrived, start, time.perf_counter_ns()))
+            self._current = None
+        return sent
+
+    def close(self):
+        self.running = False
+        self.sock.close()
+
+
+def _text(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+# ======================= time =======================
+def _ticks_ms():
+    return time.monotonic_ns() // 1000000
+
+
+def _ticks_us():
+    return time.monotonic_ns() // 1000
+
+
+def _ticks_diff(a, b):
+    return a - b
+
+
+def _ticks_add(ticks, delta):
+    return ticks + delta
+
+
+def _sleep_ms(ms):
+    time.sleep(ms / 1000)
+
+
+def _sleep_us(us):
+    time.sleep(us / 1000000)
+
+
+def _module(name, **attributes):
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    return module
+
+
+def patch(firmware):
+    """Socket de MicroPython para un firmware ya cargado (solo en su módulo)"""
+    firmware.socket = _module(
+        "socket",
+        socket=UDPSocket,
+        AF_INET=_socket.AF_INET,
+        SOCK_DGRAM=_socket.SOCK_DGRAM,
+        SOL_SOCKET=_socket.SOL_SOCKET,
+        SO_REUSEADDR=_socket.SO_REUSEADDR,
+    )
+    return firmware
+
+
+def install(broker=None, rx_buffer=None):
+    """Registrar los shims (antes de importar el firmware)"""
+    global BROKER, RX_BUFFER
+    BROKER = broker
+    RX_BUFFER = rx_buffer
+
+    simple = _module("umqtt.simple", MQTTClient=MQTTClient, MQTTException=MQTTException)
+    sys.modules.update(
+        {
+            "machine": _module("machine", Pin=Pin, PWM=PWM),
+            "network": _module("network", WLAN=WLAN, STA_IF=STA_IF, AP_IF=AP_IF),
+            "umqtt": _module("umqtt", simple=simple),
+            "umqtt.simple": simple,
+            "ujson": json,
+        }
+    )
+    for name, function in (
+        ("ticks_ms", _ticks_ms),
+        ("ticks_us", _ticks_us),
+        ("ticks_diff", _ticks_diff),
+        ("ticks_add", _ticks_add),
+        ("sleep_ms", _sleep_ms),
+        ("sleep_us", _sleep_us),
+    ):
+        if not hasattr(time, name):
+            setattr(time, name, function)
@@ -1,5 +1,7 @@
 from machine import Pin, PWM
 import network
+import socket
+import struct
 import time
 from umqtt.simple import MQTTClient
 import ujson
@@ -10,13 +12,27 @@ WIFI_PASSWORD = "minumero"
 
 MQTT_BROKER = "broker.hivemq.com"
 MQTT_TOPIC = b"facetracking/tuta/servo"  # Debe coincidir con el publisher
+ACK_TOPIC = MQTT_TOPIC + b"/ack"  # Confirmación de cada comando con el rumbo
 CLIENT_ID = b"esp32_servo_tuta"
 
+# "mqtt": comandos por el broker. "udp": datagramas directos del PC por la
+# LAN (python main.py --transport udp, con la IP que se imprime al conectar)
+TRANSPORT = "mqtt"
+UDP_PORT = 4210  # Igual que TRANSPORT_CONFIG["udp_port"] en config.py
+
 SERVO_CONFIG = {
     "pan_pin": 26,
     "tilt_pin": 25,  # Pin correcto del servo 180
     "pan_center": 90,  # Centro del servo 360 (detenido)
     "tilt_center": 130,  # Centro del servo 180 (desde verify_servos.py)
+    # Velocidad del servo 360 por dirección (grados/s), para estimar el rumbo
+    # Igual que PAN_HEADING_CONFIG en config.py (python pan_heading.py)
+    "pan_rate_left": 60.0,
+    "pan_rate_right": 110.0,
+    # Fracción de la desviación máxima del pulso donde el servo 360 recién
+    # empieza a girar: las velocidades bajas se llevan por encima de ella
+    "pan_deadband": 0.15,
+    "servo_period_ms": 20,  # Loop de interpolación (50 Hz, igual que el PWM)
 }
 
 
@@ -40,6 +56,16 @@ class ServoController:
         self.pan_left_angle = 95  # Ángulo para girar izquierda (> 90)
         self.pan_right_angle = 80  # Ángulo para girar derecha (< 90) - CORREGIDO
         self.pan_stop_angle = 90  # Ángulo para detener
+        self.pan_heading = 0.0  # Rumbo estimado (grados, derecha +)
+
+        # Plan en curso: se interpola en update() sin bloquear
+        self.pan_velocity = 0.0  # °/s aplicados ahora (derecha +)
+        self.pan_plan = []  # [[ms, °/s], ...] velocidad desde cada instante
+        self.tilt_plan = []  # [[ms, °], ...] ángulos interpolados linealmente
+        self.tilt_from = self.current_tilt  # Tilt al recibir el plan
+        self.plan_end = 0  # ms desde plan_start en que el pan se detiene solo
+        self.plan_start = time.ticks_ms()
+        self.last_update = self.plan_start
 
         print("Servos listos!")
 
@@ -49,27 +75,98 @@ class ServoController:
         duty = int(min_duty + (angle / 180.0) * (max_duty - min_duty))
         return duty
 
+    def angle_to_duty_u16(self, angle):
+        """Como angle_to_duty pero con 16 bits (resolución fina para velocidades)"""
+        return int(26 * 64 + (angle / 180.0) * ((128 - 26) * 64))
+
     def move_pan(self, direction, duration=None):
         """Mueve el servo 360 por el tiempo especificado en la dirección indicada
         direction: 'left', 'right', o 'stop'
         duration: tiempo en segundos (si es None, usa self.pan_move_duration)
+
+        No bloquea: el pulso es un plan de velocidad que update() termina.
         """
         if duration is None:
             duration = self.pan_move_duration
 
         if direction == "left":
-            # Girar izquierda por el tiempo especificado
-            self.pan.duty(self.angle_to_duty(self.pan_left_angle))
-            time.sleep(duration)
-            self.pan.duty(self.angle_to_duty(self.pan_stop_angle))
+            velocity = -SERVO_CONFIG["pan_rate_left"]
         elif direction == "right":
-            # Girar derecha por el tiempo especificado
-            self.pan.duty(self.angle_to_duty(self.pan_right_angle))
-            time.sleep(duration)
-            self.pan.duty(self.angle_to_duty(self.pan_stop_angle))
-        elif direction == "stop":
-            # Detener
-            self.pan.duty(self.angle_to_duty(self.pan_stop_angle))
+            velocity = SERVO_CONFIG["pan_rate_right"]
+        else:
+            self.set_plan([[0, 0.0]], [], 0)
+            return
+        self.set_plan([[0, velocity], [int(duration * 1000), 0.0]], [], 0)
+
+    def set_pan_velocity(self, velocity):
+        """Velocidad del servo 360 en °/s (derecha +): desviación del pulso de parada
+
+        Se asume velocidad proporcional a la desviación hasta la de pan_left_angle /
+        pan_right_angle, que giran a pan_rate_left / pan_rate_right.
+        """
+        stop = self.pan_stop_angle
+        if velocity > 0:
+            fraction = min(velocity / SERVO_CONFIG["pan_rate_right"], 1.0)
+            full = self.pan_right_angle
+        elif velocity < 0:
+            fraction = min(-velocity / SERVO_CONFIG["pan_rate_left"], 1.0)
+            full = self.pan_left_angle
+        else:
+            fraction = 0.0
+            full = stop
+        if fraction:
+            deadband = SERVO_CONFIG["pan_deadband"]
+            fraction = deadband + fraction * (1.0 - deadband)
+        self.pan.duty_u16(self.angle_to_duty_u16(stop + fraction * (full - stop)))
+        self.pan_velocity = velocity
+
+    def set_plan(self, pan_plan, tilt_plan, hold_ms):
+        """Reemplazar el plan en curso (tiempos relativos a ahora)
+
+        pan_plan: [[ms, °/s], ...]; tilt_plan: [[ms, °], ...] ([] = no tocar el tilt)
+        hold_ms: cuánto se mantiene la última velocidad sin otro plan
+        """
+        self.update()  # Integrar el rumbo con el plan anterior hasta ahora
+        self.plan_start = time.ticks_ms()
+        self.pan_plan = pan_plan
+        self.tilt_plan = tilt_plan
+        self.tilt_from = self.current_tilt
+        last = 0
+        for point in pan_plan + tilt_plan:
+            last = max(last, point[0])
+        self.plan_end = last + hold_ms
+        self.update()
+
+    def update(self):
+        """Un paso del loop: rumbo integrado, velocidad y tilt del plan en este instante"""
+        now = time.ticks_ms()
+        self.pan_heading += self.pan_velocity * time.ticks_diff(now, self.last_update) / 1000
+        self.last_update = now
+        elapsed = time.ticks_diff(now, self.plan_start)
+
+        # Pan: la última velocidad cuyo instante ya pasó (quieto al vencer el plan)
+        velocity = 0.0
+        if elapsed < self.plan_end:
+            for at, value in self.pan_plan:
+                if at > elapsed:
+                    break
+                velocity = value
+        if velocity != self.pan_velocity:
+            self.set_pan_velocity(velocity)
+
+        # Tilt: interpolación lineal desde el ángulo al recibir el plan
+        if self.tilt_plan:
+            angle = self.tilt_at(elapsed)
+            if abs(angle - self.current_tilt) >= 0.2:
+                self.set_tilt(angle)
+
+    def tilt_at(self, elapsed):
+        start, angle = 0, self.tilt_from
+        for at, target in self.tilt_plan:
+            if elapsed < at:
+                return angle + (target - angle) * (elapsed - start) / (at - start)
+            start, angle = at, target
+        return angle
 
     def set_tilt(self, angle):
         """Mueve el servo 180 a un ángulo específico"""
@@ -87,11 +184,11 @@ class ServoController:
         if abs(tilt_angle - self.current_tilt) > 1:
             self.set_tilt(tilt_angle)
 
-        # Mover pan (esto bloquea por el tiempo de duration si hay movimiento)
+        # Mover pan (no bloquea: update() lo detiene al terminar duration)
         self.move_pan(pan_direction, pan_duration)
 
     def center(self):
-        self.move_pan("stop")
+        self.set_plan([[0, 0.0]], [], 0)
         self.set_tilt(SERVO_CONFIG["tilt_center"])
 
 
@@ -122,88 +219,177 @@ def connect_wifi():
 # Variable global para el servo
 servo = None
 message_count = 0
+udp_session = None  # Sesión del PC emisor (cambia en cada arranque)
+udp_seq = None  # Secuencia del último datagrama aceptado
+udp_dropped = 0  # Datagramas repetidos o fuera de orden
+client = None  # MQTTClient (TRANSPORT "mqtt")
+sock = None  # Socket UDP (TRANSPORT "udp")
 
 
 def mqtt_callback(topic, msg):
+    ack = handle_command(msg)
+    if ack is not None:
+        client.publish(ACK_TOPIC, ujson.dumps(ack))
+
+
+def udp_receive(sock):
+    """Procesar los datagramas pendientes (no bloquea); el ack va al remitente"""
+    global udp_session, udp_seq, udp_dropped
+    while True:
+        try:
+            data, address = sock.recvfrom(1024)
+        except OSError:
+            return  # Nada más pendiente
+        if len(data) < 8:
+            continue
+        session, seq = struct.unpack(">II", data[:8])
+        if session != udp_session:
+            # PC reiniciado: su secuencia vuelve a empezar
+            udp_session = session
+            udp_seq = None
+        # Repetido o más viejo que el último (con vuelta a 0 de 32 bits)
+        if udp_seq is not None and (seq == udp_seq or (seq - udp_seq) & 0xFFFFFFFF >= 0x80000000):
+            udp_dropped += 1
+            continue
+        udp_seq = seq
+        ack = handle_command(data[8:])
+        if ack is not None:
+            ack["udp_seq"] = seq
+            ack["udp_dropped"] = udp_dropped
+            sock.sendto(ujson.dumps(ack), address)
+
+
+def handle_command(msg):
+    """Ejecutar un comando (JSON) y retornar su ack (o None si no se pudo leer)"""
     global servo, message_count
     try:
         data = ujson.loads(msg)
-        pan_direction = data.get("pan_direction", "stop")  # 'left', 'right', 'stop'
-        tilt = data.get("tilt", 130)  # Default al centro correcto
-        duration = data.get("duration", None)  # Duración opcional para el pan
-        update_tilt = data.get("update_tilt", True)  # Si debe actualizar el tilt
         tracking = data.get("tracking", False)
 
-        # PRIMERO mover el pan (esto puede bloquear con time.sleep)
-        servo.move_pan(pan_direction, duration)
-
-        # DESPUÉS actualizar tilt si es necesario (no bloquea)
-        if update_tilt:
-            servo.set_tilt(tilt)
+        # ¿Giraba el pan al recibirlo? (el PC solo corrige con acks en reposo)
+        servo.update()
+        moving = servo.pan_velocity != 0
+
+        if data.get("mode") == "plan":
+            # {"pan": [[ms, °/s], ...], "tilt": [[ms, °], ...], "hold_ms": ms}
+            servo.set_plan(data.get("pan", []), data.get("tilt", []), data.get("hold_ms", 0))
+            pan_str = str(data["pan"][0][1]) + "dps" if data.get("pan") else "-"
+            tilt = data["tilt"][-1][1] if data.get("tilt") else servo.current_tilt
+            tilt_str = "plan"
+        else:
+            pan_direction = data.get("pan_direction", "stop")  # 'left', 'right', 'stop'
+            tilt = data.get("tilt", 130)  # Default al centro correcto
+            duration = data.get("duration", None)  # Duración opcional para el pan
+            update_tilt = data.get("update_tilt", True)  # Si debe actualizar el tilt
+
+            # Pulso de pan (no bloquea) y tilt si es necesario
+            servo.move_pan(pan_direction, duration)
+            if update_tilt:
+                servo.set_tilt(tilt)
+            pan_str = pan_direction + " (" + (str(duration) + "s" if duration else "default") + ")"
+            tilt_str = "update" if update_tilt else "skip"
 
         message_count += 1
         status = "TRACKING" if tracking else "IDLE"
 
+        # Ack con el rumbo al recibir el comando (el PC corrige su estimación)
+        ack = {
+            "seq": data.get("seq"),
+            "pan": round(servo.pan_heading, 1),
+            "moving": moving,
+            "tilt": servo.current_tilt,
+            "count": message_count,
+        }
+
         # Imprimir cada 10 mensajes para no saturar
         if message_count % 10 == 0:
-            dur_str = f"{duration}s" if duration else "default"
-            tilt_str = "update" if update_tilt else "skip"
             print(
                 "#" + str(message_count),
                 status,
                 "| Pan:",
-                pan_direction,
-                "(" + dur_str + ")",
+                pan_str,
                 "Tilt:",
                 round(tilt, 1),
                 "(" + tilt_str + ")",
             )
+        return ack
 
     except Exception as e:
         print("Error procesando mensaje:", str(e))
         print("Mensaje:", msg)
+        return None
 
 
-print("=" * 50)
-print("ESP32 Face Tracking - MQTT TIEMPO REAL")
-print("=" * 50)
+def open_transport():
+    """Abrir el transporte configurado (client MQTT o sock UDP globales)"""
+    global client, sock
+    if TRANSPORT == "udp":
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(("0.0.0.0", UDP_PORT))
+        sock.setblocking(False)
+        print("Escuchando UDP en el puerto", UDP_PORT)
+    else:
+        print("Conectando a MQTT broker:", MQTT_BROKER)
+        client = MQTTClient(CLIENT_ID, MQTT_BROKER)
+        client.set_callback(mqtt_callback)
+        client.connect()
+        client.subscribe(MQTT_TOPIC)
+        print("Suscrito a:", MQTT_TOPIC)
 
-if not connect_wifi():
-    print("Sistema detenido - No hay conexion WiFi")
-    while True:
-        time.sleep(1)
 
-servo = ServoController()
-print("Servos inicializados")
-servo.center()
-time.sleep(1)
+def poll():
+    """Una vuelta del loop: como mucho un mensaje MQTT (o los datagramas pendientes) y el plan"""
+    if client is not None:
+        client.check_msg()  # No bloqueante
+    else:
+        udp_receive(sock)  # No bloqueante
+    servo.update()  # Interpolar el plan a ritmo de servo
+
 
-print("Conectando a MQTT broker:", MQTT_BROKER)
+def main():
+    global servo
 
-try:
-    client = MQTTClient(CLIENT_ID, MQTT_BROKER)
-    client.set_callback(mqtt_callback)
-    client.connect()
-    client.subscribe(MQTT_TOPIC)
-    print("Suscrito a:", MQTT_TOPIC)
     print("=" * 50)
-    print("Sistema ACTIVO - Recibiendo en tiempo real...")
-    print("")
+    print("ESP32 Face Tracking - MQTT TIEMPO REAL")
+    print("=" * 50)
 
-    while True:
-        client.check_msg()  # No bloqueante
-        time.sleep(0.01)  # 10ms delay
+    if not connect_wifi():
+        print("Sistema detenido - No hay conexion WiFi")
+        while True:
+            time.sleep(1)
 
-except KeyboardInterrupt:
-    print("")
-    print("Deteniendo...")
-    servo.center()
-    client.disconnect()
-    print("Desconectado")
-except Exception as e:
-    print("Error:", str(e))
+    servo = ServoController()
+    print("Servos inicializados")
     servo.center()
+    time.sleep(1)
+
     try:
-        client.disconnect()
-    except:
-        pass
+        open_transport()
+        print("=" * 50)
+        print("Sistema ACTIVO - Recibiendo en tiempo real...")
+        print("")
+
+        while True:
+            poll()
+            time.sleep_ms(SERVO_CONFIG["servo_period_ms"])
+
+    except KeyboardInterrupt:
+        print("")
+        print("Deteniendo...")
+        servo.center()
+        if client is not None:
+            client.disconnect()
+        print("Desconectado")
+    except Exception as e:
+        print("Error:", str(e))
+        servo.center()
+        try:
+            client.disconnect()
+        except:
+            pass
+
+
+# MicroPython ejecuta main.py como __main__; en CPython se importa sin
+# arrancar (firmware_bench.py, con esp32/cpython_shims.py)
+if __name__ == "__main__":
+    main()
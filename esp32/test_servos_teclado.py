@@ -6,7 +6,6 @@ Controla los servos usando las flechas del teclado
 import paho.mqtt.client as mqtt
 import json
 import time
-import keyboard  # pip install keyboard si no lo tienes
 
 # ======================= CONFIGURACION =======================
 MQTT_BROKER = "broker.hivemq.com"
@@ -106,6 +105,9 @@ class MQTTController:
 
 # ======================= MAIN =======================
 def main():
+    # Solo para el teclado: MQTTController se usa sin él (firmware_bench.py)
+    import keyboard  # pip install keyboard si no lo tienes
+
     print("\n" + "=" * 70)
     print("🎮 CONTROL DE SERVOS CON TECLADO (MQTT)")
     print("=" * 70)
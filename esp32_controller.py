@@ -73,3 +73,16 @@ class ESP32Controller:
             self.serial.close()
             self.connected = False
             print("🔌 Desconectado de ESP32")
+
+
+def serial_position(command):
+    """(pan, tilt) del protocolo CSV para un ServoCommand (codificador del destino "serial")
+
+    El pan es el rumbo estimado alrededor de pan_center. Sin objetivo no se
+    envía nada (como antes), salvo al centrar.
+    """
+    if command.kind == "center":
+        return SERVO_CONFIG["pan_center"], SERVO_CONFIG["tilt_center"]
+    if command.kind == "track" and command.locked:
+        return SERVO_CONFIG["pan_center"] + command.pan, command.tilt
+    return None
@@ -2,34 +2,74 @@
 # pylint: disable=all
 # ruff: noqa
 
+import time
+
 import cv2
 import numpy as np
-from inference import get_model
-import supervision as sv
 from pid_controller import PIDController
+from deadzone import AdaptiveDeadzone
+from pan_heading import PanHeading
+from target_search import TargetSearch
+from overlay_renderer import OverlayRenderer
+from detector_backends import Detections, get_backend
+from perf_stats import PerfStats
+from person_registry import PersonRegistry
 from config import (
     CAMERA_CONFIG,
     TRACKING_CONFIG,
     PID_CONFIG,
-    DEADZONE,
     SERVO_CONFIG,
     ROBOFLOW_CONFIG,
-    PERSON_COLORS,
+    PULSE_CONFIG,
+    PAN_HEADING_CONFIG,
+    PLAN_CONFIG,
+    SEARCH_CONFIG,
 )
 
 
 class FaceTracker:
-    def __init__(self):
-        print("🔄 Cargando modelo de detección facial...")
-        self.model = get_model(
-            model_id=ROBOFLOW_CONFIG["model_id"], api_key=ROBOFLOW_CONFIG["api_key"]
+    def __init__(self, load_model=True, detector=None):
+        # detector: backend ya creado (p.ej. compartido); si no, el de DETECTOR_CONFIG
+        self.detector = detector if detector is not None else get_backend()
+        # Personas enroladas, enlazadas a los class_id del detector
+        self.people = PersonRegistry.from_config().bind_classes(self.detector.class_names)
+
+        # Cola de prioridad de objetivos (target = el que se sigue ahora)
+        self.clock = time.monotonic  # Inyectable (replay de sesiones)
+        self.frame_time = self.clock()  # Instante del frame en proceso (uno por frame)
+        self.pan_heading = PanHeading()  # Rumbo estimado del servo 360
+        self.search = TargetSearch(self.pan_heading)  # Búsqueda si se pierde el objetivo
+        self.frame_latency = None  # s captura -> detección fijo (simulación); None = medido
+        self.switch_hysteresis = TRACKING_CONFIG["switch_hysteresis"]
+        self.dwell_time = TRACKING_CONFIG["dwell_time"]
+        self.target = None
+        self.target_person = None
+        self.set_target_queue(
+            TRACKING_CONFIG["target_queue"] or [TRACKING_CONFIG["target_person"]],
+            verbose=False,
         )
-        print("✅ Modelo cargado")
 
-        self.frame_center = (CAMERA_CONFIG["width"] // 2, CAMERA_CONFIG["height"] // 2)
+        if load_model and not self.detector.loaded:
+            self.load_model()
 
-        self.pid_pan = PIDController(**PID_CONFIG["pan"])
-        self.pid_tilt = PIDController(**PID_CONFIG["tilt"])
+        self.frame_center = (CAMERA_CONFIG["width"] // 2, CAMERA_CONFIG["height"] // 2)
+        # Distancia focal vertical en píxeles: error_y -> grados de tilt
+        self.focal_y = self.frame_center[1] / np.tan(np.radians(CAMERA_CONFIG["vfov"] / 2))
+        self.focal_x = self.frame_center[0] / np.tan(np.radians(CAMERA_CONFIG["hfov"] / 2))
+
+        # Los PID usan el instante del frame: en replay se reproduce exacto
+        self.plan = PLAN_CONFIG
+        self.set_command_mode(PLAN_CONFIG["command_mode"])
+        self.pid_tilt = PIDController(**PID_CONFIG["tilt"], clock=lambda: self.frame_time)
+        self.pulse = PULSE_CONFIG
+        self.deadzone = AdaptiveDeadzone()  # Escala con el tamaño del rostro
+        self.last_pan_direction = "stop"
+        self.last_pan_duration = 0.0
+        self.last_tilt_time = None
+        self.was_locked = False
+        self.center_started = None  # Inicio de la corrección tras un salto
+        self.last_error = None
+        self.last_time_to_center = None
 
         self.current_pan = SERVO_CONFIG["pan_center"]
         self.current_tilt = SERVO_CONFIG["tilt_center"]
@@ -37,243 +77,529 @@ class FaceTracker:
         self.last_face_center = None
 
         self.smoothing_factor = TRACKING_CONFIG["smoothing_factor"]
-        self.target_person = TRACKING_CONFIG["target_person"]
         self.tracking_confidence_threshold = 0.50  # Mínimo 50% de confianza
 
-        self.box_annotator = sv.BoxAnnotator()
-        self.label_annotator = sv.LabelAnnotator()
+        self.overlay = OverlayRenderer(self.frame_center)
+        self._small_frame = None  # Buffer de inferencia reutilizado
+        self.stats = PerfStats()  # Latencias por etapa (compartido con main)
+        self.last_detections = None  # Salida cruda del detector (grabación de sesiones)
 
         # Para optimización
         self.frame_counter = 0
         self.frame_skip = TRACKING_CONFIG["frame_skip"]
 
+    def load_model(self):
+        """Cargar el backend de detección y hacer el calentamiento"""
+        print(f"🔄 Cargando modelo de detección facial ({self.detector.name})...")
+        self.detector.load()
+        self.detector.warmup()
+        self.people.bind_classes(self.detector.class_names)
+        self._build_rank_table()
+        print("✅ Modelo cargado")
+
     def set_target_person(self, person_name):
-        """Establecer la persona objetivo a seguir"""
-        if person_name in ["tuta", "laura", None]:
-            self.target_person = person_name
-            print(
-                f"🎯 Objetivo establecido: {person_name if person_name else 'Ninguno'}"
-            )
-            return True
-        return False
+        """Establecer la persona objetivo a seguir ("a,b,c" = cola de prioridad)"""
+        if person_name and "," in person_name:
+            return self.set_target_queue(person_name.split(","))
+        return self.set_target_queue([person_name])
+
+    def set_target_queue(self, names, verbose=True):
+        """Lista ordenada de objetivos (el primero es el de mayor prioridad)"""
+        names = [n.strip() for n in names if n and n.strip()]
+        people = [self.people.get(n) for n in names]
+        if any(p is None for p in people):
+            return False
+
+        self.priority = list(dict.fromkeys(people))  # Sin repetidos, en orden
+        self._rank = {p: i for i, p in enumerate(self.priority)}
+        self._build_rank_table()
+        self._lost_since = None
+        self._candidate = None
+        self._candidate_since = None
+        self._set_active(self.priority[0] if self.priority else None)
+
+        if verbose:
+            queue = " > ".join(p.name for p in self.priority) or "Ninguno"
+            print(f"🎯 Objetivo establecido: {queue}")
+        return True
+
+    def _build_rank_table(self):
+        # Rango por class_id; NO_RANK = no está en la cola
+        self._no_rank = len(self.priority)
+        self._rank_table = self.people.class_table(self._rank, self._no_rank)
+
+    def _set_active(self, person):
+        if person is not self.target:
+            self.search.reset()
+        self.target = person
+        self.target_person = person.name if person else None
 
     def detect_faces(self, frame):
         """Detectar rostros con optimización"""
+        stats = self.stats
+        t = stats.now()
         try:
-            # Reducir resolución para inferencia más rápida
+            # Reducir resolución para inferencia más rápida (en buffer reutilizado)
             scale = 0.5
-            small_frame = cv2.resize(frame, None, fx=scale, fy=scale)
-
-            results = self.model.infer(small_frame)[0]
-            detections = sv.Detections.from_inference(results)
-
-            # Escalar detecciones de vuelta al tamaño original
-            if len(detections) > 0:
-                detections.xyxy = detections.xyxy / scale
-
-            # Filtrar por confianza mínima
-            mask = detections.confidence >= ROBOFLOW_CONFIG["confidence"]
-            detections = detections[mask]
-
-            if len(detections) == 0:
-                return [], None
-
-            # Procesar detecciones
-            detected_faces = []
-            for i in range(len(detections)):
-                x1, y1, x2, y2 = detections.xyxy[i]
-                center_x = int((x1 + x2) / 2)
-                center_y = int((y1 + y2) / 2)
-                area = (x2 - x1) * (y2 - y1)
-
-                class_name = (
-                    detections.data.get("class_name", [None])[i]
-                    if "class_name" in detections.data
-                    else None
+            small_size = (int(frame.shape[1] * scale), int(frame.shape[0] * scale))
+            if self._small_frame is None or self._small_frame.shape[:2] != small_size[::-1]:
+                self._small_frame = np.empty(
+                    (small_size[1], small_size[0]) + frame.shape[2:], dtype=frame.dtype
                 )
-                confidence = detections.confidence[i]
-
-                face_info = {
-                    "bbox": (int(x1), int(y1), int(x2 - x1), int(y2 - y1)),
-                    "center": (center_x, center_y),
-                    "area": area,
-                    "confidence": confidence,
-                    "class_name": class_name,
-                    "index": i,
-                }
+            small_frame = cv2.resize(frame, small_size, dst=self._small_frame)
+            t = stats.lap("resize", t)
 
-                detected_faces.append(face_info)
+            self.last_detections = None
+            detections = self.detector.infer(small_frame)
+            self.last_detections = detections
+            t = stats.lap("infer", t)
 
-            return detected_faces, detections
+            faces = self.faces_from_detections(detections, scale)
+            stats.lap("postprocess", t)
+            return faces
 
         except Exception as e:
             print(f"Error en detección: {e}")
             return [], None
 
-    def select_target_face(self, detected_faces):
-        """Seleccionar rostro objetivo con prioridad por confianza y tamaño"""
-        if not detected_faces:
-            return None
+    def faces_from_detections(self, detections, scale=1.0):
+        """Escalar al frame original, filtrar por confianza y armar cada rostro"""
+        # Filtrar por confianza mínima
+        mask = detections.confidence >= ROBOFLOW_CONFIG["confidence"]
+        if not mask.any():
+            return [], None
 
-        if self.target_person is None:
-            return None
+        keep = np.flatnonzero(mask)
+        detections = Detections(
+            detections.xyxy[keep] / scale,
+            detections.confidence[keep],
+            detections.class_id[keep],
+            [detections.class_name[i] for i in keep],
+        )
 
-        matching_faces = []
-        for face in detected_faces:
-            if (
-                face["class_name"]
-                and face["class_name"].lower() == self.target_person.lower()
-            ):
-                if face["confidence"] >= self.tracking_confidence_threshold:
-                    matching_faces.append(face)
+        # Procesar detecciones
+        people = self.people
+        detected_faces = []
+        for i in range(len(detections.confidence)):
+            x1, y1, x2, y2 = detections.xyxy[i]
+            center_x = int((x1 + x2) / 2)
+            center_y = int((y1 + y2) / 2)
+            area = (x2 - x1) * (y2 - y1)
+
+            face_info = {
+                "bbox": (int(x1), int(y1), int(x2 - x1), int(y2 - y1)),
+                "center": (center_x, center_y),
+                "area": area,
+                "confidence": float(detections.confidence[i]),
+                "class_name": detections.class_name[i],
+                "class_id": int(detections.class_id[i]),
+                "person": people.by_class(
+                    int(detections.class_id[i]), detections.class_name[i]
+                ),
+                "index": i,
+            }
+
+            detected_faces.append(face_info)
+
+        return detected_faces, detections
+
+    def _face_ranks(self, detected_faces, detections):
+        """Rango de prioridad de cada rostro (vectorizado por class_id)"""
+        table = self._rank_table
+        if detections is not None and len(table):
+            ids = detections.class_id
+            inside = (ids >= 0) & (ids < len(table))
+            return np.where(inside, table[np.clip(ids, 0, len(table) - 1)], self._no_rank)
+        # Clases sin enlazar (backend sin class_names): por persona
+        return np.fromiter(
+            (self._rank.get(f["person"], self._no_rank) for f in detected_faces),
+            dtype=np.int32,
+            count=len(detected_faces),
+        )
 
-        if not matching_faces:
-            return None
+    def select_target_face(self, detected_faces, detections=None):
+        """Seleccionar el rostro de la persona de mayor prioridad visible
 
-        # Ordenar por confianza primero, luego por tamaño
-        matching_faces.sort(key=lambda x: (x["confidence"], x["area"]), reverse=True)
+        En una sola pasada vectorizada se ordena por (prioridad, confianza,
+        área). Si el objetivo actual sigue visible, alguien de más prioridad
+        debe verse switch_hysteresis segundos antes de cambiar; si se pierde,
+        se espera dwell_time antes de pasar a alguien de menos prioridad.
+        """
+        if not self.priority:
+            return None
+        now = self.frame_time
+
+        best_rank = self._no_rank
+        order = ()
+        if detected_faces:
+            ranks = self._face_ranks(detected_faces, detections)
+            if detections is not None:
+                confidence = detections.confidence
+                xyxy = detections.xyxy
+                area = (xyxy[:, 2] - xyxy[:, 0]) * (xyxy[:, 3] - xyxy[:, 1])
+            else:
+                confidence = np.array([f["confidence"] for f in detected_faces])
+                area = np.array([f["area"] for f in detected_faces])
+            ranks = np.where(
+                confidence >= self.tracking_confidence_threshold, ranks, self._no_rank
+            )
+            order = np.lexsort((-area, -confidence, ranks))
+            best_rank = int(ranks[order[0]])
+
+        active_rank = self._rank.get(self.target, self._no_rank)
+        visible = best_rank < self._no_rank
+
+        if visible and active_rank < self._no_rank and (ranks == active_rank).any():
+            # Objetivo actual visible: ¿alguien de más prioridad de forma sostenida?
+            self._lost_since = None
+            if best_rank < active_rank:
+                best = self.priority[best_rank]
+                if self._candidate is not best:
+                    self._candidate, self._candidate_since = best, now
+                elif now - self._candidate_since >= self.switch_hysteresis:
+                    self._switch(best)
+                    return detected_faces[order[0]]
+            else:
+                self._candidate = None
+            # Mejor rostro del objetivo actual (primero en el orden con su rango)
+            for i in order:
+                if ranks[i] == active_rank:
+                    return detected_faces[i]
+
+        self._candidate = None
+        if not visible:
+            if self._lost_since is None:
+                self._lost_since = now
+            return None
 
-        return matching_faces[0]
+        # Objetivo actual ausente: más prioridad cambia ya, menos tras dwell_time
+        if self._lost_since is None:
+            self._lost_since = now
+        if best_rank < active_rank or now - self._lost_since >= self.dwell_time:
+            self._switch(self.priority[best_rank])
+            return detected_faces[order[0]]
+        return None
+
+    def _switch(self, person):
+        if person is not self.target:
+            print(f"🔀 Cambio de objetivo: {self.target_person or '-'} -> {person.name}")
+        self._set_active(person)
+        self._lost_since = None
+        self._candidate = None
+
+    def set_command_mode(self, mode):
+        """"plan": velocidad de pan que mantiene el firmware; "pulse": un pulso por frame"""
+        self.command_mode = mode
+        gains = PID_CONFIG["pan_velocity" if mode == "plan" else "pan"]
+        self.pid_pan = PIDController(**gains, clock=lambda: self.frame_time)
+        self.last_pan_velocity = 0.0
 
     def calculate_servo_angles(self, face_center):
-        """Calcular dirección y ángulos - Sistema de pulsos"""
+        """Calcular dirección, duración del pulso de pan y ángulo de tilt
+
+        La duración del pulso sale del PID sobre el error en píxeles: errores
+        grandes se corrigen con pulsos largos en vez de muchos pulsos fijos.
+        El pan se compensa por dirección (el servo es asimétrico). En modo
+        plan el PID da en cambio una velocidad (°/s, en last_pan_velocity) a
+        partir del error angular y la duración es 0. El tilt es posicional:
+        el error vertical se pasa a grados con el vfov de la cámara y el PID
+        da el paso en grados. Todos tienen límite de cambio.
+        """
+        pulse = self.pulse
         error_x = face_center[0] - self.frame_center[0]
         error_y = face_center[1] - self.frame_center[1]
 
-        # Aplicar zona muerta más grande para movimiento suave
-        deadzone_x = 120  # Igual que simple_face_tracker
-        deadzone_y = 80
+        # Zona muerta (según el tamaño del rostro) con histéresis por eje:
+        # se corrige al salir de la zona y hasta entrar a la zona interior
+        error_x, error_y = self.deadzone.filter(error_x, error_y)
+        tilt_error = float(np.degrees(np.arctan(error_y / self.focal_y)))
 
-        if abs(error_x) < deadzone_x:
-            error_x = 0
-        if abs(error_y) < deadzone_y:
-            error_y = 0
+        now = self.frame_time
+        dt = now - self.last_tilt_time if self.last_tilt_time is not None else 0.0
+        self.last_tilt_time = now
+        dt = min(max(dt, 0.001), 0.1)
 
-        # PAN: Determinar dirección (left/right/stop)
-        if error_x == 0:
-            pan_direction = "stop"
-        elif error_x < 0:
-            # Rostro a la izquierda -> seguir IZQUIERDA
-            pan_direction = "left"
-        else:
-            # Rostro a la derecha -> seguir DERECHA
-            pan_direction = "right"
-
-        # TILT: Calcular ángulo con suavizado
-        tilt_step = 0.25  # Paso pequeño
-        if error_y == 0:
-            tilt_adjustment = 0.0
-        elif error_y < 0:
-            # Rostro arriba: subir cámara (menor ángulo)
-            tilt_adjustment = -tilt_step
+        if self.command_mode == "plan":
+            pan_output = self.pid_pan.update(float(np.degrees(np.arctan(error_x / self.focal_x))))
         else:
-            # Rostro abajo: bajar cámara (mayor ángulo)
-            tilt_adjustment = tilt_step
+            pan_output = self.pid_pan.update(error_x)
+        tilt_output = self.pid_tilt.update(tilt_error)
 
-        # Actualizar tilt con suavizado
-        new_tilt = self.current_tilt + tilt_adjustment
-        new_tilt = self.current_tilt + (new_tilt - self.current_tilt) * 0.3
+        # PAN: dirección por el error, duración por la salida del PID
+        if self.command_mode == "plan":
+            pan_direction, duration = self._pan_velocity(pan_output if error_x else 0.0, dt)
+        elif error_x == 0:
+            pan_direction = "stop"
+            duration = 0.0
+        else:
+            # Rostro a la izquierda -> seguir IZQUIERDA; a la derecha -> DERECHA
+            pan_direction = "left" if error_x < 0 else "right"
+            duration = (
+                abs(pan_output)
+                * pulse["pan_seconds_per_unit"]
+                * pulse["pan_gain"][pan_direction]
+            )
+            # Límite de cambio respecto al pulso anterior en la misma dirección
+            previous = (
+                self.last_pan_duration
+                if self.last_pan_direction == pan_direction
+                else pulse["pan_min_duration"]
+            )
+            step = pulse["pan_duration_step"]
+            duration = min(max(duration, previous - step), previous + step)
+            duration = min(max(duration, pulse["pan_min_duration"]), pulse["pan_max_duration"])
 
-        # Limitar rangos del tilt
-        new_tilt = np.clip(new_tilt, 60, 160)  # Rango del servo 180
+        self.last_pan_direction = pan_direction
+        self.last_pan_duration = duration
 
-        return pan_direction, new_tilt
+        # TILT: rostro arriba (error < 0) -> menor ángulo; abajo -> mayor
+        tilt_step = tilt_output if error_y else 0.0
+        max_step = pulse["tilt_max_rate"] * dt
+        tilt_step = min(max(tilt_step, -max_step), max_step)
 
-    def process_frame(self, frame, frame_count):
-        """Procesar frame optimizado"""
-        result = {
+        # Limitar rangos del tilt
+        tilt_min, tilt_max = SERVO_CONFIG["tilt_range"]
+        new_tilt = float(np.clip(self.current_tilt + tilt_step, tilt_min, tilt_max))
+
+        return pan_direction, duration, new_tilt
+
+    def _pan_velocity(self, velocity, dt):
+        """Velocidad del plan: límite de aceleración y de la dirección, cuantizada
+
+        Cuantizar hace que el rumbo estimado integre exactamente lo que el
+        firmware recibe: MQTTSender no envía cambios menores a un paso.
+        """
+        plan = self.plan
+        previous = self.last_pan_velocity
+        max_change = plan["max_accel"] * dt
+        velocity = min(max(velocity, previous - max_change), previous + max_change)
+        limit = PAN_HEADING_CONFIG["rate"]["right" if velocity > 0 else "left"]
+        velocity = min(max(velocity, -limit), limit)
+        step = plan["velocity_step"]
+        velocity = round(velocity / step) * step
+        self.last_pan_velocity = velocity
+        if not velocity:
+            return "stop", 0.0
+        return ("right" if velocity > 0 else "left"), 0.0
+
+    def _measure_time_to_center(self, error, centered):
+        """Tiempo desde un salto del objetivo (o su enganche) hasta quedar centrado"""
+        now = self.frame_time
+        jump = self.pulse["center_jump_px"]
+        if not self.was_locked:
+            self.center_started = None if centered else now
+        elif self.last_error is not None and self.center_started is None and (
+            abs(error[0] - self.last_error[0]) > jump
+            or abs(error[1] - self.last_error[1]) > jump
+        ):
+            self.center_started = now
+        self.last_error = error
+
+        if centered and self.center_started is not None:
+            elapsed = now - self.center_started
+            self.center_started = None
+            self.last_time_to_center = elapsed
+            self.stats.record("time_to_center", int(elapsed * 1e9))
+            return elapsed
+        return None
+
+    def new_result(self):
+        """Resultado vacío (sin objetivo)"""
+        return {
             "target_locked": False,
             "target_face": None,
             "all_faces": [],
             "detections": None,
             "pan_direction": "stop",
+            "pan_duration": 0.0,
+            "pan_velocity": 0.0 if self.command_mode == "plan" else None,  # °/s (modo plan)
+            "pan": self.pan_heading.heading,  # ° estimados (derecha +)
+            "seq": None,  # Secuencia del comando (ack del ESP32)
             "tilt_angle": self.current_tilt,
+            "time": self.frame_time,  # Reloj del tracker (s)
             "error": (0, 0),
             "distance_to_center": 0,
+            "time_to_center": None,  # s, en el frame en que se centra tras un salto
+            "search": self.search.state,  # tracking | grace | return | sweep | idle
+            "time_to_reacquire": None,  # s, en el frame en que se recupera al objetivo
+            "frame_latency": None,  # s usados para temporizar la búsqueda
+            "deadzone": self.deadzone.size,  # (x, y) px alrededor del centro
         }
 
+    def process_frame(self, frame, frame_count):
+        """Procesar frame optimizado"""
         # Detectar en cada frame para mejor seguimiento
         if frame_count % TRACKING_CONFIG["detection_interval"] == 0:
             detected_faces, detections = self.detect_faces(frame)
-
-            result["all_faces"] = detected_faces
-            result["detections"] = detections
-
-            if detected_faces:
-                # Seleccionar objetivo
-                target_face = self.select_target_face(detected_faces)
-
-                if target_face:
-                    self.face_detected = True
-                    self.last_face_center = target_face["center"]
-                    result["target_locked"] = True
-                    result["target_face"] = target_face
-
-                    # Calcular distancia al centro
-                    error_x = target_face["center"][0] - self.frame_center[0]
-                    error_y = target_face["center"][1] - self.frame_center[1]
-                    distance = np.sqrt(error_x**2 + error_y**2)
-                    result["distance_to_center"] = distance
-                    result["error"] = (error_x, error_y)
-
-                    # Calcular dirección y ángulos (sistema de pulsos)
-                    pan_direction, tilt = self.calculate_servo_angles(
-                        target_face["center"]
+            return self.process_detections(detected_faces, detections)
+
+        return self.new_result()
+
+    def process_detections(self, detected_faces, detections):
+        """Seleccionar objetivo y calcular servos a partir de detecciones ya hechas
+
+        Permite que la inferencia se haga fuera (p.ej. en lote para varias cámaras).
+        """
+        self.frame_time = self.clock()
+        result = self.new_result()
+        result["time"] = self.frame_time
+        result["all_faces"] = detected_faces
+        result["detections"] = detections
+
+        # Seleccionar objetivo (también sin rostros: corre el tiempo de espera)
+        t = self.stats.now()
+        target_face = self.select_target_face(detected_faces, detections)
+        t = self.stats.lap("select", t)
+
+        if detected_faces:
+
+            if target_face:
+                self.face_detected = True
+                self.last_face_center = target_face["center"]
+                result["target_locked"] = True
+                result["target_face"] = target_face
+
+                # Calcular distancia al centro
+                error_x = target_face["center"][0] - self.frame_center[0]
+                error_y = target_face["center"][1] - self.frame_center[1]
+                distance = np.sqrt(error_x**2 + error_y**2)
+                result["distance_to_center"] = distance
+                result["error"] = (error_x, error_y)
+
+                # Al enganchar, los PID arrancan desde el error actual
+                if not self.was_locked:
+                    self.deadzone.reset()
+                    self.pid_pan.reset(
+                        float(np.degrees(np.arctan(error_x / self.focal_x)))
+                        if self.command_mode == "plan"
+                        else error_x
                     )
+                    self.pid_tilt.reset(float(np.degrees(np.arctan(error_y / self.focal_y))))
+                    self.last_tilt_time = None
+                self.deadzone.update(target_face["bbox"][3])
+                result["deadzone"] = self.deadzone.size
+
+                # Calcular dirección, pulso y ángulo (sistema de pulsos)
+                pan_direction, pan_duration, tilt = self.calculate_servo_angles(
+                    target_face["center"]
+                )
+                self.stats.lap("control", t)
 
-                    result["pan_direction"] = pan_direction
-                    self.current_tilt = tilt
+                result["pan_direction"] = pan_direction
+                result["pan_duration"] = pan_duration
+                if self.command_mode == "plan":
+                    result["pan_velocity"] = self.last_pan_velocity
+                self.current_tilt = tilt
 
-                    result["tilt_angle"] = tilt
+                result["tilt_angle"] = tilt
+
+                centered = self.deadzone.centered(error_x, error_y)
+                result["time_to_center"] = self._measure_time_to_center(
+                    (error_x, error_y), centered
+                )
+                self.was_locked = True
+
+                # Rumbo del mundo del rostro (para volver a buscarlo ahí)
+                face_heading = self.pan_heading.heading + float(
+                    np.degrees(np.arctan(error_x / self.focal_x))
+                )
+                reacquired = self.search.seen(face_heading, self.frame_time)
+                if reacquired is not None:
+                    self.stats.record("time_to_reacquire", int(reacquired * 1e9))
+                    result["time_to_reacquire"] = reacquired
+                result["search"] = self.search.state
 
-                else:
-                    self.face_detected = False
             else:
                 self.face_detected = False
+                self.was_locked = False
+        else:
+            self.face_detected = False
+            self.was_locked = False
+
+        if not result["target_locked"]:
+            # Sin objetivo: pulso de búsqueda (o stop durante la espera)
+            self.last_pan_velocity = 0.0
+            result["frame_latency"] = self.measured_frame_latency()
+            result["pan_direction"], result["pan_duration"] = self.search.update(
+                self.frame_time, result["frame_latency"]
+            )
+            result["search"] = self.search.state
 
+        # Cada resultado es un comando (o el plan vigente): se integra en el rumbo
+        if result["pan_velocity"] is not None and not result["pan_duration"]:
+            result["seq"] = self.pan_heading.set_velocity(
+                result["pan_velocity"], self.frame_time, self.plan["hold_ms"] / 1000
+            )
+        else:
+            result["seq"] = self.pan_heading.apply(
+                result["pan_direction"], result["pan_duration"], self.frame_time
+            )
+        result["pan"] = self.pan_heading.heading
         return result
 
-    def draw_annotations(self, frame, result, fps):
-        """Dibujar anotaciones optimizadas"""
-        annotated = frame.copy()
+    def measured_frame_latency(self):
+        """s entre capturar un frame y tener su detección (p50 del loop)"""
+        if self.frame_latency is not None:
+            return self.frame_latency
+        histograms = self.stats.histograms
+        if histograms["loop"].count:
+            return histograms["loop"].percentile(50) / 1e9
+        detect_ns = sum(
+            histograms[stage].percentile(50)
+            for stage in ("resize", "infer", "postprocess")
+            if histograms[stage].count
+        )
+        return detect_ns / 1e9 if detect_ns else SEARCH_CONFIG["frame_latency"]
+
+    def apply_ack(self, ack):
+        """Corregir el rumbo con el ack del ESP32 ({"seq", "pan", "moving"}), si llegó uno"""
+        if ack and ack.get("pan") is not None:
+            self.pan_heading.correct(ack.get("seq"), ack["pan"], ack.get("moving", False))
+
+    def draw_annotations(self, frame, result, fps, in_place=False):
+        """Dibujar anotaciones optimizadas
+
+        El HUD fijo (centro) viene pre-renderizado y los textos
+        salen de la caché del overlay. Con in_place=True se dibuja sobre el
+        propio frame; si no, sobre el buffer de salida reutilizado.
+        """
+        overlay = self.overlay
+        annotated = overlay.begin(frame, in_place)
+        white = (255, 255, 255)
 
         # Dibujar todas las caras
         if result["all_faces"]:
             for face in result["all_faces"]:
                 x, y, w, h = face["bbox"]
-                class_name = face["class_name"] if face["class_name"] else "unknown"
+                person = face["person"]
+                if person is not None:
+                    label = person.label
+                else:
+                    label = face["class_name"].upper() if face["class_name"] else "UNKNOWN"
                 confidence = face["confidence"]
                 confidence_percent = confidence * 100
 
-                color = PERSON_COLORS.get(class_name.lower(), PERSON_COLORS["unknown"])
-                thickness = (
-                    3
-                    if (result["target_locked"] and face == result["target_face"])
-                    else 2
-                )
+                color = self.people.color_for(person)
+                is_target = result["target_locked"] and face == result["target_face"]
+                thickness = 3 if is_target else 2
 
                 # Rectángulo
                 cv2.rectangle(annotated, (x, y), (x + w, y + h), color, thickness)
 
-                # Etiqueta
-                label = f"{class_name.upper()}: {confidence_percent:.1f}%"
-                if result["target_locked"] and face == result["target_face"]:
-                    label = f">>> {label} <<<"
+                # Etiqueta: nombre cacheado + porcentaje glifo a glifo
+                prefix = f"{label}: "
+                suffix = ""
+                if is_target:
+                    prefix = f">>> {prefix}"
+                    suffix = " <<<"
+                value = f"{confidence_percent:.1f}%"
 
-                (text_w, text_h), _ = cv2.getTextSize(
-                    label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2
-                )
+                text_w, text_h = overlay.measure_label(prefix, value, 0.6, 2, suffix)
                 cv2.rectangle(
                     annotated, (x, y - text_h - 10), (x + text_w, y), color, -1
                 )
-                cv2.putText(
-                    annotated,
-                    label,
-                    (x, y - 5),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    0.6,
-                    (255, 255, 255),
-                    2,
+                overlay.draw_label(
+                    annotated, prefix, value, (x, y - 5), 0.6, white, 2, suffix
                 )
 
                 # Barra de confianza
@@ -318,55 +644,28 @@ class FaceTracker:
             )
 
             # Distancia al centro
-            cv2.putText(
+            overlay.draw_label(
                 annotated,
-                f"Dist: {result['distance_to_center']:.0f}px",
+                "Dist: ",
+                f"{result['distance_to_center']:.0f}px",
                 (10, 60),
-                cv2.FONT_HERSHEY_SIMPLEX,
                 0.6,
-                (255, 255, 255),
+                white,
                 2,
             )
 
-        # Centro del frame
-        cv2.drawMarker(
-            annotated, self.frame_center, (0, 255, 255), cv2.MARKER_CROSS, 20, 2
-        )
-
-        # Zona muerta
-        cv2.rectangle(
-            annotated,
-            (
-                self.frame_center[0] - DEADZONE["x"],
-                self.frame_center[1] - DEADZONE["y"],
-            ),
-            (
-                self.frame_center[0] + DEADZONE["x"],
-                self.frame_center[1] + DEADZONE["y"],
-            ),
-            (255, 255, 0),
-            1,
-        )
+        # Centro del frame (capa estática) y zona muerta del rostro actual
+        overlay.draw_static(annotated)
+        overlay.draw_deadzone(annotated, result["deadzone"], self.deadzone.config["release_ratio"])
 
         # Info del sistema
-        cv2.putText(
-            annotated,
-            f"FPS: {fps:.1f}",
-            (10, 30),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            0.7,
-            (0, 255, 0),
-            2,
-        )
+        overlay.draw_label(annotated, "FPS: ", f"{fps:.1f}", (10, 30), 0.7, (0, 255, 0), 2)
 
-        cv2.putText(
-            annotated,
-            f"Pan: {result['pan_direction']} Tilt: {result['tilt_angle']:.1f}°",
-            (10, 90),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            0.6,
-            (255, 255, 255),
-            2,
+        x = overlay.draw_text(
+            annotated, f"Pan: {result['pan_direction']} Tilt: ", (10, 90), 0.6, white, 2
+        )
+        overlay.draw_label(
+            annotated, "", f"{result['tilt_angle']:.1f}", (x, 90), 0.6, white, 2, "°"
         )
 
         target_text = (
@@ -374,30 +673,14 @@ class FaceTracker:
             if self.target_person
             else "No Target"
         )
-        cv2.putText(
-            annotated,
-            target_text,
-            (10, 120),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            0.7,
-            (255, 255, 255),
-            2,
-        )
+        overlay.draw_text(annotated, target_text, (10, 120), 0.7, white, 2)
 
         status = "🎯 TRACKING" if result["target_locked"] else "🔍 SEARCHING"
         color = (0, 255, 0) if result["target_locked"] else (0, 165, 255)
-        cv2.putText(
-            annotated, status, (10, 150), cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2
-        )
+        overlay.draw_text(annotated, status, (10, 150), 0.7, color, 2)
 
-        cv2.putText(
-            annotated,
-            f"Faces: {len(result['all_faces'])}",
-            (10, 180),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            0.6,
-            (255, 255, 255),
-            2,
+        overlay.draw_label(
+            annotated, "Faces: ", str(len(result["all_faces"])), (10, 180), 0.6, white, 2
         )
 
         return annotated
@@ -407,3 +690,11 @@ class FaceTracker:
         self.pid_pan.reset()
         self.pid_tilt.reset()
         self.last_face_center = None
+        self.was_locked = False
+        self.center_started = None
+        self.last_error = None
+        self.last_pan_direction = "stop"
+        self.last_pan_duration = 0.0
+        self.last_pan_velocity = 0.0
+        self.deadzone.reset()
+        self.search.reset()
@@ -0,0 +1,400 @@
+# cSpell: disable
+# pylint: disable=all
+# ruff: noqa
+
+"""
+Cuántos comandos por segundo absorbe el firmware (esp32/main.py), en CPython
+
+El firmware corre con los shims de esp32/cpython_shims.py (PWM, WiFi,
+umqtt.simple sobre paho y su socket UDP) con su loop real: poll() y
+sleep_ms(servo_period_ms). Por MQTT (contra un LocalBroker) poll() procesa
+como mucho un mensaje; por UDP, todos los datagramas pendientes.
+LoadController, el MQTTController de esp32/test_servos_teclado.py sin
+teclado, reproduce un flujo de comandos a ritmo fijo por el transporte
+elegido (UDP con UDPTransport, como main.py --transport udp). Por mensaje
+se mide la demora en cola (envío -> inicio del procesamiento), el
+procesamiento (handle_command y el ack) y los comandos descartados o
+tardíos.
+
+Los tiempos de procesamiento son de CPython (el ESP32 es más lento); la
+cola depende sobre todo del loop (por MQTT, un mensaje por vuelta).
+
+    python firmware_bench.py
+    python firmware_bench.py --stream plan --rates 25,50,100 --count 300
+    python firmware_bench.py --transport udp --rates 50,100,200
+    python firmware_bench.py --stream comandos.jsonl --period-ms 10 --rx-buffer 8
+    python firmware_bench.py --check-udp-restart   # Código 1 si falla
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import math
+import os
+import sys
+import threading
+import time
+
+from command_transport import TRANSPORTS, UDP_HEADER, UDPTransport
+from config import PLAN_CONFIG
+from local_broker import LocalBroker
+from perf_stats import LatencyHistogram
+
+ESP32_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "esp32")
+sys.path.insert(0, ESP32_DIR)
+
+import cpython_shims  # noqa: E402
+from test_servos_teclado import MQTTController  # noqa: E402
+
+STREAMS = ("pulse", "plan")
+
+
+def pulse_stream(count=40):
+    """Pulsos como los del tracking: izquierda, stop, derecha, stop... con tilt"""
+    directions = ("left", "stop", "right", "stop")
+    payloads = []
+    for i in range(count):
+        direction = directions[i % len(directions)]
+        payloads.append(
+            {
+                "pan_direction": direction,
+                "tilt": round(130 + 10 * math.sin(i / 6), 2),
+                "duration": 0.0 if direction == "stop" else round(0.05 + 0.1 * (i % 3) / 2, 2),
+                "update_tilt": direction == "stop",
+                "tracking": True,
+                "confidence": 0.9,
+                "target": "bench",
+            }
+        )
+    return payloads
+
+
+def plan_stream(count=40, config=PLAN_CONFIG):
+    """Planes de velocidad como los de MQTTSender.send_plan"""
+    step = config["velocity_step"]
+    payloads = []
+    for i in range(count):
+        velocity = round(40 * math.sin(i / 8) / step) * step
+        payloads.append(
+            {
+                "mode": "plan",
+                "pan": [[0, velocity]],
+                "tilt": [[config["tilt_ms"], round(130 + 10 * math.sin(i / 6), 1)]],
+                "hold_ms": config["hold_ms"],
+                "tracking": True,
+            }
+        )
+    return payloads
+
+
+def load_stream(name):
+    """Flujo por nombre ("pulse", "plan") o archivo JSON Lines (un payload por línea)"""
+    if name == "pulse":
+        return pulse_stream()
+    if name == "plan":
+        return plan_stream()
+    with open(name, encoding="utf-8") as f:
+        payloads = [json.loads(line) for line in f if line.strip()]
+    if not payloads:
+        raise ValueError(f"Sin comandos en {name}")
+    return payloads
+
+
+def load_firmware():
+    """esp32/main.py como módulo nuevo (estado limpio), sin arrancar su main()"""
+    spec = importlib.util.spec_from_file_location("esp32_firmware", os.path.join(ESP32_DIR, "main.py"))
+    firmware = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(firmware)
+    return firmware
+
+
+class LoadController(MQTTController):
+    """MQTTController que reproduce un flujo de comandos a ritmo fijo
+
+    Con transport="udp" publica por UDPTransport (cabecera de secuencia
+    incluida) y hace de su listener.
+    """
+
+    def __init__(self, broker, port, topic, transport="mqtt"):
+        super().__init__(broker, port, topic)
+        self.transport = transport
+        self.sent = {}  # seq -> ns de envío
+        self.acks = 0
+
+    def connect(self):
+        if self.transport != "udp":
+            return super().connect()
+        self.client = UDPTransport(self.broker, self.port)
+        return self.client.connect(self)
+
+    def _set_connected(self, connected):
+        self.connected = connected
+
+    def _on_ack(self, payload):
+        self.acks += 1
+
+    def close(self):
+        if self.transport == "udp":
+            if self.client:
+                self.client.close()
+            return
+        super().close()
+
+    def send_payload(self, payload, seq):
+        self.sent[seq] = time.perf_counter_ns()
+        self.client.publish(self.topic, json.dumps(dict(payload, seq=seq)))
+        self.message_count += 1
+
+    def replay(self, payloads, rate, count):
+        """Enviar count comandos (repitiendo payloads) a rate por segundo"""
+        period = 1.0 / rate
+        start = time.perf_counter()
+        for i in range(count):
+            # Ritmo fijo (sin acumular el retraso de cada envío)
+            delay = start + i * period - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self.send_payload(payloads[i % len(payloads)], i + 1)
+
+
+class FirmwareRunner:
+    """El loop del firmware (poll + sleep_ms) en un hilo"""
+
+    def __init__(self, firmware):
+        self.firmware = firmware
+        self.loops = 0
+        self.running = False
+        self._thread = None
+
+    def start(self):
+        firmware = self.firmware
+        firmware.servo = firmware.ServoController()
+        firmware.servo.center()
+        firmware.open_transport()
+        self.running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def _loop(self):
+        period_ms = self.firmware.SERVO_CONFIG["servo_period_ms"]
+        while self.running:
+            self.firmware.poll()
+            time.sleep_ms(period_ms)
+            self.loops += 1
+
+    def stop(self):
+        self.running = False
+        if self._thread is not None:
+            self._thread.join(1.0)
+        if self.firmware.client is not None:
+            self.firmware.client.disconnect()
+        else:
+            self.firmware.sock.close()
+
+
+def _summary(histogram):
+    ms = 1e6
+    return {
+        "count": histogram.count,
+        "p50_ms": histogram.percentile(50) / ms,
+        "p90_ms": histogram.percentile(90) / ms,
+        "p99_ms": histogram.percentile(99) / ms,
+        "max_ms": histogram.max_ns / ms,
+        "mean_ms": histogram.mean() / ms,
+    }
+
+
+def measure(
+    payloads, rate, count=200, period_ms=None, rx_buffer=None, late_ms=100.0, settle=5.0, transport="mqtt"
+):
+    """Reproducir count comandos a rate por segundo contra el firmware"""
+    broker = LocalBroker().start()
+    cpython_shims.install(broker=("127.0.0.1", broker.port), rx_buffer=rx_buffer)
+    runner = None
+    load = None
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):  # Sin los prints del firmware
+            firmware = cpython_shims.patch(load_firmware())
+            firmware.TRANSPORT = transport
+            firmware.UDP_PORT = 0  # Puerto efímero
+            if period_ms is not None:
+                firmware.SERVO_CONFIG["servo_period_ms"] = period_ms
+            runner = FirmwareRunner(firmware).start()
+            if transport == "udp":
+                client = firmware.sock
+                port = client.getsockname()[1]
+            else:
+                client = firmware.client
+                port = broker.port
+
+            load = LoadController("127.0.0.1", port, firmware.MQTT_TOPIC.decode(), transport)
+            if not load.connect():
+                raise RuntimeError("No se pudo conectar el generador de carga")
+            load.replay(payloads, rate, count)
+
+            # Vaciar la cola (o rendirse tras settle segundos)
+            deadline = time.monotonic() + settle
+            while time.monotonic() < deadline:
+                if client.received + client.dropped >= count and not client.pending:
+                    break
+                time.sleep(0.01)
+            runner.stop()
+
+        queue = LatencyHistogram()  # Envío -> inicio del callback
+        processing = LatencyHistogram()  # Duración de mqtt_callback
+        transit = LatencyHistogram()  # Envío -> llegada al "socket" del ESP32
+        late = 0
+        first_sent = min(load.sent.values())
+        last_end = first_sent
+        header = UDP_HEADER.size if transport == "udp" else 0
+        for msg, arrived, start, end in list(client.timings):
+            seq = json.loads(msg[header:]).get("seq")
+            if seq not in load.sent:
+                continue
+            sent = load.sent[seq]
+            queue.record(start - sent)
+            processing.record(end - start)
+            transit.record(arrived - sent)
+            if start - sent > late_ms * 1e6:
+                late += 1
+            last_end = max(last_end, end)
+
+        period = firmware.SERVO_CONFIG["servo_period_ms"]
+        elapsed = (last_end - first_sent) / 1e9
+        return {
+            "transport": transport,
+            "rate": rate,
+            "count": count,
+            "servo_period_ms": period,
+            "processed": processing.count,
+            "dropped": client.dropped,  # Buffer de recepción lleno
+            "unprocessed": count - processing.count - client.dropped,  # En cola al rendirse
+            "late": late,
+            "late_ms": late_ms,
+            "throughput": processing.count / elapsed if elapsed > 0 else 0.0,
+            # Un mensaje por vuelta: vuelta = sleep_ms + lo que tarde el callback
+            "capacity": 1000.0 / (period + processing.mean() / 1e6) if processing.count else 0.0,
+            "loops": runner.loops,
+            "acks": client.published,
+            "stale_dropped": firmware.udp_dropped,  # Repetidos o fuera de orden (UDP)
+            "queue": _summary(queue),
+            "processing": _summary(processing),
+            "transit": _summary(transit),
+        }
+    finally:
+        if load is not None and load.client is not None:
+            with contextlib.redirect_stdout(io.StringIO()):
+                load.close()
+        if runner is not None and runner.running:
+            runner.stop()
+        broker.stop()
+
+
+def check_udp_restart(payloads, first=50, second=20, rate=100.0, settle=2.0):
+    """Reiniciar el emisor UDP a mitad de camino (nueva sesión, seq desde 0)
+
+    El firmware tiene que aceptar todos los datagramas de las dos sesiones.
+    Retorna (aceptados por sesión, descartados por el firmware).
+    """
+    cpython_shims.install()
+    accepted = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        firmware = cpython_shims.patch(load_firmware())
+        firmware.TRANSPORT = "udp"
+        firmware.UDP_PORT = 0
+        runner = FirmwareRunner(firmware).start()
+        port = firmware.sock.getsockname()[1]
+        try:
+            for count in (first, second):
+                # Un LoadController nuevo = un proceso de tracking nuevo
+                load = LoadController("127.0.0.1", port, firmware.MQTT_TOPIC.decode(), "udp")
+                load.connect()
+                before = firmware.message_count
+                load.replay(payloads, rate, count)
+                deadline = time.monotonic() + settle
+                while firmware.message_count - before < count and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                accepted.append(firmware.message_count - before)
+                load.close()
+        finally:
+            runner.stop()
+    return accepted, firmware.udp_dropped
+
+
+def print_report(report):
+    print(
+        f"📟 {report['transport'].upper()} {report['rate']:g} cmd/s: "
+        f"{report['processed']}/{report['count']} procesados "
+        f"| {report['dropped']} descartados | {report['unprocessed']} sin procesar "
+        f"| {report['late']} tardíos (>{report['late_ms']:g} ms) | {report['throughput']:.1f}/s absorbidos"
+    )
+    print(f"  {'':<13} {'p50':>8} {'p90':>8} {'p99':>8} {'máx':>8} {'media':>8}  (ms)")
+    for key, label in (("transit", "red"), ("queue", "cola"), ("processing", "procesamiento")):
+        s = report[key]
+        print(f"  {label:<13} {s['p50_ms']:>8.3f} {s['p90_ms']:>8.3f} {s['p99_ms']:>8.3f} "
+              f"{s['max_ms']:>8.3f} {s['mean_ms']:>8.3f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Throughput de comandos del firmware en CPython")
+    parser.add_argument("--stream", default="pulse", help="pulse, plan o archivo JSON Lines con payloads")
+    parser.add_argument("--transport", choices=TRANSPORTS, default="mqtt")
+    parser.add_argument("--rates", default="10,25,50,100", help="Comandos por segundo, separados por coma")
+    parser.add_argument("--count", type=int, default=200, help="Comandos por ritmo")
+    parser.add_argument("--period-ms", type=int, help="Reemplaza servo_period_ms del firmware")
+    parser.add_argument("--rx-buffer", type=int, help="Mensajes que caben en recepción (sin límite por defecto)")
+    parser.add_argument("--late-ms", type=float, default=100.0, help="Demora en cola desde la que es tardío")
+    parser.add_argument("--settle", type=float, default=5.0, help="Segundos para vaciar la cola al final")
+    parser.add_argument("--output", help="Guardar los reportes en JSON")
+    parser.add_argument(
+        "--check-udp-restart", action="store_true", help="Verificar que el firmware acepta un PC reiniciado"
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        payloads = load_stream(args.stream)
+        rates = [float(r) for r in args.rates.split(",") if r.strip()]
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    if args.check_udp_restart:
+        first, second = 50, 20
+        accepted, dropped = check_udp_restart(payloads, first, second)
+        ok = accepted == [first, second]
+        print(
+            f"{'✅' if ok else '❌'} UDP con reinicio del emisor: {accepted[0]}/{first} y "
+            f"{accepted[1]}/{second} aceptados | {dropped} descartados por el firmware"
+        )
+        return 0 if ok else 1
+
+    print(
+        f"🔧 Firmware esp32/main.py en CPython por {args.transport.upper()} | "
+        f"flujo: {args.stream} ({len(payloads)} comandos distintos)"
+    )
+    reports = []
+    for rate in rates:
+        report = measure(
+            payloads, rate, args.count, args.period_ms, args.rx_buffer, args.late_ms, args.settle, args.transport
+        )
+        print_report(report)
+        reports.append(report)
+
+    if reports and args.transport == "mqtt":
+        last = reports[-1]
+        print(
+            f"⚖️  Capacidad del loop ≈ {last['capacity']:.0f} cmd/s "
+            f"(un mensaje por vuelta de {last['servo_period_ms']} ms + procesamiento)"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"stream": args.stream, "transport": args.transport, "reports": reports}, f, indent=2)
+        print(f"💾 Reportes guardados en {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
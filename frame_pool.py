@@ -0,0 +1,79 @@
+# cSpell: disable
+# pylint: disable=all
+# ruff: noqa
+
+import threading
+
+import numpy as np
+
+
+class PooledFrame:
+    """Buffer de un FramePool con conteo de referencias
+
+    Quien necesite el frame más allá del frame actual (grabación, stream,
+    otro hilo) llama a retain() y luego a release(). Cuando el conteo llega
+    a cero el buffer vuelve al pool y la cámara puede reutilizarlo.
+    """
+
+    __slots__ = ("pool", "array", "refs")
+
+    def __init__(self, pool, array):
+        self.pool = pool
+        self.array = array
+        self.refs = 0
+
+    def retain(self):
+        with self.pool.lock:
+            self.refs += 1
+        return self
+
+    def release(self):
+        with self.pool.lock:
+            self.refs -= 1
+            if self.refs > 0:
+                return
+            if self.refs < 0:
+                raise RuntimeError("PooledFrame liberado más veces de las retenidas")
+            self.pool._free.append(self)
+
+
+class FramePool:
+    """Anillo de buffers pre-asignados del mismo tamaño
+
+    acquire() retorna un buffer libre con una referencia; si todos están en
+    uso se asigna uno nuevo (queda contado en allocations) y pasa a formar
+    parte del pool, así el pool crece hasta el máximo que el pipeline usa
+    realmente y en régimen estable no hay más asignaciones.
+    """
+
+    def __init__(self, shape, count=4, dtype=np.uint8):
+        self.shape = tuple(shape)
+        self.dtype = dtype
+        self.lock = threading.Lock()
+        self._free = []
+        self.size = 0
+        self.allocations = 0
+        self.reuses = 0
+
+        for _ in range(count):
+            self._free.append(self._new_frame())
+
+    def _new_frame(self):
+        self.size += 1
+        return PooledFrame(self, np.empty(self.shape, dtype=self.dtype))
+
+    def acquire(self):
+        """Tomar un buffer libre (refs = 1)"""
+        with self.lock:
+            if self._free:
+                frame = self._free.pop()
+                self.reuses += 1
+            else:
+                frame = self._new_frame()
+                self.allocations += 1
+            frame.refs = 1
+        return frame
+
+    @property
+    def free(self):
+        return len(self._free)
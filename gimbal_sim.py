@@ -0,0 +1,657 @@
+# cSpell: disable
+# pylint: disable=all
+# ruff: noqa
+
+"""
+Planta simulada cámara-sobre-gimbal para ajustar el control sin el equipo
+
+Modela el pan de rotación continua (velocidad distinta a cada lado), el
+tilt posicional con velocidad máxima de giro y la latencia de detector y de
+red. El firmware es el no bloqueante (planes de velocidad y trayectorias de
+tilt interpolados a ritmo de servo); con --legacy, el anterior: un pulso por
+frame que bloquea mientras los mensajes esperan en cola.
+Las caras salen de trayectorias programadas en ángulos del mundo y se
+proyectan con el campo de visión de la cámara. El lazo es cerrado y usa el
+código real: FaceTracker.process_detections / calculate_servo_angles con
+el reloj simulado y MQTTSender.send_tracking_result, cuyo JSON interpreta
+la planta igual que mqtt_callback del ESP32. Corre mucho más rápido que
+el tiempo real.
+
+Reporta tiempo de asentamiento, sobrepaso, comandos/s, error RMS, cola
+del firmware, aceleración media del pan (suavidad) y error del rumbo
+estimado del pan (pan_heading.py, con los acks que devuelve el firmware).
+Los barridos de ganancias corren en un pool de procesos.
+
+    python gimbal_sim.py --scenario step
+    python gimbal_sim.py --legacy
+    python gimbal_sim.py --scenario all --set pan.kp=0.3 --set pulse.pan_max_duration=0.2
+    python gimbal_sim.py --sweep pan.kp=0.1,0.2,0.3 --sweep pulse.pan_seconds_per_unit=0.003,0.005
+"""
+
+import argparse
+import contextlib
+import copy
+import io
+import itertools
+import json
+import math
+import os
+import random
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from config import CAMERA_CONFIG, PAN_HEADING_CONFIG, SERVO_CONFIG, SIM_CONFIG
+from detector_backends import Detections, empty_detections
+from face_tracker import FaceTracker
+from mqtt_sender import MQTTSender
+from person_registry import default_registry
+from session_recorder import SessionDetector
+
+
+# Trayectorias: t -> (azimut, elevación) en grados del mundo, o None si no se ve
+def _step_path(t):
+    return (0.0, 0.0) if t < 0.5 else (20.0, 6.0)
+
+
+def _steps_path(t):
+    targets = (15.0, -10.0, 12.0, -14.0)
+    return (targets[min(int(t // 2.0), len(targets) - 1)], 0.0)
+
+
+def _ramp_path(t):
+    return (8.0 * max(t - 0.5, 0.0), 0.0)
+
+
+def _sine_path(t):
+    phase = 2 * math.pi * 0.2 * t
+    return (25.0 * math.sin(phase), 6.0 * math.sin(2 * phase))
+
+
+def _tilt_path(t):
+    if t < 0.5:
+        return (0.0, 0.0)
+    return (0.0, 15.0) if t < 4.0 else (5.0, -5.0)
+
+
+def _escape_path(t):
+    # Sale rápido hacia la izquierda (el lado más lento del pan) y se queda ahí
+    return (max(-120.0 * max(t - 1.0, 0.0), -70.0), 0.0)
+
+
+def _close_path(t):
+    # Persona cerca de la cámara que se balancea sin irse
+    return (16.0 * math.sin(2 * math.pi * 0.4 * t), 2.0 * math.sin(2 * math.pi * 0.7 * t))
+
+
+def _occlusion_path(t):
+    if 3.0 <= t < 3.6:
+        return None
+    return (0.0, 0.0) if t < 0.5 else (-20.0, -5.0)
+
+
+# nombre -> (trayectoria, instantes de los saltos que se evalúan, cambios a SIM_CONFIG)
+SCENARIOS = {
+    "step": (_step_path, [0.5], {}),
+    "steps": (_steps_path, [0.0, 2.0, 4.0, 6.0], {}),
+    "tilt": (_tilt_path, [0.5, 4.0], {}),
+    "ramp": (_ramp_path, [], {}),
+    "sine": (_sine_path, [], {}),
+    "close": (_close_path, [], {"face_size": 0.4}),
+    "occlusion": (_occlusion_path, [0.5], {}),
+    "escape": (_escape_path, [1.0], {}),
+}
+
+
+class GimbalPlant:
+    """Servo 360 de pan + servo 180 de tilt detrás del firmware del ESP32
+
+    blocking=True: firmware anterior (move_pan con time.sleep). Si no, el
+    actual: check_msg + update() cada servo_period con el plan en curso.
+    """
+
+    def __init__(self, config, tilt, blocking=False):
+        self.config = config
+        self.blocking = blocking
+        self.pan = 0.0  # Rumbo de la cámara (° del mundo)
+        self.tilt = float(tilt)
+        self.tilt_setpoint = float(tilt)
+        self.pan_velocity = 0.0
+        self.busy_until = 0.0  # move_pan bloquea el firmware (time.sleep)
+        self.pending_tilt = None  # Tilt que se aplica al terminar el pulso
+        self.next_poll = 0.0
+        # Plan del firmware no bloqueante (ServoController.set_plan)
+        self.command_velocity = 0.0  # °/s que cree aplicar el firmware
+        self.pan_plan = []
+        self.tilt_plan = []
+        self.tilt_from = float(tilt)
+        self.plan_start = 0.0
+        self.plan_end = 0.0
+        self.last_update = 0.0
+        self.velocity_changes = 0.0  # Suma de |Δ velocidad| real del pan (°/s)
+        self.inbox = deque()  # (llegada, envío, payload)
+        self.executed = 0
+        self.pulses = 0  # Comandos que movieron el pan
+        self.max_backlog = 0
+        self.command_delays = []  # s entre el envío y la ejecución
+        self.firmware_heading = 0.0  # Rumbo que integra el firmware (velocidades calibradas)
+        self.acks = deque()  # (llegada al PC, ack)
+
+    def deliver(self, arrival, sent, payload):
+        # TCP conserva el orden: nada llega antes que el mensaje anterior
+        if self.inbox:
+            arrival = max(arrival, self.inbox[-1][0])
+        self.inbox.append((arrival, sent, payload))
+
+    def step(self, t, dt):
+        if self.blocking:
+            self._step_blocking(t, dt)
+        else:
+            self._step_plan(t, dt)
+
+        self.pan += self.pan_velocity * dt
+        error = self.tilt_setpoint - self.tilt
+        max_step = self.config["tilt_slew_rate"] * dt
+        self.tilt += min(max(error, -max_step), max_step)
+
+    def moving(self):
+        return bool(self.pan_velocity or self.command_velocity)
+
+    def _receive(self, t):
+        """check_msg: el primer mensaje llegado (si hay), con su demora"""
+        backlog = sum(1 for m in self.inbox if m[0] <= t)
+        self.max_backlog = max(self.max_backlog, backlog)
+        if not backlog:
+            return None
+        _, sent, payload = self.inbox.popleft()
+        self.executed += 1
+        self.command_delays.append(t - sent)
+        return payload
+
+    def _ack(self, t, payload, moving):
+        ack = {"seq": payload.get("seq"), "pan": round(self.firmware_heading, 1), "moving": moving}
+        self.acks.append((t + self.config["network_latency"], ack))
+
+    def _set_pan_velocity(self, velocity):
+        if velocity != self.pan_velocity:
+            self.velocity_changes += abs(velocity - self.pan_velocity)
+            self.pan_velocity = velocity
+
+    def _step_plan(self, t, dt):
+        """Loop del firmware actual: check_msg + update() cada servo_period"""
+        config = self.config
+        if t < self.next_poll:
+            return
+        self.next_poll = t + config["servo_period"]
+        self._update(t)
+        payload = self._receive(t)
+        if payload is not None:
+            moving = self.command_velocity != 0
+            self._execute_plan(t, payload)
+            self._ack(t, payload, moving)
+
+    def _update(self, t):
+        """ServoController.update: rumbo, velocidad y tilt del plan en t"""
+        self.firmware_heading += self.command_velocity * (t - self.last_update)
+        self.last_update = t
+        elapsed = (t - self.plan_start) * 1000
+        velocity = 0.0
+        if elapsed < self.plan_end:
+            for at, value in self.pan_plan:
+                if at > elapsed:
+                    break
+                velocity = value
+        if velocity != self.command_velocity:
+            self.command_velocity = velocity
+            # El servo gira con la velocidad real de la fracción pedida
+            if velocity:
+                direction = "right" if velocity > 0 else "left"
+                fraction = min(abs(velocity) / PAN_HEADING_CONFIG["rate"][direction], 1.0)
+                velocity = math.copysign(fraction * self.config["pan_speed"][direction], velocity)
+            self._set_pan_velocity(velocity)
+
+        if self.tilt_plan:
+            start, angle = 0.0, self.tilt_from
+            for at, target in self.tilt_plan:
+                if elapsed < at:
+                    angle += (target - angle) * (elapsed - start) / (at - start)
+                    break
+                start, angle = at, target
+            low, high = self.config["tilt_range"]
+            self.tilt_setpoint = max(low, min(high, angle))
+
+    def _set_plan(self, t, pan_plan, tilt_plan, hold_ms):
+        self._update(t)
+        self.plan_start = t
+        self.pan_plan = pan_plan
+        self.tilt_plan = tilt_plan
+        self.tilt_from = self.tilt_setpoint
+        self.plan_end = max([p[0] for p in pan_plan + tilt_plan] + [0]) + hold_ms
+        self._update(t)
+
+    def _execute_plan(self, t, data):
+        """Igual que mqtt_callback del firmware actual: plan o pulso, sin bloquear"""
+        if data.get("mode") == "plan":
+            self._set_plan(t, data.get("pan", []), data.get("tilt", []), data.get("hold_ms", 0))
+            return
+        direction = data.get("pan_direction", "stop")
+        duration = data.get("duration", None)
+        if duration is None:
+            duration = 0.3
+        if direction in ("left", "right"):
+            sign = -1.0 if direction == "left" else 1.0
+            pan = [[0, sign * PAN_HEADING_CONFIG["rate"][direction]], [duration * 1000, 0.0]]
+            self.pulses += 1
+        else:
+            pan = [[0, 0.0]]
+        self._set_plan(t, pan, [], 0)
+        if data.get("update_tilt", True):
+            low, high = self.config["tilt_range"]
+            self.tilt_setpoint = max(low, min(high, data.get("tilt", 130)))
+
+    def _step_blocking(self, t, dt):
+        config = self.config
+        if self.pan_velocity and t >= self.busy_until:
+            self._set_pan_velocity(0.0)
+            if self.pending_tilt is not None:
+                self.tilt_setpoint = self.pending_tilt
+                self.pending_tilt = None
+
+        # Loop del firmware: un check_msg cada firmware_poll si no está bloqueado
+        if t >= self.busy_until and t >= self.next_poll:
+            self.next_poll = t + config["firmware_poll"]
+            payload = self._receive(t)
+            if payload is not None:
+                # El rumbo al recibirlo (el firmware anterior nunca recibe girando)
+                self._ack(t, payload, False)
+                self._execute_blocking(t, payload)
+
+    def _execute_blocking(self, t, data):
+        """Igual que el mqtt_callback anterior: primero el pan (bloquea), después el tilt"""
+        direction = data.get("pan_direction", "stop")
+        duration = data.get("duration", None)
+        tilt = data.get("tilt", 130)
+        low, high = self.config["tilt_range"]
+        tilt = max(low, min(high, tilt))
+
+        if direction in ("left", "right"):
+            if duration is None:
+                duration = 0.3  # pan_move_duration del firmware
+            sign = -1.0 if direction == "left" else 1.0
+            self._set_pan_velocity(sign * self.config["pan_speed"][direction])
+            self.firmware_heading += sign * PAN_HEADING_CONFIG["rate"][direction] * duration
+            self.pulses += 1
+            self.busy_until = t + duration
+            self.pending_tilt = tilt if data.get("update_tilt", True) else None
+        else:
+            self._set_pan_velocity(0.0)
+            if data.get("update_tilt", True):
+                self.tilt_setpoint = tilt
+
+
+class SimLink:
+    """Cliente MQTT simulado: lo publicado llega a la planta con latencia"""
+
+    def __init__(self, plant, config, clock):
+        self.plant = plant
+        self.config = config
+        self.clock = clock
+        self.rng = random.Random(config["seed"])
+
+    def publish(self, topic, payload):
+        now = self.clock()
+        latency = self.config["network_latency"] + self.rng.uniform(0, self.config["network_jitter"])
+        self.plant.deliver(now + latency, now, json.loads(payload))
+
+
+class SimCamera:
+    """Proyección de ángulos del mundo a píxeles (cámara pinhole, FOV de CAMERA_CONFIG)"""
+
+    def __init__(self, config, width=None, height=None):
+        self.width = width or CAMERA_CONFIG["width"]
+        self.height = height or CAMERA_CONFIG["height"]
+        self.half_hfov = CAMERA_CONFIG["hfov"] / 2
+        self.half_vfov = CAMERA_CONFIG["vfov"] / 2
+        self.fx = (self.width / 2) / math.tan(math.radians(self.half_hfov))
+        self.fy = (self.height / 2) / math.tan(math.radians(self.half_vfov))
+        self.face_half = config["face_size"] * self.height / 2
+        # Menor ángulo de tilt = cámara más arriba (ver calculate_servo_angles)
+        self.tilt_reference = SERVO_CONFIG["tilt_center"]
+
+    def project(self, position, pan, tilt):
+        """Centro de la cara en píxeles o None si está fuera de cuadro"""
+        if position is None:
+            return None
+        azimuth = position[0] - pan
+        elevation = position[1] - (self.tilt_reference - tilt)
+        if abs(azimuth) >= self.half_hfov or abs(elevation) >= self.half_vfov:
+            return None
+        x = self.width / 2 + self.fx * math.tan(math.radians(azimuth))
+        y = self.height / 2 - self.fy * math.tan(math.radians(elevation))
+        return x, y
+
+    def detections(self, center, class_id, class_name):
+        if center is None:
+            return empty_detections()
+        half_h = self.face_half
+        half_w = half_h * 0.8
+        x, y = center
+        return Detections(
+            np.array([[x - half_w, y - half_h, x + half_w, y + half_h]], dtype=np.float32),
+            np.array([0.9], dtype=np.float32),
+            np.array([class_id], dtype=np.int32),
+            [class_name],
+        )
+
+
+def _set_nested(target, name, key, value):
+    parts = name.split(".")
+    for part in parts[:-1]:
+        target = target[part]
+    if parts[-1] not in target:
+        raise KeyError(f"Parámetro desconocido: {key}")
+    target[parts[-1]] = float(value)
+
+
+def apply_overrides(tracker, config, overrides):
+    """Ajustes "grupo.clave=valor": pan.*/tilt.* (PID), pulse.*, plan.*, deadzone.*, search.*, sim.*"""
+    pulse = copy.deepcopy(tracker.pulse)
+    plan = dict(tracker.plan)
+    deadzone = dict(tracker.deadzone.config)
+    search = dict(tracker.search.config)
+    for key, value in (overrides or {}).items():
+        group, _, name = key.partition(".")
+        if group in ("pan", "tilt"):
+            setattr(tracker.pid_pan if group == "pan" else tracker.pid_tilt, name, float(value))
+        elif group == "pulse":
+            _set_nested(pulse, name, key, value)
+        elif group == "plan":
+            _set_nested(plan, name, key, value)
+        elif group == "deadzone":
+            _set_nested(deadzone, name, key, value)
+        elif group == "search":
+            _set_nested(search, name, key, value)
+        elif group == "sim":
+            _set_nested(config, name, key, value)
+        else:
+            raise KeyError(f"Parámetro desconocido: {key}")
+    tracker.pulse = pulse
+    tracker.plan = plan
+    tracker.deadzone.config = deadzone
+    tracker.search.config = search
+
+
+def simulate(scenario="step", overrides=None, config=SIM_CONFIG, quiet=True, legacy=False):
+    """Correr un escenario en lazo cerrado y devolver su reporte
+
+    legacy=True: pulsos por frame con el firmware bloqueante anterior.
+    """
+    path, steps, options = SCENARIOS[scenario]
+    config = copy.deepcopy(config)
+    config.update(options)
+
+    target = default_registry().names[0]
+    sim_time = [0.0]
+    output = io.StringIO() if quiet else sys.stdout
+    with contextlib.redirect_stdout(output):
+        tracker = FaceTracker(load_model=False, detector=SessionDetector([target]))
+        tracker.clock = lambda: sim_time[0]
+        tracker.set_target_person(target)
+        tracker.set_command_mode("pulse" if legacy else "plan")
+        tracker.reset()
+    apply_overrides(tracker, config, overrides)
+
+    plant = GimbalPlant(config, tracker.current_tilt, blocking=legacy)
+    camera = SimCamera(config)
+    sender = MQTTSender(topic="sim/servo")
+    sender.command_mode = tracker.command_mode
+    sender.plan = tracker.plan
+    sender.client = SimLink(plant, config, lambda: sim_time[0])
+    sender.connected = True
+
+    # El loop de main es secuencial: captura -> detección -> envío
+    frame_period = max(1.0 / config["fps"], config["detect_latency"])
+    tracker.frame_latency = frame_period  # La búsqueda se temporiza con el loop simulado
+    dt = config["dt"]
+    duration = config["duration"]
+    next_frame = 0.0
+    pending = deque()  # (resultado listo, detecciones)
+    samples = []  # (t, error_x, error_y) con la cara a la vista
+    frames = 0
+    locked = 0
+    times_to_center = []
+    times_to_reacquire = []
+
+    with contextlib.redirect_stdout(output):
+        for i in range(int(duration / dt) + 1):
+            t = i * dt
+            if t >= next_frame:
+                next_frame += frame_period
+                center = camera.project(path(t), plant.pan, plant.tilt)
+                if center is not None:
+                    samples.append(
+                        (t, center[0] - tracker.frame_center[0], center[1] - tracker.frame_center[1])
+                    )
+                pending.append((t + config["detect_latency"], camera.detections(center, 0, target)))
+
+            while pending and pending[0][0] <= t:
+                _, detections = pending.popleft()
+                sim_time[0] = t
+                if len(detections.confidence):
+                    faces, detections = tracker.faces_from_detections(detections)
+                else:
+                    faces, detections = [], None
+                result = tracker.process_detections(faces, detections)
+                sender.send_tracking_result(result, tracker.target_person)
+                frames += 1
+                locked += result["target_locked"]
+                if result["time_to_center"] is not None:
+                    times_to_center.append(result["time_to_center"])
+                if result["time_to_reacquire"] is not None:
+                    times_to_reacquire.append(result["time_to_reacquire"])
+
+            plant.step(t, dt)
+            while plant.acks and plant.acks[0][0] <= t:
+                tracker.apply_ack(plant.acks.popleft()[1])
+
+        # Terminar los pulsos y planes en vuelo para comparar el rumbo con la planta quieta
+        while plant.inbox or plant.moving() or plant.acks:
+            t += dt
+            plant.step(t, dt)
+            while plant.acks and plant.acks[0][0] <= t:
+                tracker.apply_ack(plant.acks.popleft()[1])
+        tracker.pan_heading.advance(t)  # El último plan de velocidad también venció
+
+    report = {
+        "scenario": scenario,
+        "mode": tracker.command_mode,
+        "overrides": dict(overrides or {}),
+        "frames": frames,
+        "lock_ratio": locked / frames if frames else 0.0,
+        "commands_per_s": sender.message_count / duration,
+        "pulses_per_s": plant.pulses / duration,
+        # Suavidad: cambios de velocidad real del pan por segundo (°/s²)
+        "pan_accel_dps2": plant.velocity_changes / duration,
+        "executed": plant.executed,
+        "max_backlog": plant.max_backlog,
+        "command_delay_ms": 1000 * float(np.mean(plant.command_delays)) if plant.command_delays else 0.0,
+        "time_to_center_s": float(np.mean(times_to_center)) if times_to_center else None,
+        "reacquired": len(times_to_reacquire),
+        "searches": tracker.search.searches,
+        "time_to_reacquire_s": float(np.mean(times_to_reacquire)) if times_to_reacquire else None,
+        # Rumbo estimado (pulsos + acks) contra el real de la planta
+        "heading_error_deg": abs(tracker.pan_heading.heading - plant.pan),
+    }
+    report.update(step_metrics(samples, steps, tracker.deadzone.size, duration, config["settle_hold"]))
+    return report
+
+
+def step_metrics(samples, steps, deadzone, duration, hold):
+    """Asentamiento y sobrepaso tras cada salto; error RMS de todo el escenario"""
+    if not samples:
+        return {"rms_px": None, "settling_s": [], "overshoot_px": 0.0, "overshoot_pct": 0.0}
+    data = np.array(samples, dtype=np.float64)
+    t, ex, ey = data[:, 0], data[:, 1], data[:, 2]
+    inside = (np.abs(ex) < deadzone[0]) & (np.abs(ey) < deadzone[1])
+
+    settling = []
+    overshoot_px = 0.0
+    overshoot_pct = 0.0
+    bounds = list(steps) + [duration]
+    for start, end in zip(bounds, bounds[1:]):
+        window = np.flatnonzero((t >= start) & (t < end))
+        if not len(window):
+            settling.append(None)
+            continue
+
+        # Sobrepaso: cuánto cruza el centro hacia el lado opuesto al inicial
+        first = window[0]
+        for errors in (ex, ey):
+            sign = np.sign(errors[first])
+            if sign:
+                over = float(np.max(-sign * errors[window]))
+                if over > overshoot_px:
+                    overshoot_px = over
+                    overshoot_pct = 100.0 * over / abs(errors[first])
+
+        # Asentado: primer instante desde el cual sigue centrado hold segundos
+        settled = None
+        for k in window:
+            if t[k] + hold > end:
+                break
+            span = window[(t[window] >= t[k]) & (t[window] <= t[k] + hold)]
+            if inside[span].all():
+                settled = float(t[k] - start)
+                break
+        settling.append(settled)
+
+    return {
+        "rms_px": float(np.sqrt(np.mean(ex**2 + ey**2))),
+        "settling_s": settling,
+        "overshoot_px": overshoot_px,
+        "overshoot_pct": overshoot_pct,
+    }
+
+
+def _run_job(job):
+    scenario, overrides, legacy = job
+    return simulate(scenario, overrides, legacy=legacy)
+
+
+def parse_sweep(specs):
+    """["pan.kp=0.1,0.2", ...] -> lista de combinaciones {clave: valor}"""
+    keys = []
+    values = []
+    for spec in specs or []:
+        key, _, raw = spec.partition("=")
+        keys.append(key.strip())
+        values.append([float(v) for v in raw.split(",") if v.strip()])
+    return [dict(zip(keys, combo)) for combo in itertools.product(*values)]
+
+
+def summarize(reports, duration):
+    """Agregado de una combinación en todos los escenarios (para ordenar)"""
+    settling = [s for r in reports for s in r["settling_s"]]
+    unsettled = sum(1 for s in settling if s is None)
+    done = [s for s in settling if s is not None]
+    return {
+        "overrides": reports[0]["overrides"],
+        "unsettled": unsettled,
+        "mean_settling_s": float(np.mean(done)) if done else duration,
+        "max_overshoot_px": max(r["overshoot_px"] for r in reports),
+        "commands_per_s": float(np.mean([r["commands_per_s"] for r in reports])),
+        "pan_accel_dps2": float(np.mean([r["pan_accel_dps2"] for r in reports])),
+        "rms_px": float(np.mean([r["rms_px"] for r in reports if r["rms_px"] is not None] or [0.0])),
+    }
+
+
+def run_sweep(scenarios, combos, workers=None, legacy=False):
+    """Todas las combinaciones x escenarios en paralelo; mejores primero"""
+    jobs = [(scenario, combo, legacy) for combo in combos for scenario in scenarios]
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(jobs) == 1:
+        reports = [_run_job(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            reports = list(pool.map(_run_job, jobs, chunksize=1))
+
+    per_combo = len(scenarios)
+    summaries = [
+        summarize(reports[i : i + per_combo], SIM_CONFIG["duration"])
+        for i in range(0, len(reports), per_combo)
+    ]
+    summaries.sort(key=lambda s: (s["unsettled"], s["mean_settling_s"], s["max_overshoot_px"]))
+    return summaries, reports
+
+
+def _format_settling(values):
+    return ", ".join("-" if v is None else f"{v:.2f}" for v in values) or "-"
+
+
+def print_report(report):
+    ttc = report["time_to_center_s"]
+    print(f"🎯 {report['scenario']:<10} asentamiento [{_format_settling(report['settling_s'])}] s | "
+          f"sobrepaso {report['overshoot_px']:.0f} px ({report['overshoot_pct']:.0f}%) | "
+          f"RMS {report['rms_px'] or 0:.0f} px")
+    print(f"   {report['commands_per_s']:.1f} cmd/s ({report['pulses_per_s']:.1f} pulsos/s) | "
+          f"aceleración del pan {report['pan_accel_dps2']:.0f} °/s² | cola máx {report['max_backlog']} | "
+          f"demora {report['command_delay_ms']:.0f} ms | enganche {report['lock_ratio']:.0%} | "
+          f"a centro {'-' if ttc is None else f'{ttc:.2f} s'} | "
+          f"error de rumbo {report['heading_error_deg']:.1f}°")
+    if report["searches"]:
+        ttr = report["time_to_reacquire_s"]
+        print(f"   búsquedas {report['searches']} | recuperado {report['reacquired']} "
+              f"({'-' if ttr is None else f'{ttr:.2f} s'})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulador de gimbal para ajustar PID y pulsos")
+    parser.add_argument("--scenario", default="all", help=f"all o uno de: {', '.join(SCENARIOS)}")
+    parser.add_argument("--set", action="append", default=[], metavar="CLAVE=VALOR",
+                        help="Ajuste fijo: pan.kp, tilt.kd, pulse.pan_max_duration, plan.velocity_step, deadzone.min_scale, search.grace_time, sim.network_latency...")
+    parser.add_argument("--sweep", action="append", default=[], metavar="CLAVE=V1,V2",
+                        help="Barrido de valores (producto cartesiano)")
+    parser.add_argument("--workers", type=int, default=0, help="Procesos del barrido (0 = núcleos)")
+    parser.add_argument("--top", type=int, default=10, help="Combinaciones a mostrar en el barrido")
+    parser.add_argument("--output", help="Guardar los reportes en JSON")
+    parser.add_argument("--legacy", action="store_true",
+                        help="Pulsos por frame con el firmware bloqueante anterior (para comparar)")
+    args = parser.parse_args(argv)
+
+    scenarios = list(SCENARIOS) if args.scenario == "all" else args.scenario.split(",")
+    for name in scenarios:
+        if name not in SCENARIOS:
+            parser.error(f"Escenario desconocido: {name}")
+
+    fixed = {}
+    for item in args.set:
+        key, _, value = item.partition("=")
+        fixed[key.strip()] = float(value)
+
+    combos = [dict(fixed, **combo) for combo in parse_sweep(args.sweep)]
+    if len(combos) == 1 and not args.sweep:
+        reports = [simulate(name, fixed, legacy=args.legacy) for name in scenarios]
+        for report in reports:
+            print_report(report)
+        output = reports
+    else:
+        summaries, reports = run_sweep(scenarios, combos, args.workers, args.legacy)
+        print(f"🔬 {len(combos)} combinaciones x {len(scenarios)} escenarios")
+        print(f"  {'sin asentar':>11} {'asent. s':>9} {'sobrep. px':>10} {'cmd/s':>6} {'°/s²':>6} {'RMS px':>7}  ajustes")
+        for s in summaries[: args.top]:
+            params = " ".join(f"{k}={v:g}" for k, v in s["overrides"].items())
+            print(f"  {s['unsettled']:>11} {s['mean_settling_s']:>9.2f} {s['max_overshoot_px']:>10.0f} "
+                  f"{s['commands_per_s']:>6.1f} {s['pan_accel_dps2']:>6.0f} {s['rms_px']:>7.0f}  {params}")
+        output = {"summaries": summaries, "reports": reports}
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(output, f, indent=2)
+        print(f"💾 Reportes guardados en {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
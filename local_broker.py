@@ -0,0 +1,240 @@
+# cSpell: disable
+# pylint: disable=all
+# ruff: noqa
+
+"""
+Broker MQTT mínimo en localhost (MQTT 3.1.1, QoS 0)
+
+Sustituto local de broker.hivemq.com para benchmarks y pruebas: acepta
+CONNECT, PUBLISH, SUBSCRIBE/UNSUBSCRIBE, PINGREQ y DISCONNECT, reenvía
+cada PUBLISH a los suscriptores del topic (comodines + y #) y cuenta los
+mensajes recibidos. No guarda sesiones ni mensajes retenidos.
+
+    python local_broker.py --port 1883
+"""
+
+import argparse
+import socket
+import threading
+import time
+
+CONNECT = 1
+CONNACK = 2
+PUBLISH = 3
+PUBACK = 4
+SUBSCRIBE = 8
+SUBACK = 9
+UNSUBSCRIBE = 10
+UNSUBACK = 11
+PINGREQ = 12
+PINGRESP = 13
+DISCONNECT = 14
+
+
+def topic_matches(pattern, topic):
+    """¿El topic coincide con el filtro (con + y #)?"""
+    pattern_parts = pattern.split("/")
+    topic_parts = topic.split("/")
+    for i, part in enumerate(pattern_parts):
+        if part == "#":
+            return True
+        if i >= len(topic_parts):
+            return False
+        if part != "+" and part != topic_parts[i]:
+            return False
+    return len(pattern_parts) == len(topic_parts)
+
+
+def _encode_length(length):
+    out = bytearray()
+    while True:
+        byte = length % 128
+        length //= 128
+        if length:
+            byte |= 0x80
+        out.append(byte)
+        if not length:
+            return bytes(out)
+
+
+def _recv_exact(sock, n):
+    data = bytearray()
+    while len(data) < n:
+        chunk = sock.recv(n - len(data))
+        if not chunk:
+            raise ConnectionError("cliente desconectado")
+        data += chunk
+    return bytes(data)
+
+
+def _read_packet(sock):
+    header = _recv_exact(sock, 1)[0]
+    length = 0
+    multiplier = 1
+    while True:
+        byte = _recv_exact(sock, 1)[0]
+        length += (byte & 0x7F) * multiplier
+        if not byte & 0x80:
+            break
+        multiplier *= 128
+    return header >> 4, header & 0x0F, _recv_exact(sock, length) if length else b""
+
+
+def _read_string(data, offset):
+    size = int.from_bytes(data[offset : offset + 2], "big")
+    return data[offset + 2 : offset + 2 + size].decode("utf-8"), offset + 2 + size
+
+
+class LocalBroker:
+    """Broker MQTT en un hilo de fondo; un hilo por cliente"""
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.host = host
+        self.port = port  # 0 = puerto libre (ver self.port tras start())
+        self.running = False
+        self.message_count = 0
+        self.bytes_received = 0
+        self.last_payload = None
+
+        self._lock = threading.Lock()
+        self._subscriptions = {}  # socket -> [filtros]
+        self._server = None
+
+    def start(self):
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind((self.host, self.port))
+        self._server.listen(16)
+        self.port = self._server.getsockname()[1]
+        self.running = True
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        return self
+
+    def _accept_loop(self):
+        while self.running:
+            try:
+                client, _ = self._server.accept()
+            except OSError:
+                break
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=self._client_loop, args=(client,), daemon=True).start()
+
+    def _client_loop(self, client):
+        try:
+            while self.running:
+                kind, flags, body = _read_packet(client)
+
+                if kind == CONNECT:
+                    client.sendall(bytes((CONNACK << 4, 2, 0, 0)))
+
+                elif kind == PUBLISH:
+                    topic, offset = _read_string(body, 0)
+                    qos = (flags >> 1) & 0x03
+                    if qos:
+                        packet_id = body[offset : offset + 2]
+                        offset += 2
+                        if qos == 1:
+                            client.sendall(bytes((PUBACK << 4, 2)) + packet_id)
+                    payload = body[offset:]
+                    with self._lock:
+                        self.message_count += 1
+                        self.bytes_received += len(payload)
+                        self.last_payload = payload
+                    self._forward(topic, payload)
+
+                elif kind == SUBSCRIBE:
+                    packet_id = body[0:2]
+                    offset = 2
+                    granted = bytearray()
+                    filters = []
+                    while offset < len(body):
+                        pattern, offset = _read_string(body, offset)
+                        offset += 1  # QoS pedido (se concede 0)
+                        filters.append(pattern)
+                        granted.append(0)
+                    with self._lock:
+                        self._subscriptions.setdefault(client, []).extend(filters)
+                    client.sendall(
+                        bytes((SUBACK << 4,)) + _encode_length(2 + len(granted)) + packet_id + bytes(granted)
+                    )
+
+                elif kind == UNSUBSCRIBE:
+                    packet_id = body[0:2]
+                    offset = 2
+                    with self._lock:
+                        filters = self._subscriptions.get(client, [])
+                        while offset < len(body):
+                            pattern, offset = _read_string(body, offset)
+                            if pattern in filters:
+                                filters.remove(pattern)
+                    client.sendall(bytes((UNSUBACK << 4, 2)) + packet_id)
+
+                elif kind == PINGREQ:
+                    client.sendall(bytes((PINGRESP << 4, 0)))
+
+                elif kind == DISCONNECT:
+                    break
+
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            with self._lock:
+                self._subscriptions.pop(client, None)
+            client.close()
+
+    def _forward(self, topic, payload):
+        encoded_topic = topic.encode("utf-8")
+        body = len(encoded_topic).to_bytes(2, "big") + encoded_topic + payload
+        packet = bytes((PUBLISH << 4,)) + _encode_length(len(body)) + body
+        with self._lock:
+            targets = [
+                s
+                for s, filters in self._subscriptions.items()
+                if any(topic_matches(f, topic) for f in filters)
+            ]
+        for target in targets:
+            try:
+                target.sendall(packet)
+            except OSError:
+                pass
+
+    def wait_for(self, count, timeout=5.0):
+        """Esperar a haber recibido al menos count mensajes"""
+        deadline = time.monotonic() + timeout
+        while self.message_count < count and time.monotonic() < deadline:
+            time.sleep(0.005)
+        return self.message_count >= count
+
+    def stop(self):
+        self.running = False
+        if self._server is not None:
+            self._server.close()
+        with self._lock:
+            clients = list(self._subscriptions)
+        for client in clients:
+            try:
+                client.close()
+            except OSError:
+                pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Broker MQTT local (QoS 0)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1883)
+    args = parser.parse_args()
+
+    broker = LocalBroker(args.host, args.port).start()
+    print(f"📡 Broker MQTT local en {args.host}:{broker.port} (Ctrl+C para salir)")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"   {broker.message_count} mensajes recibidos")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        broker.stop()
+
+
+if __name__ == "__main__":
+    main()
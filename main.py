@@ -2,14 +2,25 @@
 # pylint: disable=all
 # ruff: noqa
 
-import cv2
-import time
-from camera_handler import CameraHandler
-from face_tracker import FaceTracker
-from esp32_controller import ESP32Controller
-from servo_file_manager import ServoFileManager
+import argparse
+from collections import deque
+from servo_file_manager import ServoFileManager, command_data
 from detection_logger import DetectionLogger
-from mqtt_sender import MQTTSender
+from control_input import ControlInput, KEY_COMMANDS
+from startup import StartupReport
+from command_dispatcher import CommandDispatcher, control_command
+from command_transport import TRANSPORTS
+from config import (
+    CAMERA_CONFIG,
+    DISPLAY_CONFIG,
+    STREAM_CONFIG,
+    METRICS_CONFIG,
+    RECORD_CONFIG,
+    TRANSPORT_CONFIG,
+)
+
+# Los módulos pesados (cv2, inference, supervision, paho, serial) se importan
+# dentro de cada fase de arranque, que corren en paralelo.
 
 
 def print_controls():
@@ -20,205 +31,405 @@ def print_controls():
     print("  q - Salir del programa")
     print("  c - Centrar servos")
     print("  r - Reset tracking")
-    print("  t - Seguir a TUTA")
-    print("  l - Seguir a LAURA")
+    for key, (command, person) in KEY_COMMANDS.items():
+        if command == "target" and person:
+            print(f"  {key} - Seguir a {person.upper()}")
     print("  n - No seguir a nadie")
     print("  h - Mostrar esta ayuda")
+    print("  (por stdin/socket también: 'target <nombre>', 'center', 'reset', 'quit')")
+    print("  (cola de prioridad: 'target <nombre1>,<nombre2>,...')")
     print("=" * 60 + "\n")
 
 
-def main():
-    print("🎯 Iniciando sistema de seguimiento facial - TIEMPO REAL")
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Seguimiento facial en tiempo real")
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        default=DISPLAY_CONFIG["headless"],
+        help="Sin ventana ni anotaciones",
+    )
+    parser.add_argument(
+        "--preview-fps", type=float, default=DISPLAY_CONFIG["preview_fps"]
+    )
+    parser.add_argument(
+        "--control",
+        choices=("none", "stdin", "socket"),
+        default=DISPLAY_CONFIG["control"],
+    )
+    parser.add_argument("--control-host", default=DISPLAY_CONFIG["control_host"])
+    parser.add_argument("--control-port", type=int, default=DISPLAY_CONFIG["control_port"])
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        default=STREAM_CONFIG["enabled"],
+        help="Servir vista previa MJPEG por HTTP",
+    )
+    parser.add_argument("--stream-port", type=int, default=STREAM_CONFIG["port"])
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        default=METRICS_CONFIG["enabled"],
+        help="Servir métricas Prometheus por HTTP (/metrics)",
+    )
+    parser.add_argument("--metrics-port", type=int, default=METRICS_CONFIG["port"])
+    parser.add_argument(
+        "--record",
+        metavar="ARCHIVO",
+        default=None,
+        help="Grabar la sesión (.fts) para replay offline",
+    )
+    parser.add_argument(
+        "--record-mode", choices=("frames", "events"), default=RECORD_CONFIG["mode"]
+    )
+    parser.add_argument(
+        "--source",
+        default=None,
+        help="Índice de cámara, archivo de video o carpeta de imágenes",
+    )
+    parser.add_argument(
+        "--multi",
+        action="store_true",
+        help="Varias cámaras con un detector compartido (MULTI_STREAM_CONFIG)",
+    )
+    parser.add_argument(
+        "--detector-workers",
+        type=int,
+        default=None,
+        help="Con --multi: procesos de detección (0 = lotes en un proceso)",
+    )
+    parser.add_argument(
+        "--transport",
+        choices=TRANSPORTS,
+        default=TRANSPORT_CONFIG["transport"],
+        help="Comandos al ESP32: mqtt (broker) o udp (directo por la LAN)",
+    )
+    parser.add_argument(
+        "--perf-dump",
+        metavar="ARCHIVO",
+        default=None,
+        help="Guardar latencias por etapa (JSON) al salir",
+    )
+    args = parser.parse_args(argv)
+
+    if args.control is None:
+        args.control = "stdin" if args.headless else "none"
+    if args.control == "none":
+        args.control = None
+    return args
+
+
+def start_camera(source=None):
+    """Fase de arranque: abrir cámara (o video / carpeta de imágenes)"""
+    from camera_handler import CameraHandler
+
+    camera = CameraHandler(source)
+    if not camera.start():
+        raise RuntimeError("No se pudo iniciar la cámara")
+    return camera
+
+
+def load_tracker():
+    """Fase de arranque: cargar modelo de detección"""
+    from face_tracker import FaceTracker
+
+    return FaceTracker()
+
+
+def connect_esp32():
+    """Fase de arranque: conectar ESP32 por serial (opcional)"""
+    from esp32_controller import ESP32Controller
 
-    # Inicializar componentes
-    camera = CameraHandler()
-    tracker = FaceTracker()
     esp32 = ESP32Controller()
+    esp32.connect()
+    return esp32
+
+
+def connect_mqtt(transport=None):
+    """Fase de arranque: conectar al broker MQTT (o UDP directo al ESP32)"""
+    from mqtt_sender import MQTTSender
+
+    mqtt = MQTTSender(transport=transport)  # NUEVO - MQTT para tiempo real
+    mqtt.connect()
+    return mqtt
+
+
+def render_annotations(tracker, frame, result, fps, mqtt):
+    """Frame anotado para la ventana o el stream MJPEG"""
+    annotated_frame = tracker.draw_annotations(frame, result, fps)
+
+    # Agregar indicador MQTT
+    mqtt_status = "🌐 MQTT: ACTIVO" if mqtt.connected else "🌐 MQTT: INACTIVO"
+    tracker.overlay.draw_text(
+        annotated_frame,
+        mqtt_status,
+        (10, 210),
+        0.6,
+        (0, 255, 0) if mqtt.connected else (0, 0, 255),
+        2,
+    )
+    return annotated_frame
+
+
+def handle_command(command, arg, tracker, dispatcher, logger):
+    """Ejecutar un comando de control. Retorna False si hay que salir."""
+    if command == "quit":
+        print("\n👋 Saliendo...")
+        return False
+
+    elif command == "center":
+        # MQTT, serial y archivo, por los mismos destinos que el tracking
+        dispatcher.send(control_command("center", 130, tracker.pan_heading.heading))
+        tracker.reset()
+        tracker.current_tilt = 130
+        print("🎯 Servos centrados")
+
+    elif command == "reset":
+        tracker.reset()
+        print("🔄 Tracking reseteado")
+
+    elif command == "target":
+        if not tracker.set_target_person(arg):
+            print(f"⚠️ Persona desconocida: {arg}")
+            return True
+        logger.log_target_change(arg)
+        if arg:
+            print(f"🎯 Siguiendo a {arg.upper()}")
+        else:
+            dispatcher.send(control_command("stop", tracker.current_tilt, tracker.pan_heading.heading))
+            print("⏸️ Sin objetivo")
+
+    elif command == "help":
+        print_controls()
+
+    return True
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    print("🎯 Iniciando sistema de seguimiento facial - TIEMPO REAL")
+
+    if args.multi:
+        from multi_stream import run_multi_stream
+
+        control = ControlInput(args.control or "stdin", host=args.control_host, port=args.control_port)
+        metrics = None
+        if args.metrics:
+            from metrics_server import MetricsServer
+
+            metrics = MetricsServer(METRICS_CONFIG["host"], args.metrics_port)
+        return run_multi_stream(
+            control, pool_workers=args.detector_workers, metrics=metrics
+        )
+
+    # Inicializar componentes: modelo, cámara, serial y broker en paralelo
+    startup = StartupReport()
+    components = startup.run_parallel(
+        {
+            "modelo": load_tracker,
+            "camara": lambda: start_camera(args.source),
+            "esp32": connect_esp32,
+            "mqtt": lambda: connect_mqtt(args.transport),
+        }
+    )
+    camera = components["camara"]
+    tracker = components["modelo"]
+    esp32 = components["esp32"]
+    mqtt = components["mqtt"]
+
     file_manager = ServoFileManager()
     logger = DetectionLogger()
-    mqtt = MQTTSender()  # NUEVO - MQTT para tiempo real
+    control = ControlInput(args.control, host=args.control_host, port=args.control_port)
 
-    if not camera.start():
-        print("❌ Error: No se pudo iniciar la cámara")
-        return
+    preview = None
+    if not args.headless:
+        from preview_window import PreviewWindow
+
+        preview = PreviewWindow(fps=args.preview_fps)
+
+    stream = None
+    if args.stream:
+        from mjpeg_server import MJPEGServer
+
+        stream = MJPEGServer(
+            host=STREAM_CONFIG["host"],
+            port=args.stream_port,
+            max_fps=STREAM_CONFIG["max_fps"],
+            jpeg_quality=STREAM_CONFIG["jpeg_quality"],
+        )
+
+    metrics_server = None
+    tracker_metrics = None
+    if args.metrics:
+        from metrics_server import MetricsServer, TrackerMetrics
+
+        metrics_server = MetricsServer(METRICS_CONFIG["host"], args.metrics_port)
 
     # Conectar ESP32 (opcional)
-    if not esp32.connect():
+    if esp32 is not None and not esp32.connected:
         print("⚠️  ESP32 no conectado (usando solo MQTT)")
 
-    # Conectar MQTT (CRÍTICO para tiempo real)
-    if not mqtt.connect():
-        print("❌ Error: No se pudo conectar a MQTT")
-        print("💡 Verifica tu conexión a Internet")
+    error = None
+    if camera is None:
+        error = "❌ Error: No se pudo iniciar la cámara"
+    elif tracker is None:
+        error = f"❌ Error: No se pudo cargar el modelo ({startup.errors.get('modelo')})"
+    elif esp32 is None:
+        error = f"❌ Error: {startup.errors.get('esp32')}"
+    elif mqtt is None or not mqtt.connected:
+        # MQTT es CRÍTICO para tiempo real
+        error = "❌ Error: No se pudo conectar a MQTT\n💡 Verifica tu conexión a Internet"
+
+    if error:
+        print(error)
+        startup.print_report()
+        if camera is not None:
+            camera.stop()
+        if mqtt is not None:
+            mqtt.close()
+        if esp32 is not None and esp32.connected:
+            esp32.close()
         return
 
     print("✅ Sistema iniciado correctamente")
     print(f"📄 Archivo de servos: {file_manager.filename}")
     print("🌐 MQTT: ACTIVO (Tiempo Real)")
+    if args.headless:
+        print("🖥️  Modo headless: sin vista previa")
     print_controls()
+    control.start()
+    if stream is not None and not stream.start():
+        stream = None
+    recorder = None
+    if args.record:
+        from session_recorder import SessionRecorder
+
+        recorder = SessionRecorder(
+            args.record,
+            args.record_mode,
+            class_names=tracker.detector.class_names,
+            meta={
+                "source": str(camera.source),
+                "target": ",".join(p.name for p in tracker.priority) or None,
+                "tilt": tracker.current_tilt,
+                "width": CAMERA_CONFIG["width"],
+                "height": CAMERA_CONFIG["height"],
+            },
+        )
+        if not recorder.start():
+            recorder = None
 
-    # Centrar servos
-    mqtt.send_position(90, 90, tracking=False)
+    # Un comando por frame, repartido sin bloquear el loop (cada destino en su hilo)
+    dispatcher = CommandDispatcher()
+    dispatcher.add("mqtt", mqtt.send_command)
     if esp32.connected:
-        esp32.center_servos()
-    time.sleep(0.5)
+        from esp32_controller import serial_position  # serial ya cargado por la fase esp32
+
+        dispatcher.add("serial", lambda position: esp32.update_position(*position), serial_position)
+    dispatcher.add("file", file_manager.write_position, command_data)
+
+    if metrics_server is not None:
+        tracker_metrics = metrics_server.add(
+            TrackerMetrics(METRICS_CONFIG["name"], tracker, mqtt, camera=camera, dispatcher=dispatcher)
+        )
+        if not metrics_server.start():
+            metrics_server = tracker_metrics = None
+
+    # Centrar servos (sin esperar: el comando es asíncrono)
+    dispatcher.send(control_command("center", tracker.current_tilt, tracker.pan_heading.heading))
 
     frame_count = 0
-    fps_samples = []
+    fps_samples = deque(maxlen=30)
+    pooled = None
+    stats = tracker.stats
 
     try:
         while True:
-            loop_start = time.time()
-
-            # Capturar frame
-            frame = camera.read()
-            if frame is None:
+            loop_start = stats.now()
+
+            # Capturar frame en un buffer del pool; el del frame anterior se
+            # devuelve aquí (nadie lo retuvo más allá de su iteración)
+            if pooled is not None:
+                pooled.release()
+            pooled = camera.read_pooled()
+            if pooled is None:
+                if camera.finished:
+                    print("\n🎞️  Fin del video")
+                    break
                 continue
+            frame = pooled.array
+            stats.lap("capture", loop_start)
 
             # Procesar tracking
             result = tracker.process_frame(frame, frame_count)
+            if frame_count == 0:
+                startup.mark("primer frame")
+                startup.print_report()
 
-            # MQTT - Enviar en TIEMPO REAL con sistema de pulsos
-            if result["target_locked"]:
-                # Sistema de pulsos: enviar pan_direction y tilt_angle
-                pan_dir = result["pan_direction"]
-                tilt_angle = result["tilt_angle"]
-
-                # Determinar duración según dirección
-                if pan_dir == "left":
-                    duration = 0.15
-                elif pan_dir == "right":
-                    duration = 0.08
-                else:
-                    duration = 0.0
-
-                # update_tilt: True solo cuando pan está detenido
-                update_tilt = pan_dir == "stop"
-
-                # Enviar comando MQTT con formato correcto
-                mqtt.send_servo_command(
-                    pan_direction=pan_dir,
-                    tilt=tilt_angle,
-                    duration=duration,
-                    update_tilt=update_tilt,
-                    tracking=True,
-                    confidence=result["target_face"]["confidence"],
-                    target=tracker.target_person,
-                )
-            else:
-                # Sin target: detener pan y mantener tilt
-                mqtt.send_servo_command(
-                    pan_direction="stop",
-                    tilt=tracker.current_tilt,
-                    duration=0.0,
-                    update_tilt=False,
-                    tracking=False,
-                )
-
-            # Actualizar archivo JSON (backup)
-            file_manager.update_from_tracking(result, tracker.target_person)
+            # Comando del frame a MQTT, serial y archivo (solo se encola)
+            t = stats.now()
+            dispatcher.dispatch(result, tracker.target_person, frame_count)
+            tracker.apply_ack(mqtt.take_ack())
+            t = stats.lap("publish", t)
 
-            # Enviar a ESP32 si está conectado (legacy)
-            if result["target_locked"] and esp32.connected:
-                esp32.update_position(result["pan_angle"], result["tilt_angle"])
+            if recorder is not None:
+                recorder.record_frame(pooled, frame_count, tracker.last_detections)
+                recorder.record_result(frame_count, result, tracker.target_person)
 
             # Log de detecciones
             if result["all_faces"] and frame_count % 30 == 0:
                 logger.log_detections(
                     result["all_faces"], result["target_face"], tracker.target_person
                 )
+                stats.lap("log", t)
 
-            # Calcular FPS
+            # Calcular FPS (últimos 30 frames)
             frame_count += 1
-            fps_samples.append(1.0 / (time.time() - loop_start + 0.001))
-            if len(fps_samples) > 30:
-                fps_samples.pop(0)
+            fps_samples.append(1e9 / (stats.now() - loop_start + 1e6))
             fps = sum(fps_samples) / len(fps_samples)
-
-            # Dibujar anotaciones
-            annotated_frame = tracker.draw_annotations(frame, result, fps)
-
-            # Agregar indicador MQTT
-            mqtt_status = "🌐 MQTT: ACTIVO" if mqtt.connected else "🌐 MQTT: INACTIVO"
-            cv2.putText(
-                annotated_frame,
-                mqtt_status,
-                (10, 210),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.6,
-                (0, 255, 0) if mqtt.connected else (0, 0, 255),
-                2,
-            )
-
-            # Mostrar
-            cv2.imshow("Face Tracking System - TIEMPO REAL", annotated_frame)
-
-            # Controles
-            key = cv2.waitKey(1) & 0xFF
-
-            if key == ord("q"):
-                print("\n👋 Saliendo...")
+            if tracker_metrics is not None:
+                tracker_metrics.observe(result, fps)
+
+            commands = control.drain()
+
+            # Vista previa y stream a su propia tasa; si nadie mira, no se anota
+            show_preview = preview is not None and preview.due()
+            send_stream = stream is not None and stream.wants_frame()
+            if show_preview or send_stream:
+                t = stats.now()
+                annotated_frame = render_annotations(tracker, frame, result, fps, mqtt)
+                t = stats.lap("annotate", t)
+
+                if send_stream:
+                    stream.submit(annotated_frame)
+
+                if show_preview:
+                    key = preview.show(annotated_frame)
+                    if key in KEY_COMMANDS:
+                        commands.append(KEY_COMMANDS[key])
+                stats.lap("display", t)
+
+            # Controles (teclado de la ventana, stdin o socket)
+            running = True
+            for command, arg in commands:
+                if tracker_metrics is not None:
+                    tracker_metrics.observe_control()
+                if recorder is not None:
+                    recorder.record_command(frame_count - 1, command, arg)
+                running = handle_command(command, arg, tracker, dispatcher, logger)
+                if not running:
+                    break
+            if not running:
                 break
-
-            elif key == ord("c"):
-                mqtt.send_servo_command(
-                    pan_direction="stop",
-                    tilt=130,
-                    duration=0.0,
-                    update_tilt=True,
-                    tracking=False,
-                )
-                if esp32.connected:
-                    esp32.center_servos()
-                tracker.reset()
-                tracker.current_tilt = 130
-                file_manager.write_position(
-                    {
-                        "pan": 90,
-                        "tilt": 130,
-                        "tracking": False,
-                        "target": None,
-                        "error": {"x": 0, "y": 0},
-                        "distance": 0,
-                        "confidence": 0,
-                    }
-                )
-                print("🎯 Servos centrados")
-
-            elif key == ord("r"):
-                tracker.reset()
-                print("🔄 Tracking reseteado")
-
-            elif key == ord("t"):
-                tracker.set_target_person("tuta")
-                logger.log_target_change("tuta")
-                print("🎯 Siguiendo a TUTA")
-
-            elif key == ord("l"):
-                tracker.set_target_person("laura")
-                logger.log_target_change("laura")
-                print("🎯 Siguiendo a LAURA")
-
-            elif key == ord("n"):
-                tracker.set_target_person(None)
-                logger.log_target_change(None)
-                mqtt.send_servo_command(
-                    pan_direction="stop",
-                    tilt=tracker.current_tilt,
-                    duration=0.0,
-                    update_tilt=False,
-                    tracking=False,
-                )
-                print("⏸️ Sin objetivo")
-
-            elif key == ord("h"):
-                print_controls()
+            stats.lap("loop", loop_start)
 
             # Mostrar stats cada 100 frames
             if frame_count % 100 == 0:
                 print(
                     f"\n📊 FPS: {fps:.1f} | Frames: {frame_count} | MQTT: {mqtt.message_count} msgs"
                 )
+                print(stats.summary_line())
+                print(f"📤 {dispatcher.summary_line()}")
                 if result["target_locked"]:
                     print(
                         f"🎯 Tracking: {tracker.target_person.upper()} "
@@ -231,19 +442,24 @@ def main():
 
     finally:
         print("🛑 Cerrando sistema...")
+        control.stop()
+        if stream is not None:
+            stream.stop()
+        if metrics_server is not None:
+            metrics_server.stop()
+        if recorder is not None:
+            recorder.close()
         camera.stop()
-        mqtt.send_servo_command(
-            pan_direction="stop",
-            tilt=130,
-            duration=0.0,
-            update_tilt=True,
-            tracking=False,
-        )
+        # Centrar y esperar a que cada destino entregue lo pendiente
+        dispatcher.send(control_command("center", 130, tracker.pan_heading.heading))
+        dispatcher.close()
         mqtt.close()
         if esp32.connected:
-            esp32.center_servos()
             esp32.close()
-        cv2.destroyAllWindows()
+        if preview is not None:
+            preview.close()
+        if args.perf_dump and stats.dump(args.perf_dump):
+            print(f"⏱️  Latencias guardadas en {args.perf_dump}")
         print("✅ Sistema cerrado correctamente")
 
 
@@ -0,0 +1,296 @@
+# cSpell: disable
+# pylint: disable=all
+# ruff: noqa
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+QUANTILES = (50, 95, 99)
+PREFIX = "facetracker"
+
+
+class TrackerMetrics:
+    """Contadores de una cámara, escritos solo por el loop de tracking
+
+    El loop es el único escritor: actualiza enteros y floats sueltos
+    (asignaciones atómicas en CPython) y nunca toma un lock. El servidor de
+    métricas los lee tal cual; en el peor caso un scrape ve un frame de
+    diferencia entre dos contadores.
+    """
+
+    def __init__(self, name, tracker, mqtt=None, camera=None, stream=None, dispatcher=None):
+        self.name = name
+        self.tracker = tracker
+        self.mqtt = mqtt
+        self.camera = camera
+        self.stream = stream  # CameraStream en modo multi-cámara (frames descartados)
+        self.dispatcher = dispatcher  # CommandDispatcher (contadores por destino)
+
+        self.frames = 0
+        self.locked_frames = 0
+        self.fps = 0.0
+        self.person_detections = {}  # class_name -> detecciones acumuladas
+        self.control_commands = 0  # Comandos del operador (los de servos los cuenta mqtt)
+        self.last_control_time = None
+
+    def observe(self, result, fps=None):
+        """Registrar un frame procesado (llamar desde el loop)"""
+        self.frames += 1
+        if result["target_locked"]:
+            self.locked_frames += 1
+        if fps is not None:
+            self.fps = fps
+
+        counts = self.person_detections
+        for face in result["all_faces"]:
+            name = face["class_name"]
+            counts[name] = counts.get(name, 0) + 1
+
+    def observe_control(self):
+        """Registrar un comando de control del operador (target, center...)"""
+        self.control_commands += 1
+        self.last_control_time = time.time()
+
+    def dropped_frames(self):
+        if self.stream is not None:
+            return self.stream.frames_dropped
+        if self.camera is not None:
+            return self.camera.frames_failed
+        return 0
+
+
+class MetricsServer:
+    """Endpoint HTTP /metrics en formato de texto de Prometheus
+
+    Corre en un hilo aparte; el loop solo actualiza TrackerMetrics.
+    """
+
+    def __init__(self, host="0.0.0.0", port=9100):
+        self.host = host
+        self.port = port
+        self.sources = []
+        self.started = time.time()
+        self.scrapes = 0
+        self._httpd = None
+        self._thread = None
+
+    def add(self, metrics):
+        self.sources.append(metrics)
+        return metrics
+
+    def start(self):
+        """Iniciar servidor HTTP en segundo plano"""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = server.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        try:
+            self._httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+            self._httpd.daemon_threads = True
+        except Exception as e:
+            print(f"❌ Error iniciando servidor de métricas: {e}")
+            return False
+
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        print(f"📈 Métricas en http://{self.host}:{self.port}/metrics")
+        return True
+
+    def render(self):
+        """Texto de exposición con el estado actual de todas las cámaras"""
+        self.scrapes += 1
+        now = time.time()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{PREFIX}_{name}{_labels(labels)} {_number(value)}")
+
+        sources = list(self.sources)
+        cam = lambda m: (("camera", m.name),)
+
+        metric("uptime_seconds", "gauge", "Segundos desde el arranque", [((), now - self.started)])
+        metric("frames_total", "counter", "Frames procesados", [(cam(m), m.frames) for m in sources])
+        metric("fps", "gauge", "FPS promedio reciente", [(cam(m), m.fps) for m in sources])
+        metric(
+            "target_locked_frames_total",
+            "counter",
+            "Frames con objetivo enganchado",
+            [(cam(m), m.locked_frames) for m in sources],
+        )
+        metric(
+            "target_lock_ratio",
+            "gauge",
+            "Fracción de frames con objetivo enganchado",
+            [(cam(m), m.locked_frames / m.frames if m.frames else 0) for m in sources],
+        )
+        metric(
+            "frames_dropped_total",
+            "counter",
+            "Frames descartados o lecturas fallidas de cámara",
+            [(cam(m), m.dropped_frames()) for m in sources],
+        )
+
+        detections, rates = [], []
+        for m in sources:
+            frames = m.frames
+            for person, count in dict(m.person_detections).items():
+                labels = cam(m) + (("person", person or "unknown"),)
+                detections.append((labels, count))
+                rates.append((labels, count / frames if frames else 0))
+        metric("person_detections_total", "counter", "Detecciones de cada persona", detections)
+        metric("person_detection_rate", "gauge", "Detecciones por frame de cada persona", rates)
+
+        # Comandos de servos entregados por el destino mqtt del dispatcher
+        # (si se estanca el envío, el gauge crece)
+        with_mqtt = [m for m in sources if m.mqtt is not None]
+        metric(
+            "commands_total",
+            "counter",
+            "Comandos de servos entregados al ESP32 por el destino mqtt",
+            [
+                (cam(m), s["delivered"])
+                for m in with_mqtt
+                if m.dispatcher is not None
+                for s in m.dispatcher.stats()
+                if s["sink"] == "mqtt"
+            ],
+        )
+        metric(
+            "seconds_since_last_command",
+            "gauge",
+            "Segundos desde el último comando de servos enviado (-1 = ninguno)",
+            [
+                (cam(m), now - m.mqtt.last_send_time if m.mqtt.last_send_time else -1)
+                for m in with_mqtt
+            ],
+        )
+        metric(
+            "control_commands_total",
+            "counter",
+            "Comandos de control del operador recibidos",
+            [(cam(m), m.control_commands) for m in sources],
+        )
+        metric(
+            "seconds_since_last_control_command",
+            "gauge",
+            "Segundos desde el último comando de control (-1 = ninguno)",
+            [
+                (cam(m), now - m.last_control_time if m.last_control_time else -1)
+                for m in sources
+            ],
+        )
+
+        metric(
+            "target_searches_total",
+            "counter",
+            "Veces que se perdió al objetivo y empezó la búsqueda",
+            [(cam(m), m.tracker.search.searches) for m in sources],
+        )
+        metric(
+            "target_reacquired_total",
+            "counter",
+            "Objetivos recuperados durante la búsqueda",
+            [(cam(m), m.tracker.search.reacquired) for m in sources],
+        )
+        metric(
+            "search_given_up_total",
+            "counter",
+            "Búsquedas terminadas sin encontrar al objetivo",
+            [(cam(m), m.tracker.search.given_up) for m in sources],
+        )
+
+        metric(
+            "mqtt_messages_total",
+            "counter",
+            "Mensajes MQTT publicados",
+            [(cam(m), m.mqtt.message_count) for m in with_mqtt],
+        )
+        metric(
+            "mqtt_connected",
+            "gauge",
+            "1 si el cliente MQTT está conectado",
+            [(cam(m), int(bool(m.mqtt.connected))) for m in with_mqtt],
+        )
+
+        # Destinos de comandos (contadores de cada CommandSink, leídos sin lock)
+        sinks = [
+            (cam(m) + (("sink", s["sink"]),), s)
+            for m in sources
+            if m.dispatcher is not None
+            for s in m.dispatcher.stats()
+        ]
+        for key, help_text in (
+            ("delivered", "Comandos entregados por destino"),
+            ("failed", "Comandos que fallaron por destino"),
+            ("dropped", "Comandos descartados por cola llena"),
+            ("coalesced", "Comandos reemplazados por uno más nuevo (límite de tasa)"),
+        ):
+            metric(f"command_sink_{key}_total", "counter", help_text, [(l, s[key]) for l, s in sinks])
+        metric(
+            "command_sink_delivered_per_second",
+            "gauge",
+            "Comandos entregados por segundo (promedio desde el arranque)",
+            [(l, s["per_s"]) for l, s in sinks],
+        )
+        metric("command_sink_pending", "gauge", "Comandos en cola por destino", [(l, s["pending"]) for l, s in sinks])
+
+        # Latencias por etapa (histogramas de perf_stats leídos sin lock)
+        quantiles, counts, sums = [], [], []
+        for m in sources:
+            for stage, histogram in list(m.tracker.stats.histograms.items()):
+                count = histogram.count
+                if count == 0:
+                    continue
+                labels = cam(m) + (("stage", stage),)
+                for p in QUANTILES:
+                    quantiles.append(
+                        (labels + (("quantile", p / 100),), histogram.percentile(p) / 1e9)
+                    )
+                counts.append((labels, count))
+                sums.append((labels, histogram.total_ns / 1e9))
+        lines.append(f"# HELP {PREFIX}_stage_latency_seconds Latencia por etapa del pipeline")
+        lines.append(f"# TYPE {PREFIX}_stage_latency_seconds summary")
+        for name, samples in (("", quantiles), ("_count", counts), ("_sum", sums)):
+            for labels, value in samples:
+                lines.append(f"{PREFIX}_stage_latency_seconds{name}{_labels(labels)} {_number(value)}")
+
+        return "\n".join(lines) + "\n"
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
@@ -0,0 +1,227 @@
+# cSpell: disable
+# pylint: disable=all
+# ruff: noqa
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import cv2
+import numpy as np
+
+BOUNDARY = "frame"
+
+
+class MJPEGServer:
+    """Servidor HTTP MJPEG local para ver los frames anotados en remoto
+
+    - /stream   : flujo multipart (opcional ?fps=N, limitado a max_fps)
+    - /snapshot : último frame como JPEG
+
+    El loop de tracking solo consulta has_clients / wants_frame(); si nadie
+    está conectado no se anota ni se codifica nada. La codificación JPEG se
+    hace en un hilo aparte y cada cliente recibe siempre el último JPEG
+    disponible, así los clientes lentos pierden frames en vez de bloquear.
+    """
+
+    def __init__(self, host="0.0.0.0", port=8080, max_fps=10, jpeg_quality=70):
+        self.host = host
+        self.port = port
+        self.max_fps = max_fps
+        self.jpeg_quality = jpeg_quality
+
+        self.clients = 0
+        self.frames_encoded = 0
+        self.running = False
+
+        self._lock = threading.Lock()
+        self._new_frame = threading.Condition(self._lock)
+        self._new_jpeg = threading.Condition(threading.Lock())
+        self._pending = None  # Buffer donde copia el loop principal
+        self._encoding = None  # Buffer que lee el codificador
+        self._has_pending = False
+        self._last_submit = 0.0
+
+        self.jpeg = None
+        self.seq = 0
+
+        self._httpd = None
+        self._threads = []
+
+    @property
+    def has_clients(self):
+        return self.clients > 0
+
+    def wants_frame(self):
+        """¿Hay clientes y ya toca enviar otro frame? (lectura sin bloqueo)"""
+        if self.clients <= 0:
+            return False
+        return time.monotonic() - self._last_submit >= 1.0 / self.max_fps
+
+    def submit(self, frame):
+        """Entregar un frame anotado (se copia a un buffer propio)"""
+        if self.clients <= 0:
+            return False
+
+        with self._lock:
+            if self._pending is None or self._pending.shape != frame.shape:
+                self._pending = np.empty_like(frame)
+            np.copyto(self._pending, frame)
+            self._has_pending = True
+            self._last_submit = time.monotonic()
+            self._new_frame.notify()
+        return True
+
+    def start(self):
+        """Iniciar servidor HTTP y codificador en segundo plano"""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path in ("/", "/stream"):
+                    fps = parse_fps(parse_qs(url.query).get("fps", [None])[0], server.max_fps)
+                    if fps is None:
+                        self.send_error(400, "fps debe ser un número mayor que 0")
+                        return
+                    server._serve_stream(self, fps)
+                elif url.path == "/snapshot":
+                    server._serve_snapshot(self)
+                else:
+                    self.send_error(404)
+
+        try:
+            self._httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+            self._httpd.daemon_threads = True
+        except Exception as e:
+            print(f"❌ Error iniciando servidor MJPEG: {e}")
+            return False
+
+        self.running = True
+        for target in (self._httpd.serve_forever, self._encode_loop):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        print(f"📺 MJPEG en http://{self.host}:{self.port}/stream")
+        return True
+
+    def _encode_loop(self):
+        params = [int(cv2.IMWRITE_JPEG_QUALITY), int(self.jpeg_quality)]
+        while self.running:
+            with self._lock:
+                while self.running and not self._has_pending:
+                    self._new_frame.wait(timeout=0.5)
+                if not self.running:
+                    break
+                # Intercambiar buffers: el loop puede seguir copiando en el otro
+                self._pending, self._encoding = self._encoding, self._pending
+                self._has_pending = False
+
+            ok, buffer = cv2.imencode(".jpg", self._encoding, params)
+            if not ok:
+                continue
+
+            with self._new_jpeg:
+                self.jpeg = buffer.tobytes()
+                self.seq += 1
+                self.frames_encoded += 1
+                self._new_jpeg.notify_all()
+
+    def _add_client(self, delta):
+        with self._new_jpeg:
+            self.clients += delta
+
+    def _wait_jpeg(self, last_seq, timeout=1.0):
+        with self._new_jpeg:
+            if self.seq <= last_seq:
+                self._new_jpeg.wait(timeout=timeout)
+            return self.jpeg, self.seq
+
+    def _serve_stream(self, handler, fps):
+        interval = 1.0 / max(0.1, min(fps, self.max_fps))
+        last_seq = 0
+        last_sent = 0.0
+        dropped = 0
+
+        handler.send_response(200)
+        handler.send_header("Cache-Control", "no-cache")
+        handler.send_header(
+            "Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}"
+        )
+        handler.end_headers()
+
+        self._add_client(1)
+        try:
+            while self.running:
+                # Límite de FPS por cliente
+                wait = interval - (time.monotonic() - last_sent)
+                if wait > 0:
+                    time.sleep(wait)
+
+                jpeg, seq = self._wait_jpeg(last_seq)
+                if jpeg is None or seq == last_seq:
+                    continue
+                if last_seq:
+                    dropped += seq - last_seq - 1
+
+                handler.wfile.write(
+                    f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                    f"Content-Length: {len(jpeg)}\r\n\r\n".encode()
+                )
+                handler.wfile.write(jpeg)
+                handler.wfile.write(b"\r\n")
+                last_seq = seq
+                last_sent = time.monotonic()
+
+        except (BrokenPipeError, ConnectionResetError, OSError):
+            pass
+        finally:
+            self._add_client(-1)
+            print(f"📺 Cliente MJPEG desconectado ({dropped} frames descartados)")
+
+    def _serve_snapshot(self, handler):
+        # Esperar un frame nuevo (el último puede ser de hace rato)
+        self._add_client(1)
+        try:
+            start_seq = self.seq
+            jpeg, seq = self._wait_jpeg(start_seq, timeout=2.0)
+            if seq == start_seq:
+                jpeg = None
+        finally:
+            self._add_client(-1)
+
+        if jpeg is None:
+            handler.send_error(503)
+            return
+        handler.send_response(200)
+        handler.send_header("Content-Type", "image/jpeg")
+        handler.send_header("Content-Length", str(len(jpeg)))
+        handler.end_headers()
+        handler.wfile.write(jpeg)
+
+    def stop(self):
+        """Detener servidor"""
+        self.running = False
+        with self._lock:
+            self._new_frame.notify_all()
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+
+
+def parse_fps(value, max_fps):
+    """fps pedido por query string, limitado a (0, max_fps]; None si no es válido"""
+    if value is None:
+        return float(max_fps)
+    try:
+        fps = float(value)
+    except ValueError:
+        return None
+    if not fps > 0:  # También descarta nan
+        return None
+    return min(fps, float(max_fps))
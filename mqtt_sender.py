@@ -1,40 +1,56 @@
-import paho.mqtt.client as mqtt
 import json
 import time
 
+from command_dispatcher import command_from_result
+from command_transport import get_transport
+from config import PAN_HEADING_CONFIG, PLAN_CONFIG
+
 
 class MQTTSender:
-    """Envía datos de tracking a MQTT para control en tiempo real"""
+    """Envía datos de tracking al ESP32 para control en tiempo real
+
+    El transporte (command_transport.py) es MQTT por el broker o UDP directo
+    por la LAN: transport es su nombre, uno ya creado o None (el de
+    TRANSPORT_CONFIG).
+    """
 
     def __init__(
-        self, broker="broker.hivemq.com", port=1883, topic="facetracking/tuta/servo"
+        self,
+        broker="broker.hivemq.com",
+        port=1883,
+        topic="facetracking/tuta/servo",
+        transport=None,
     ):
         self.broker = broker
         self.port = port
         self.topic = topic
-        self.client = None
+        self.transport = transport
+        self.last_ack = None
+        self.ack_count = 0
+        self.client = None  # Transporte conectado (publish(topic, payload))
         self.connected = False
         self.message_count = 0
+        self.last_send_time = None  # time.time() del último comando publicado
+        self.command_mode = PLAN_CONFIG["command_mode"]
+        self.plan = PLAN_CONFIG
+        self.last_plan = None  # (velocidad, tilt, tracking, instante) del último plan enviado
+        self.skipped_count = 0  # Resultados sin cambio de plan (no enviados)
 
     def connect(self):
-        """Conectar al broker MQTT"""
+        """Conectar el transporte (MQTT: al broker; UDP: socket local)"""
         try:
-            self.client = mqtt.Client()
-            self.client.on_connect = self._on_connect
-            self.client.on_disconnect = self._on_disconnect
-
-            self.client.connect(self.broker, self.port, 60)
-            self.client.loop_start()
-
-            # Esperar conexión
-            timeout = 5
-            while not self.connected and timeout > 0:
-                time.sleep(0.1)
-                timeout -= 0.1
+            client = self.transport
+            if client is None or isinstance(client, str):
+                client = get_transport(client, self.broker, self.port, self.topic)
+            self.client = client
+            client.connect(self)
 
             if self.connected:
-                print(f"✓ MQTT conectado a {self.broker}")
-                print(f"  Topic: {self.topic}")
+                if client.name == "udp":
+                    print(f"✓ UDP directo a {client.address[0]}:{client.address[1]}")
+                else:
+                    print(f"✓ MQTT conectado a {self.broker}")
+                    print(f"  Topic: {self.topic}")
                 return True
             else:
                 print(f"✗ MQTT timeout conectando a {self.broker}")
@@ -44,19 +60,22 @@ class MQTTSender:
             print(f"✗ Error MQTT: {e}")
             return False
 
-    def _on_connect(self, client, userdata, flags, rc):
-        """Callback de conexión"""
-        if rc == 0:
-            self.connected = True
-        else:
-            self.connected = False
-            print(f"Error MQTT: código {rc}")
+    def _set_connected(self, connected):
+        """Estado de la conexión (lo informa el transporte)"""
+        self.connected = connected
 
-    def _on_disconnect(self, client, userdata, rc):
-        """Callback de desconexión"""
-        self.connected = False
-        if rc != 0:
-            print("MQTT desconectado inesperadamente")
+    def _on_ack(self, payload):
+        """Ack del ESP32: se guarda el último (lo consume el loop con take_ack)"""
+        try:
+            self.last_ack = json.loads(payload)
+            self.ack_count += 1
+        except ValueError:
+            pass
+
+    def take_ack(self):
+        """Último ack recibido desde la llamada anterior (o None)"""
+        ack, self.last_ack = self.last_ack, None
+        return ack
 
     def send_position(self, pan, tilt, tracking=False, confidence=0.0, target=None):
         """Enviar posición de servos por MQTT (legacy)"""
@@ -74,6 +93,7 @@ class MQTTSender:
 
             self.client.publish(self.topic, json.dumps(payload))
             self.message_count += 1
+            self.last_send_time = time.time()
             return True
 
         except Exception as e:
@@ -89,6 +109,7 @@ class MQTTSender:
         tracking=False,
         confidence=0.0,
         target=None,
+        seq=None,
     ):
         """Enviar comando de servos con sistema de pulsos (nuevo)"""
         if not self.connected:
@@ -98,15 +119,18 @@ class MQTTSender:
             payload = {
                 "pan_direction": str(pan_direction),
                 "tilt": round(float(tilt), 2),
-                "duration": round(float(duration), 2),
+                "duration": round(float(duration), 3),
                 "update_tilt": bool(update_tilt),
                 "tracking": bool(tracking),
                 "confidence": round(float(confidence), 4),
                 "target": str(target) if target else None,
             }
+            if seq is not None:
+                payload["seq"] = int(seq)
 
             self.client.publish(self.topic, json.dumps(payload))
             self.message_count += 1
+            self.last_send_time = time.time()
 
             # Debug cada 50 mensajes
             if self.message_count % 50 == 0:
@@ -119,11 +143,150 @@ class MQTTSender:
         except Exception as e:
             print(f"Error enviando MQTT: {e}")
             return False
+
+    def send_plan(
+        self,
+        pan,
+        tilt,
+        hold_ms,
+        tracking=False,
+        confidence=0.0,
+        target=None,
+        seq=None,
+    ):
+        """Enviar un plan al firmware no bloqueante
+
+        pan: [[ms, °/s], ...] velocidad desde cada instante (relativo a la llegada)
+        tilt: [[ms, °], ...] ángulos que el firmware interpola linealmente
+        hold_ms: tras el último instante el pan sigue hold_ms y se detiene solo
+        """
+        if not self.connected:
+            return False
+
+        try:
+            payload = {
+                "mode": "plan",
+                "pan": [[int(ms), round(float(v), 1)] for ms, v in pan],
+                "tilt": [[int(ms), round(float(a), 2)] for ms, a in tilt],
+                "hold_ms": int(hold_ms),
+                "tracking": bool(tracking),
+                "confidence": round(float(confidence), 4),
+                "target": str(target) if target else None,
+            }
+            if seq is not None:
+                payload["seq"] = int(seq)
+
+            self.client.publish(self.topic, json.dumps(payload))
+            self.message_count += 1
+            self.last_send_time = time.time()
+
+            # Debug cada 50 mensajes
+            if self.message_count % 50 == 0:
+                print(
+                    f"📡 MQTT #{self.message_count}: plan {pan[0][1]:+.0f}°/s | Tilt={tilt[-1][1]:.1f}° "
+                    f"| {self.skipped_count} sin cambios"
+                )
+
+            return True
+
+        except Exception as e:
+            print(f"Error enviando MQTT: {e}")
             return False
 
+    def send_tracking_result(self, result, target=None):
+        """Enviar el comando (pulso o plan) correspondiente a un resultado de tracking"""
+        return self.send_command(command_from_result(result, target))
+
+    def send_command(self, command):
+        """Enviar un ServoCommand (command_dispatcher.py); None si no había nada nuevo"""
+        if command.kind != "track":
+            # center: pan quieto y tilt al ángulo; stop: pan quieto, mantener tilt
+            self.last_plan = None
+            return self.send_servo_command(
+                pan_direction="stop",
+                tilt=command.tilt,
+                duration=0.0,
+                update_tilt=command.kind == "center",
+                tracking=False,
+            )
+
+        if self.command_mode == "plan":
+            return self._send_plan(command)
+
+        if command.locked:
+            # Sistema de pulsos: dirección, duración (del PID) y tilt
+            pan_dir = command.pan_direction
+
+            # update_tilt: True solo cuando pan está detenido
+            return self.send_servo_command(
+                pan_direction=pan_dir,
+                tilt=command.tilt,
+                duration=command.pan_duration,
+                update_tilt=pan_dir == "stop",
+                tracking=True,
+                confidence=command.confidence,
+                target=command.target,
+                seq=command.seq,
+            )
+
+        # Sin target: pulso de búsqueda (o stop) y mantener tilt
+        return self.send_servo_command(
+            pan_direction=command.pan_direction,
+            tilt=command.tilt,
+            duration=command.pan_duration,
+            update_tilt=False,
+            tracking=False,
+            seq=command.seq,
+        )
+
+    def _send_plan(self, command):
+        """Plan del comando, solo si cambió (o para mantenerlo en movimiento)"""
+        plan = self.plan
+        now = command.time
+        locked = command.locked
+        tilt = command.tilt
+        duration = command.pan_duration
+
+        if duration > 0:
+            # Pulso de búsqueda: velocidad de su dirección durante duration
+            direction = command.pan_direction
+            sign = -1.0 if direction == "left" else 1.0
+            velocity = None
+            pan = [[0, sign * PAN_HEADING_CONFIG["rate"][direction]], [duration * 1000, 0.0]]
+        else:
+            velocity = float(command.pan_velocity or 0.0)
+            pan = [[0, velocity]]
+
+        last = self.last_plan
+        changed = (
+            last is None
+            or velocity is None
+            or velocity != last[0]
+            or abs(tilt - last[1]) >= plan["tilt_tolerance"]
+            or locked != last[2]
+            or (velocity and now - last[3] >= plan["keepalive"])
+        )
+        if not changed:
+            self.skipped_count += 1
+            return None
+
+        sent = self.send_plan(
+            pan,
+            [[plan["tilt_ms"], tilt]],
+            plan["hold_ms"],
+            tracking=locked,
+            confidence=command.confidence,
+            target=command.target if locked else None,
+            seq=command.seq,
+        )
+        if sent:
+            # Solo si salió (si no, el próximo igual se reintenta). Un pulso
+            # termina quieto: los stop siguientes no lo interrumpen
+            self.last_plan = (velocity or 0.0, tilt, locked, now)
+        return sent
+
     def close(self):
         """Cerrar conexión MQTT"""
         if self.client:
-            self.client.loop_stop()
-            self.client.disconnect()
-            print(f"✓ MQTT cerrado ({self.message_count} mensajes enviados)")
+            self.client.close()
+            print(f"✓ {self.client.name.upper()} cerrado ({self.message_count} mensajes enviados)")
@@ -0,0 +1,353 @@
+# cSpell: disable
+# pylint: disable=all
+# ruff: noqa
+
+"""
+Modo multi-cámara: N fuentes comparten un solo detector en un solo proceso
+
+Cada cámara tiene su propio FaceTracker (objetivo, tilt, PID) y su propio
+topic MQTT, pero el modelo se carga una vez y los frames disponibles de
+todas las cámaras se infieren juntos en una sola llamada infer_batch.
+"""
+
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from camera_handler import CameraHandler
+from command_dispatcher import CommandDispatcher, control_command
+from detector_backends import get_backend, load_backend
+from face_tracker import FaceTracker
+from mqtt_sender import MQTTSender
+from config import CAMERA_CONFIG, MULTI_STREAM_CONFIG
+
+DETECTION_SCALE = 0.5  # Misma reducción que FaceTracker.detect_faces
+
+
+class CameraStream:
+    """Una cámara con su tracker y su topic; captura en un hilo propio"""
+
+    def __init__(self, config, detector, frame_ready):
+        self.name = config["name"]
+        self.camera = CameraHandler(config.get("source"))
+        self.tracker = FaceTracker(load_model=False, detector=detector)
+        if "target" in config:
+            self.tracker.set_target_person(config["target"])
+        self.mqtt = MQTTSender(topic=config["topic"])
+        # El envío corre en el hilo del destino: un broker lento no frena los lotes
+        self.dispatcher = CommandDispatcher()
+
+        self.frame_ready = frame_ready
+        self.latest = None
+        self.latest_seq = 0
+        self.taken_seq = 0
+        self.frames_processed = 0
+        self.frames_dropped = 0
+        self.started = time.monotonic()
+        self.metrics = None  # TrackerMetrics si hay endpoint de métricas
+        self.running = False
+        self._thread = None
+
+    def start(self):
+        if not self.camera.start():
+            print(f"❌ [{self.name}] No se pudo iniciar la cámara")
+            return False
+        if not self.mqtt.connect():
+            print(f"⚠️  [{self.name}] MQTT no conectado")
+        self.dispatcher.add("mqtt", self.mqtt.send_command)
+
+        self.running = True
+        self._thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self._thread.start()
+        return True
+
+    def _capture_loop(self):
+        while self.running:
+            pooled = self.camera.read_pooled()
+            if pooled is None:
+                time.sleep(0.005)
+                continue
+            with self.frame_ready:
+                # Si el lote anterior no lo tomó, ese frame se descarta
+                if self.latest_seq > self.taken_seq:
+                    self.frames_dropped += 1
+                    self.latest.release()
+                self.latest = pooled
+                self.latest_seq += 1
+                self.frame_ready.notify()
+
+    def fps(self):
+        elapsed = time.monotonic() - self.started
+        return self.frames_processed / elapsed if elapsed > 0 else 0.0
+
+    def has_new_frame(self):
+        return self.latest_seq > self.taken_seq
+
+    def take_frame(self):
+        """Tomar el último frame (PooledFrame: liberar con release())"""
+        self.taken_seq = self.latest_seq
+        return self.latest
+
+    def stop(self):
+        self.running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        self.camera.stop()
+        # Centrar y esperar a que se entregue lo pendiente
+        self.dispatcher.send(control_command("center", 130, self.tracker.pan_heading.heading))
+        self.dispatcher.close()
+        self.mqtt.close()
+
+
+class MultiStreamTracker:
+    """Agrupa los frames nuevos de todas las cámaras en lotes de inferencia"""
+
+    def __init__(
+        self, stream_configs=None, backend=None, pool_workers=None, config=MULTI_STREAM_CONFIG
+    ):
+        self.config = config
+        self.stream_configs = stream_configs or config["streams"]
+        self.backend_name = backend
+        # pool_workers > 0: inferencia en procesos (DetectorPool) en vez de lotes
+        self.pool_workers = (
+            config.get("pool_workers", 0) if pool_workers is None else pool_workers
+        )
+        self.frame_ready = threading.Condition()
+        self.detector = None
+        self.pool = None
+        self._seq_owner = {}
+        self._small_frames = []  # Buffers de inferencia reutilizados (uno por puesto del lote)
+        self.streams = []
+
+        self.batches = 0
+        self.batched_frames = 0
+
+    def start(self):
+        if self.pool_workers:
+            from detector_pool import DetectorPool
+
+            print(f"🔄 Iniciando {self.pool_workers} procesos de detección...")
+            # Slot del tamaño que entra al modelo; otras resoluciones se reescalan
+            shape = (
+                int(CAMERA_CONFIG["height"] * DETECTION_SCALE),
+                int(CAMERA_CONFIG["width"] * DETECTION_SCALE),
+                3,
+            )
+            self.pool = DetectorPool(self.pool_workers, self.backend_name, frame_shape=shape)
+            if not self.pool.start():
+                return False
+            # Los trackers no cargan modelo: solo post-procesan resultados
+            self.detector = get_backend(self.backend_name)
+            self.detector.class_names = list(self.pool.class_names)
+        else:
+            print(f"🔄 Cargando detector compartido para {len(self.stream_configs)} cámaras...")
+            self.detector = load_backend(self.backend_name)
+            print(f"✅ Detector listo ({self.detector.name})")
+
+        for stream_config in self.stream_configs:
+            stream = CameraStream(stream_config, self.detector, self.frame_ready)
+            if stream.start():
+                self.streams.append(stream)
+
+        return len(self.streams) > 0
+
+    def _collect_batch(self):
+        """Esperar frames nuevos y tomar hasta max_batch (uno por cámara)"""
+        with self.frame_ready:
+            # Esperar el primer frame nuevo (retorna vacío para atender comandos)
+            if not any(s.has_new_frame() for s in self.streams):
+                self.frame_ready.wait(timeout=0.1)
+
+            # Dar batch_timeout para que se sumen las demás cámaras al lote
+            deadline = time.monotonic() + self.config["batch_timeout"]
+            while True:
+                ready = [s for s in self.streams if s.has_new_frame()]
+                remaining = deadline - time.monotonic()
+                if not ready or len(ready) == len(self.streams) or remaining <= 0:
+                    break
+                self.frame_ready.wait(timeout=remaining)
+
+            ready = ready[: self.config["max_batch"]]
+            return [(s, s.take_frame()) for s in ready]
+
+    def step(self):
+        """Un lote: inferencia conjunta y control de cada cámara"""
+        if self.pool is not None:
+            return self._step_pool()
+
+        batch = self._collect_batch()
+        if not batch:
+            return []
+
+        small_frames = []
+        for i, (_, pooled) in enumerate(batch):
+            frame = pooled.array
+            size = (int(frame.shape[1] * DETECTION_SCALE), int(frame.shape[0] * DETECTION_SCALE))
+            if i >= len(self._small_frames) or self._small_frames[i].shape[:2] != size[::-1]:
+                self._small_frames[i:i + 1] = [np.empty((size[1], size[0], 3), dtype=np.uint8)]
+            small_frames.append(cv2.resize(frame, size, dst=self._small_frames[i]))
+            pooled.release()
+
+        try:
+            batch_detections = self.detector.infer_batch(small_frames)
+        except Exception as e:
+            print(f"Error en detección por lote: {e}")
+            return []
+
+        self.batches += 1
+        self.batched_frames += len(batch)
+
+        return [
+            self._control(stream, DETECTION_SCALE, detections)
+            for (stream, _), detections in zip(batch, batch_detections)
+        ]
+
+    def _control(self, stream, scale, detections):
+        tracker = stream.tracker
+        faces, detections = tracker.faces_from_detections(detections, scale)
+        result = tracker.process_detections(faces, detections)
+        stream.dispatcher.dispatch(result, tracker.target_person, stream.frames_processed)
+        tracker.apply_ack(stream.mqtt.take_ack())
+        stream.frames_processed += 1
+        if stream.metrics is not None:
+            stream.metrics.observe(result, stream.fps())
+        return stream, result
+
+    def _step_pool(self):
+        """Encolar frames nuevos en el pool y procesar los resultados en orden"""
+        pool = self.pool
+        with self.frame_ready:
+            if pool.in_flight == 0 and not any(s.has_new_frame() for s in self.streams):
+                self.frame_ready.wait(timeout=0.1)
+            waiting = [s for s in self.streams if s.has_new_frame()]
+
+        height, width = pool.frame_shape[:2]
+        for stream in waiting:
+            # Se vuelve a mirar después de cada submit: sin slot, el frame queda
+            # para el próximo paso (solo se descarta si llega otro antes)
+            if not pool.has_free_slot:
+                break
+            with self.frame_ready:
+                pooled = stream.take_frame()
+            frame_height, frame_width = pooled.array.shape[:2]
+            seq = pool.submit(pooled.array)
+            pooled.release()
+            if seq is None:
+                stream.frames_dropped += 1
+            else:
+                # Escala por eje del frame al slot, para volver a coordenadas del frame
+                scale = np.array([width / frame_width, height / frame_height] * 2, dtype=np.float32)
+                self._seq_owner[seq] = (stream, scale)
+
+        ready = pool.ready_results()
+        if not ready and pool.in_flight:
+            first = pool.get(timeout=0.02)
+            ready = [first] if first else []
+
+        if ready:
+            self.batches += 1
+            self.batched_frames += len(ready)
+        return [self._control(*self._seq_owner.pop(seq), det) for seq, det in ready]
+
+    def handle_command(self, command, arg):
+        """Comandos de control; 'target cam1:laura' elige objetivo de una cámara"""
+        streams = self.streams
+        if arg and ":" in arg:
+            name, arg = arg.split(":", 1)
+            streams = [s for s in self.streams if s.name == name]
+            arg = None if arg in ("", "none") else arg
+
+        if command == "quit":
+            return False
+        for stream in streams:
+            if stream.metrics is not None:
+                stream.metrics.observe_control()
+            if command == "target":
+                stream.tracker.set_target_person(arg)
+            elif command == "reset":
+                stream.tracker.reset()
+            elif command == "center":
+                # Por el dispatcher, como main.py (send_command descarta el último plan)
+                stream.dispatcher.send(
+                    control_command("center", 130, stream.tracker.pan_heading.heading)
+                )
+                stream.tracker.reset()
+                stream.tracker.current_tilt = 130
+        return True
+
+    def print_stats(self, elapsed):
+        avg_batch = self.batched_frames / self.batches if self.batches else 0
+        print(
+            f"\n📊 Lotes: {self.batches} | Tamaño medio: {avg_batch:.2f} | "
+            f"{self.batched_frames / elapsed:.1f} frames/s en total"
+        )
+        for s in self.streams:
+            print(
+                f"   [{s.name}] {s.frames_processed / elapsed:.1f} FPS | "
+                f"descartados {s.frames_dropped} | MQTT {s.mqtt.message_count} msgs | "
+                f"objetivo {s.tracker.target_person or '-'}"
+            )
+
+    def stop(self):
+        for stream in self.streams:
+            stream.stop()
+        if self.pool is not None:
+            self.pool.close()
+
+
+def run_multi_stream(control=None, backend=None, pool_workers=None, metrics=None):
+    """Loop principal del modo multi-cámara (sin ventana)"""
+    multi = MultiStreamTracker(backend=backend, pool_workers=pool_workers)
+    if not multi.start():
+        print("❌ Error: ninguna cámara disponible")
+        return
+
+    if metrics is not None:
+        from metrics_server import TrackerMetrics
+
+        for stream in multi.streams:
+            stream.metrics = metrics.add(
+                TrackerMetrics(
+                    stream.name,
+                    stream.tracker,
+                    stream.mqtt,
+                    stream.camera,
+                    stream,
+                    dispatcher=stream.dispatcher,
+                )
+            )
+        if not metrics.start():
+            metrics = None
+
+    if control is not None:
+        control.start()
+
+    start = time.monotonic()
+    last_report = 0
+    try:
+        while True:
+            multi.step()
+
+            if control is not None:
+                if not all(multi.handle_command(c, a) for c, a in control.drain()):
+                    print("\n👋 Saliendo...")
+                    break
+
+            # Mostrar stats cada 100 lotes
+            if multi.batches - last_report >= 100:
+                last_report = multi.batches
+                multi.print_stats(time.monotonic() - start)
+
+    except KeyboardInterrupt:
+        print("\n⚠️ Interrumpido por usuario")
+
+    finally:
+        print("🛑 Cerrando sistema...")
+        if control is not None:
+            control.stop()
+        if metrics is not None:
+            metrics.stop()
+        multi.stop()
+        print("✅ Sistema cerrado correctamente")
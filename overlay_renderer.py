@@ -0,0 +1,174 @@
+# cSpell: disable
+# pylint: disable=all
+# ruff: noqa
+
+import cv2
+import numpy as np
+from collections import OrderedDict
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+
+class TextSpriteCache:
+    """Caché de máscaras de texto: etiquetas completas (LRU) y glifos sueltos
+
+    Las máscaras no dependen del color, así que una misma etiqueta sirve
+    para cualquier color de persona.
+    """
+
+    def __init__(self, max_labels=256):
+        self.max_labels = max_labels
+        self.labels = OrderedDict()
+        self.glyphs = {}
+
+    def _render(self, text, scale, thickness):
+        (w, h), baseline = cv2.getTextSize(text, FONT, scale, thickness)
+        pad = thickness + 1
+        canvas = np.zeros((h + baseline + 2 * pad, w + 2 * pad), dtype=np.uint8)
+        cv2.putText(canvas, text, (pad, pad + h), FONT, scale, 255, thickness)
+        # (máscara, avance horizontal, desplazamiento x, desplazamiento y)
+        return canvas > 0, w, pad, pad + h
+
+    def label(self, text, scale, thickness):
+        """Máscara de una etiqueta completa (textos que se repiten)"""
+        key = (text, scale, thickness)
+        sprite = self.labels.get(key)
+        if sprite is None:
+            sprite = self._render(text, scale, thickness)
+            self.labels[key] = sprite
+            if len(self.labels) > self.max_labels:
+                self.labels.popitem(last=False)
+        else:
+            self.labels.move_to_end(key)
+        return sprite
+
+    def glyph(self, char, scale, thickness):
+        """Máscara de un carácter (para textos numéricos que cambian)"""
+        key = (char, scale, thickness)
+        sprite = self.glyphs.get(key)
+        if sprite is None:
+            sprite = self._render(char, scale, thickness)
+            self.glyphs[key] = sprite
+        return sprite
+
+    def measure(self, text, scale, thickness, dynamic=False):
+        """Ancho y alto del texto sin llamar a getTextSize cada frame"""
+        if not dynamic:
+            mask, advance, _, oy = self.label(text, scale, thickness)
+            return advance, oy - thickness - 1
+        width = 0
+        height = 0
+        for char in text:
+            _, advance, _, oy = self.glyph(char, scale, thickness)
+            width += advance
+            height = max(height, oy - thickness - 1)
+        return width, height
+
+
+def blit_mask(img, mask, x, y, color):
+    """Pintar color en img donde mask es True, con recorte en los bordes"""
+    h, w = mask.shape[:2]
+    H, W = img.shape[:2]
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + w, W), min(y + h, H)
+    if x0 >= x1 or y0 >= y1:
+        return
+    img[y0:y1, x0:x1][mask[y0 - y : y1 - y, x0 - x : x1 - x]] = color
+
+
+class OverlayRenderer:
+    """Composición del HUD: capa estática pre-renderizada + caché de textos
+
+    Dibuja sobre un buffer de salida reutilizado (sin frame.copy() por frame).
+    """
+
+    def __init__(self, frame_center):
+        self.frame_center = frame_center
+        self.text_cache = TextSpriteCache()
+
+        self._output = None
+        self._static = None  # (sprite BGR, máscara, x, y)
+        self._static_shape = None  # img.shape con que se armó (sprite y posición dependen de él)
+
+    def _build_static_layer(self, shape):
+        """Renderizar una sola vez el marcador de centro"""
+        layer = np.zeros(shape, dtype=np.uint8)
+        cv2.drawMarker(layer, self.frame_center, (0, 255, 255), cv2.MARKER_CROSS, 20, 2)
+
+        mask = layer.any(axis=2)
+        ys, xs = np.nonzero(mask)
+        if len(xs) == 0:
+            return None
+        x0, x1, y0, y1 = xs.min(), xs.max() + 1, ys.min(), ys.max() + 1
+        return (
+            layer[y0:y1, x0:x1].copy(),
+            mask[y0:y1, x0:x1].copy(),
+            int(x0),
+            int(y0),
+        )
+
+    def begin(self, frame, in_place=False):
+        """Preparar el lienzo del frame: el propio frame o el buffer reutilizado"""
+        if in_place:
+            return frame
+        if self._output is None or self._output.shape != frame.shape:
+            self._output = np.empty_like(frame)
+        np.copyto(self._output, frame)
+        return self._output
+
+    def draw_static(self, img):
+        """Componer la capa estática (marcador de centro)"""
+        if self._static_shape != img.shape:
+            self._static = self._build_static_layer(img.shape)
+            self._static_shape = img.shape
+        if self._static is None:
+            return
+        sprite, mask, x, y = self._static
+        h, w = mask.shape
+        np.copyto(img[y : y + h, x : x + w], sprite, where=mask[..., None])
+
+    def draw_deadzone(self, img, size, release_ratio):
+        """Zona muerta actual (cambia con el rostro) y su zona interior"""
+        cx, cy = self.frame_center
+        x, y = int(size[0]), int(size[1])
+        cv2.rectangle(img, (cx - x, cy - y), (cx + x, cy + y), (255, 255, 0), 1)
+        x, y = int(size[0] * release_ratio), int(size[1] * release_ratio)
+        cv2.rectangle(img, (cx - x, cy - y), (cx + x, cy + y), (128, 128, 0), 1)
+
+    def draw_text(self, img, text, org, scale, color, thickness, dynamic=False):
+        """Equivalente a cv2.putText usando máscaras cacheadas
+
+        dynamic=True compone el texto glifo a glifo (números que cambian cada
+        frame) para no llenar la caché de etiquetas. Retorna la x final.
+        """
+        x, y = org
+        if not text:
+            return x
+        if not dynamic:
+            mask, advance, ox, oy = self.text_cache.label(text, scale, thickness)
+            blit_mask(img, mask, x - ox, y - oy, color)
+            return x + advance
+
+        for char in text:
+            mask, advance, ox, oy = self.text_cache.glyph(char, scale, thickness)
+            if char != " ":
+                blit_mask(img, mask, x - ox, y - oy, color)
+            x += advance
+        return x
+
+    def draw_label(self, img, prefix, value, org, scale, color, thickness, suffix=""):
+        """Etiqueta con parte fija cacheada (prefijo/sufijo) y valor dinámico"""
+        x = self.draw_text(img, prefix, org, scale, color, thickness)
+        x = self.draw_text(img, value, (x, org[1]), scale, color, thickness, dynamic=True)
+        if suffix:
+            x = self.draw_text(img, suffix, (x, org[1]), scale, color, thickness)
+        return x
+
+    def measure_label(self, prefix, value, scale, thickness, suffix=""):
+        """Tamaño de una etiqueta compuesta por draw_label"""
+        w1, h1 = self.text_cache.measure(prefix, scale, thickness)
+        w2, h2 = self.text_cache.measure(value, scale, thickness, dynamic=True)
+        w3, h3 = (
+            self.text_cache.measure(suffix, scale, thickness) if suffix else (0, 0)
+        )
+        return w1 + w2 + w3, max(h1, h2, h3)
@@ -0,0 +1,156 @@
+# cSpell: disable
+# pylint: disable=all
+# ruff: noqa
+
+"""
+Rumbo estimado del pan (servo de rotación continua)
+
+El servo 360 no tiene posición: se mueve con pulsos de duración dada o con
+una velocidad que el firmware mantiene (modo plan). El rumbo se estima
+integrando cada pulso con la velocidad angular de su dirección
+(PAN_HEADING_CONFIG, calibrable) y cada velocidad por el tiempo que dura.
+Positivo = derecha, en grados desde el arranque, sin dar la vuelta a ±180.
+
+Cada comando lleva un número de secuencia; el ESP32 devuelve en el ack
+({"seq", "pan", "moving"}) el rumbo que integró al recibirlo. Se compara con
+el estimado al enviarlo y la diferencia corrige el rumbo. Solo se corrige si
+el pan estaba quieto en ambos lados: en movimiento la latencia de red haría
+parecer error lo que solo es demora.
+
+Calibrar una dirección (gira N pulsos y pide los grados medidos):
+    python pan_heading.py --direction left --pulses 20 --duration 0.1
+"""
+
+import argparse
+import time
+from collections import deque
+
+from config import PAN_HEADING_CONFIG
+
+
+class PanHeading:
+    def __init__(self, rates=None, heading=0.0):
+        self.rates = dict(rates or PAN_HEADING_CONFIG["rate"])  # °/s por dirección
+        self.heading = float(heading)
+        self.seq = 0  # Secuencia del último comando
+        self.acked_seq = None
+        self.velocity = 0.0  # °/s del plan en curso (modo plan)
+        self._until = 0.0  # Hasta cuándo lo mantiene el firmware
+        self._busy_until = 0.0  # Fin del último pulso
+        self._last = None  # Instante hasta el que se integró
+        # (seq, rumbo al enviarlo, quieto) de los comandos sin ack
+        self._sent = deque(maxlen=PAN_HEADING_CONFIG["max_pending"])
+
+    def delta(self, direction, duration):
+        """Grados que gira un pulso (con signo)"""
+        if direction == "left":
+            return -self.rates["left"] * duration
+        if direction == "right":
+            return self.rates["right"] * duration
+        return 0.0
+
+    def advance(self, now):
+        """Integrar la velocidad en curso hasta now"""
+        if self._last is not None and self.velocity:
+            end = min(now, self._until)
+            if end > self._last:
+                self.heading += self.velocity * (end - self._last)
+        self._last = now
+
+    def still(self, now):
+        """¿Pan quieto (sin velocidad ni pulso en curso)?"""
+        return not (self.velocity and now < self._until) and now >= self._busy_until
+
+    def apply(self, direction, duration, now=0.0):
+        """Integrar un pulso enviado (reemplaza la velocidad); retorna su secuencia"""
+        self.advance(now)
+        seq = self._record(now)
+        self.velocity = 0.0
+        self.heading += self.delta(direction, duration)
+        if direction in ("left", "right"):
+            self._busy_until = now + duration
+        return seq
+
+    def set_velocity(self, velocity, now, hold):
+        """Integrar un plan de velocidad que el firmware mantiene hold s; retorna su secuencia"""
+        self.advance(now)
+        seq = self._record(now)
+        self.velocity = float(velocity)
+        self._until = now + hold
+        return seq
+
+    def _record(self, now):
+        self.seq += 1
+        self._sent.append((self.seq, self.heading, self.still(now)))
+        return self.seq
+
+    def correct(self, seq, heading, moving=False):
+        """Ack del firmware: rumbo al recibir el comando seq"""
+        if seq is None or (self.acked_seq is not None and seq <= self.acked_seq):
+            return
+        sent = None
+        while self._sent and self._sent[0][0] <= seq:
+            entry = self._sent.popleft()
+            if entry[0] == seq:
+                sent = entry
+        self.acked_seq = seq
+        if sent is None or moving or not sent[2]:
+            return
+        offset = float(heading) - sent[1]
+        self.heading += offset
+        # Los comandos posteriores se estimaron con el mismo error
+        self._sent = deque(
+            ((s, h + offset, quiet) for s, h, quiet in self._sent), maxlen=self._sent.maxlen
+        )
+
+    def pulse_towards(self, target, max_duration):
+        """(dirección, duración) del pulso que acerca el rumbo a target"""
+        error = target - self.heading
+        direction = "right" if error > 0 else "left"
+        duration = min(abs(error) / self.rates[direction], max_duration)
+        return direction, duration
+
+    def reset(self, heading=0.0):
+        self.heading = float(heading)
+        self.velocity = 0.0
+        self._busy_until = 0.0
+        self._last = None
+        self._sent.clear()
+        self.acked_seq = None
+
+
+def calibrate_rate(degrees, pulses, duration):
+    """Velocidad angular a partir de lo que giró una serie de pulsos"""
+    return abs(degrees) / (pulses * duration)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrar la velocidad del pan por dirección")
+    parser.add_argument("--direction", choices=("left", "right"), required=True)
+    parser.add_argument("--pulses", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=0.1, help="s por pulso")
+    parser.add_argument("--pause", type=float, default=0.4, help="s entre pulsos")
+    args = parser.parse_args()
+
+    from mqtt_sender import MQTTSender
+
+    mqtt = MQTTSender()
+    if not mqtt.connect():
+        return 1
+    print(f"↔️  Marcá el rumbo inicial. Enviando {args.pulses} pulsos de {args.duration}s a la {args.direction}...")
+    time.sleep(2)
+    for _ in range(args.pulses):
+        mqtt.send_servo_command(args.direction, 130, args.duration, update_tilt=False)
+        time.sleep(args.duration + args.pause)
+    mqtt.close()
+
+    degrees = float(input("¿Cuántos grados giró? "))
+    rate = calibrate_rate(degrees, args.pulses, args.duration)
+    print(f"✅ {args.direction}: {rate:.1f} °/s")
+    print(f'   PAN_HEADING_CONFIG["rate"]["{args.direction}"] = {rate:.1f}')
+    print("   (y pan_rate_" + args.direction + " en esp32/main.py)")
+    return 0
+
+
+if __name__ == "__main__":
+    main()
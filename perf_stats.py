@@ -0,0 +1,173 @@
+# cSpell: disable
+# pylint: disable=all
+# ruff: noqa
+
+import json
+import time
+
+# Etapas del pipeline, en orden
+STAGES = (
+    "capture",
+    "resize",
+    "infer",
+    "postprocess",
+    "select",
+    "control",
+    "publish",
+    "file_write",
+    "log",
+    "annotate",
+    "display",
+    "loop",  # Frame completo
+)
+
+SUB_BITS = 3
+SUB_BUCKETS = 1 << SUB_BITS  # Sub-divisiones por potencia de 2 (error < 6%)
+NUM_BUCKETS = 64 * SUB_BUCKETS
+
+
+def _bucket(ns):
+    """Índice de bucket logarítmico con solo operaciones enteras"""
+    if ns < SUB_BUCKETS:
+        return max(ns, 0)
+    bits = ns.bit_length()
+    return (bits - SUB_BITS) * SUB_BUCKETS + (
+        (ns >> (bits - 1 - SUB_BITS)) & (SUB_BUCKETS - 1)
+    )
+
+
+def _bucket_value(index):
+    """Valor representativo (punto medio) de un bucket, en ns"""
+    if index < SUB_BUCKETS:
+        return index
+    bits = index // SUB_BUCKETS + SUB_BITS
+    shift = bits - 1 - SUB_BITS
+    lower = (SUB_BUCKETS + index % SUB_BUCKETS) << shift
+    return lower + ((1 << shift) >> 1)
+
+
+class LatencyHistogram:
+    """Histograma de latencias de tamaño fijo (sin listas que crezcan)"""
+
+    __slots__ = ("counts", "count", "total_ns", "max_ns")
+
+    def __init__(self):
+        self.counts = [0] * NUM_BUCKETS
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, ns):
+        self.counts[_bucket(ns)] += 1
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def percentile(self, p):
+        """Percentil p (0-100) en ns"""
+        if self.count == 0:
+            return 0
+        target = max(1, int(self.count * p / 100.0 + 0.5))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return min(_bucket_value(index), self.max_ns)
+        return self.max_ns
+
+    def mean(self):
+        return self.total_ns / self.count if self.count else 0
+
+    def reset(self):
+        self.counts = [0] * NUM_BUCKETS
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+
+class PerfStats:
+    """Latencias por etapa con perf_counter_ns
+
+    Uso en el loop:
+        t = stats.now()
+        ... capturar ...
+        t = stats.lap("capture", t)
+        ... inferir ...
+        t = stats.lap("infer", t)
+    """
+
+    def __init__(self, stages=STAGES):
+        self.histograms = {name: LatencyHistogram() for name in stages}
+        self.started = time.time()
+
+    now = staticmethod(time.perf_counter_ns)
+
+    def lap(self, stage, start_ns):
+        """Registrar desde start_ns hasta ahora; retorna ahora (para encadenar)"""
+        now = time.perf_counter_ns()
+        self.record(stage, now - start_ns)
+        return now
+
+    def record(self, stage, ns):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = LatencyHistogram()
+        histogram.record(ns)
+
+    def percentiles(self, stage, ps=(50, 95, 99)):
+        """Percentiles de una etapa en milisegundos"""
+        histogram = self.histograms[stage]
+        return tuple(histogram.percentile(p) / 1e6 for p in ps)
+
+    def summary(self):
+        """Resumen por etapa (solo etapas con muestras)"""
+        summary = {}
+        for stage, h in self.histograms.items():
+            if h.count == 0:
+                continue
+            p50, p95, p99 = self.percentiles(stage)
+            summary[stage] = {
+                "count": h.count,
+                "mean_ms": h.mean() / 1e6,
+                "p50_ms": p50,
+                "p95_ms": p95,
+                "p99_ms": p99,
+                "max_ms": h.max_ns / 1e6,
+            }
+        return summary
+
+    def summary_line(self, stages=None):
+        """Una línea compacta p50/p95/p99 para el print de stats"""
+        parts = []
+        for stage in stages or self.histograms:
+            h = self.histograms.get(stage)
+            if h is None or h.count == 0:
+                continue
+            p50, p95, p99 = self.percentiles(stage)
+            parts.append(f"{stage} {p50:.1f}/{p95:.1f}/{p99:.1f}")
+        return "⏱️  p50/p95/p99 ms | " + " | ".join(parts)
+
+    def dump(self, path):
+        """Guardar resumen e histogramas crudos en JSON"""
+        data = {
+            "started": self.started,
+            "dumped": time.time(),
+            "stages": self.summary(),
+            "buckets": {
+                stage: {str(_bucket_value(i)): n for i, n in enumerate(h.counts) if n}
+                for stage, h in self.histograms.items()
+                if h.count
+            },
+        }
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+            return True
+        except Exception as e:
+            print(f"❌ Error guardando estadísticas: {e}")
+            return False
+
+    def reset(self):
+        for h in self.histograms.values():
+            h.reset()
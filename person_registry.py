@@ -0,0 +1,141 @@
+# cSpell: disable
+# pylint: disable=all
+# ruff: noqa
+
+"""
+Registro de personas enroladas (nombre, class_id del modelo, color y tecla)
+
+Se carga de PEOPLE_CONFIG en config.py o de un JSON por sitio:
+    [{"name": "tuta", "hotkey": "t", "color": [255, 0, 0]},
+     {"name": "laura", "hotkey": "l", "class_id": 1}, ...]
+
+Los class_id se enlazan una vez con los nombres de clase del modelo
+(bind_classes); en el camino de detección la búsqueda es una indexación
+de lista por class_id. "class_id" explícito en la entrada tiene prioridad
+sobre el enlace por nombre. Sin "color" se asigna uno de una paleta fija.
+"""
+
+import colorsys
+import json
+from collections import namedtuple
+
+import numpy as np
+
+from config import PEOPLE_CONFIG
+
+Person = namedtuple("Person", ["name", "label", "class_id", "color", "hotkey"])
+
+# Teclas ocupadas por los comandos generales de control_input
+RESERVED_KEYS = ("q", "c", "r", "n", "h")
+
+
+def palette_color(index):
+    """Color BGR estable y bien separado para la persona index (ángulo dorado)"""
+    hue = (index * 0.618033988749895) % 1.0
+    r, g, b = colorsys.hsv_to_rgb(hue, 0.85, 0.95)
+    return (int(b * 255), int(g * 255), int(r * 255))
+
+
+class PersonRegistry:
+    def __init__(self, entries, unknown_color=(128, 128, 128)):
+        self.unknown_color = tuple(unknown_color)
+        self.people = []
+        self._by_name = {}
+        self._by_hotkey = {}
+        self._explicit_ids = {}
+        self._by_class = []
+
+        for index, entry in enumerate(entries):
+            name = str(entry["name"])
+            key = name.lower()
+            if key in self._by_name:
+                raise ValueError(f"Persona duplicada: {name}")
+
+            hotkey = entry.get("hotkey")
+            if hotkey is not None:
+                hotkey = str(hotkey).lower()
+                if len(hotkey) != 1 or hotkey in RESERVED_KEYS or hotkey in self._by_hotkey:
+                    raise ValueError(f"Tecla inválida o repetida para {name}: {hotkey!r}")
+
+            person = Person(
+                name,
+                name.upper(),
+                entry.get("class_id"),
+                tuple(entry["color"]) if entry.get("color") else palette_color(index),
+                hotkey,
+            )
+            self.people.append(person)
+            self._by_name[key] = person
+            if hotkey:
+                self._by_hotkey[hotkey] = person
+            if person.class_id is not None:
+                self._explicit_ids[person.class_id] = person
+
+        self.bind_classes([])
+
+    @classmethod
+    def from_config(cls, config=PEOPLE_CONFIG):
+        entries = config["people"]
+        if config.get("file"):
+            with open(config["file"], "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        return cls(entries, config.get("unknown_color", (128, 128, 128)))
+
+    @property
+    def names(self):
+        return [p.name for p in self.people]
+
+    def bind_classes(self, class_names):
+        """Enlazar class_id -> persona con la lista de clases del modelo"""
+        size = max([len(class_names)] + [i + 1 for i in self._explicit_ids])
+        by_class = [None] * size
+        for class_id, class_name in enumerate(class_names):
+            if class_name is not None:
+                by_class[class_id] = self._by_name.get(str(class_name).lower())
+        for class_id, person in self._explicit_ids.items():
+            by_class[class_id] = person
+        self._by_class = by_class
+        return self
+
+    def class_table(self, values, default):
+        """Arreglo por class_id con values[persona] (o default): búsqueda vectorizada"""
+        return np.array(
+            [values.get(p, default) if p is not None else default for p in self._by_class],
+            dtype=np.int32,
+        )
+
+    def by_class(self, class_id, class_name=None):
+        """Persona de una detección (por class_id; por nombre si no hay enlace)"""
+        if 0 <= class_id < len(self._by_class):
+            person = self._by_class[class_id]
+            if person is not None:
+                return person
+        if class_name:
+            return self._by_name.get(class_name) or self._by_name.get(class_name.lower())
+        return None
+
+    def get(self, name):
+        """Persona por nombre (sin distinguir mayúsculas) o None"""
+        if name is None:
+            return None
+        return self._by_name.get(str(name).lower())
+
+    def by_hotkey(self, key):
+        return self._by_hotkey.get(key)
+
+    def hotkeys(self):
+        return dict(self._by_hotkey)
+
+    def color_for(self, person):
+        return person.color if person is not None else self.unknown_color
+
+
+_default = None
+
+
+def default_registry():
+    """Registro de config.py (compartido, solo lectura)"""
+    global _default
+    if _default is None:
+        _default = PersonRegistry.from_config()
+    return _default
@@ -5,18 +5,20 @@ import time
 
 
 class PIDController:
-    def __init__(self, kp=1.0, ki=0.0, kd=0.0):
+    def __init__(self, kp=1.0, ki=0.0, kd=0.0, integral_limit=50, clock=time.monotonic):
         self.kp = kp
         self.ki = ki
         self.kd = kd
+        self.integral_limit = integral_limit
+        self.clock = clock  # Inyectable (simulación / replay)
 
         self.last_error = 0
         self.integral = 0
-        self.last_time = time.time()
+        self.last_time = self.clock()
 
     def update(self, error):
         """Actualizar PID y retornar corrección"""
-        current_time = time.time()
+        current_time = self.clock()
         dt = current_time - self.last_time
 
         if dt <= 0:
@@ -25,7 +27,7 @@ class PIDController:
         p = self.kp * error
 
         self.integral += error * dt
-        self.integral = max(-50, min(50, self.integral))
+        self.integral = max(-self.integral_limit, min(self.integral_limit, self.integral))
         i = self.ki * self.integral
 
         derivative = (error - self.last_error) / dt
@@ -36,8 +38,8 @@ class PIDController:
 
         return p + i + d
 
-    def reset(self):
-        """Resetear PID"""
-        self.last_error = 0
+    def reset(self, error=0):
+        """Resetear PID (error = error actual, evita el salto de la derivada)"""
+        self.last_error = error
         self.integral = 0
-        self.last_time = time.time()
+        self.last_time = self.clock()
@@ -0,0 +1,39 @@
+# cSpell: disable
+# pylint: disable=all
+# ruff: noqa
+
+import time
+import cv2
+
+
+class PreviewWindow:
+    """Ventana de vista previa con su propia tasa de refresco
+
+    El loop de tracking corre a la velocidad de la cámara; la anotación y
+    cv2.imshow solo se hacen cuando toca según preview_fps.
+    """
+
+    def __init__(self, title="Face Tracking System - TIEMPO REAL", fps=10):
+        self.title = title
+        self.interval = 1.0 / fps if fps and fps > 0 else 0.0
+        self.last_show = 0.0
+        self.frames_shown = 0
+
+    def due(self):
+        """¿Toca renderizar un frame de vista previa?"""
+        return time.monotonic() - self.last_show >= self.interval
+
+    def show(self, frame):
+        """Mostrar frame y retornar la tecla pulsada (o None)"""
+        self.last_show = time.monotonic()
+        self.frames_shown += 1
+        cv2.imshow(self.title, frame)
+
+        key = cv2.waitKey(1) & 0xFF
+        if key == 0xFF:
+            return None
+        return chr(key)
+
+    def close(self):
+        """Cerrar ventana"""
+        cv2.destroyAllWindows()
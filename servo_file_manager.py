@@ -5,6 +5,7 @@
 import json
 import os
 from datetime import datetime
+from command_dispatcher import command_from_result
 from config import SERVO_DATA_FILE
 
 
@@ -18,7 +19,7 @@ class ServoFileManager:
     def initialize_file(self):
         """Inicializar archivo con valores por defecto"""
         default_data = {
-            "pan": 90,
+            "pan": 0.0,
             "tilt": 90,
             "tracking": False,
             "target": None,
@@ -51,25 +52,7 @@ class ServoFileManager:
 
     def update_from_tracking(self, result, target_person=None):
         """Actualizar archivo desde resultado de tracking"""
-        data = {
-            "pan_direction": result.get("pan_direction", "stop"),
-            "pan": 90,  # Legacy, no se usa más con sistema de pulsos
-            "tilt": float(result["tilt_angle"]),
-            "tracking": result["target_locked"],
-            "target": target_person,
-            "error": {
-                "x": int(result["error"][0]),
-                "y": int(result["error"][1]),
-            },
-            "distance": float(result.get("distance_to_center", 0)),
-            "confidence": (
-                float(result["target_face"]["confidence"])
-                if result["target_face"]
-                else 0
-            ),
-        }
-
-        return self.write_position(data)
+        return self.write_position(command_data(command_from_result(result, target_person)))
 
     def read_position(self):
         """Leer posición de servos desde archivo JSON"""
@@ -89,11 +72,11 @@ class ServoFileManager:
             return None
 
     def get_servo_angles(self):
-        """Obtener solo los ángulos de pan y tilt"""
+        """Obtener rumbo estimado de pan y ángulo de tilt"""
         data = self.read_position()
         if data:
-            return data.get("pan", 90), data.get("tilt", 90)
-        return 90, 90
+            return data.get("pan", 0.0), data.get("tilt", 90)
+        return 0.0, 90
 
     def is_tracking(self):
         """Verificar si está en modo tracking"""
@@ -101,3 +84,18 @@ class ServoFileManager:
         if data:
             return data.get("tracking", False)
         return False
+
+
+def command_data(command):
+    """Contenido del archivo para un ServoCommand (codificador del destino "file")"""
+    return {
+        "pan_direction": command.pan_direction,
+        "pan_duration": command.pan_duration,
+        "pan": round(command.pan, 1),  # Rumbo estimado (°, derecha +)
+        "tilt": command.tilt,
+        "tracking": command.locked,
+        "target": command.target if command.kind == "track" else None,
+        "error": {"x": command.error[0], "y": command.error[1]},
+        "distance": command.distance,
+        "confidence": command.confidence,
+    }
@@ -0,0 +1,557 @@
+# cSpell: disable
+# pylint: disable=all
+# ruff: noqa
+
+"""
+Grabación de sesiones (frames, detecciones, resultados y comandos) y replay
+
+Contenedor .fts (binario, por bloques, con índice al final):
+
+    FTSESS01 | u32 largo | cabecera JSON
+    CHNK | u32 largo, u32 registros, f64 t_inicio, f64 t_fin | registros...
+    CHNK | ...
+    INDX | u32 largo | índice JSON [[offset, registros, t_inicio, t_fin, primer_frame], ...]
+    u64 offset del índice | FTEND
+
+Cada registro: u8 tipo, u32 frame, f64 t (segundos desde el inicio), u32 largo, datos.
+Si la sesión se cortó (sin índice), el lector lo reconstruye recorriendo los
+bloques completos.
+
+Modos de grabación:
+- frames : todos los frames (JPEG)
+- events : solo los frames alrededor de eventos (cambio de enganche,
+           comandos, mark_event); detecciones y resultados se graban siempre
+
+Replay (mismas detecciones → mismo process_frame):
+    python session_recorder.py replay sesion.fts [--speed realtime] [--redetect] [--show]
+    python session_recorder.py info sesion.fts
+"""
+
+import argparse
+import json
+import os
+import queue
+import struct
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from config import RECORD_CONFIG
+from detector_backends import DetectorBackend, Detections, empty_detections
+
+FILE_MAGIC = b"FTSESS01"
+CHUNK_MAGIC = b"CHNK"
+INDEX_MAGIC = b"INDX"
+END_MAGIC = b"FTEND"
+
+CHUNK_HEADER = struct.Struct("<IIdd")
+RECORD_HEADER = struct.Struct("<BIdI")
+FOOTER = struct.Struct("<Q")
+
+FRAME = 1  # JPEG
+DETECTIONS = 2  # float32 Nx6 (x1, y1, x2, y2, confianza, class_id) del detector
+RESULT = 3  # JSON: comando de servos que salió de ese frame
+COMMAND = 4  # JSON: comando de control
+EVENT = 5  # JSON: motivo del evento
+
+RECORD_NAMES = {FRAME: "frame", DETECTIONS: "detections", RESULT: "result", COMMAND: "command", EVENT: "event"}
+
+
+def pack_detections(detections):
+    if detections is None or len(detections.confidence) == 0:
+        return b""
+    packed = np.empty((len(detections.confidence), 6), dtype=np.float32)
+    packed[:, 0:4] = detections.xyxy
+    packed[:, 4] = detections.confidence
+    packed[:, 5] = detections.class_id
+    return packed.tobytes()
+
+
+def unpack_detections(data, class_names):
+    if not data:
+        return empty_detections()
+    packed = np.frombuffer(data, dtype=np.float32).reshape(-1, 6)
+    class_id = packed[:, 5].astype(np.int32)
+    return Detections(
+        packed[:, 0:4].copy(),
+        packed[:, 4].copy(),
+        class_id,
+        [class_names[i] if 0 <= i < len(class_names) else None for i in class_id],
+    )
+
+
+def result_record(result, target):
+    return {
+        "pan": result["pan_direction"],
+        "duration": round(float(result.get("pan_duration", 0.0)), 4),
+        "velocity": result.get("pan_velocity"),  # °/s en modo plan (None con pulsos)
+        "tilt": float(result["tilt_angle"]),
+        "locked": bool(result["target_locked"]),
+        "target": target,
+        "latency": result.get("frame_latency"),  # Temporización de la búsqueda
+        "clock": result.get("time"),  # Reloj del tracker en el frame (replay exacto)
+    }
+
+
+class SessionRecorder:
+    """Grabador con escritor en segundo plano
+
+    Los métodos record_* solo encolan (sin bloquear): si la cola se llena el
+    registro se descarta y se cuenta en dropped. Los frames de un FramePool
+    se retienen y el escritor los libera tras codificar el JPEG.
+    """
+
+    def __init__(self, path, mode=None, class_names=(), meta=None, config=RECORD_CONFIG):
+        self.path = path
+        self.mode = mode or config["mode"]
+        self.config = config
+        self.header = dict(
+            meta or {},
+            version=1,
+            mode=self.mode,
+            started=time.time(),
+            class_names=list(class_names),
+            jpeg_quality=config["jpeg_quality"],
+        )
+
+        self.recorded_frames = 0
+        self.dropped = 0
+        self.events = 0
+        self.bytes_written = 0
+
+        self._queue = queue.Queue(maxsize=config["queue_size"])
+        self._t0 = time.perf_counter()
+        self._last_locked = None
+        self._thread = None
+        self._file = None
+        self._index = []
+        self._chunk = bytearray()
+        self._chunk_count = 0
+        self._chunk_times = None
+        self._chunk_first_frame = None
+        self._chunk_started = 0.0
+
+    # --- lado del loop (no bloqueante) ---
+
+    def _now(self):
+        return time.perf_counter() - self._t0
+
+    def _put(self, item):
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            if item[0] == FRAME and hasattr(item[3], "release"):
+                item[3].release()
+            return False
+
+    def record_frame(self, frame, frame_index, detections=None):
+        """Frame (PooledFrame o array) y la salida cruda del detector"""
+        if hasattr(frame, "retain"):
+            frame.retain()
+        else:
+            frame = frame.copy()
+        self._put((FRAME, frame_index, self._now(), frame, pack_detections(detections)))
+
+    def record_result(self, frame_index, result, target):
+        """Comando de servos derivado del frame; un cambio de enganche es un evento"""
+        record = result_record(result, target)
+        self._put((RESULT, frame_index, self._now(), record))
+        if self._last_locked is not None and record["locked"] != self._last_locked:
+            self.mark_event(frame_index, "enganchado" if record["locked"] else "perdido")
+        self._last_locked = record["locked"]
+
+    def record_command(self, frame_index, command, arg=None):
+        self._put((COMMAND, frame_index, self._now(), {"command": command, "arg": arg}))
+        self.mark_event(frame_index, f"comando {command}")
+
+    def mark_event(self, frame_index, reason):
+        self.events += 1
+        self._put((EVENT, frame_index, self._now(), {"reason": reason}))
+
+    # --- escritor ---
+
+    def start(self):
+        try:
+            self._file = open(self.path, "wb")
+        except Exception as e:
+            print(f"❌ Error creando grabación: {e}")
+            return False
+        header = json.dumps(self.header).encode("utf-8")
+        self._file.write(FILE_MAGIC + struct.pack("<I", len(header)) + header)
+
+        self._thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._thread.start()
+        print(f"⏺️  Grabando sesión en {self.path} (modo {self.mode})")
+        return True
+
+    def _append(self, kind, frame_index, t, data):
+        self._chunk += RECORD_HEADER.pack(kind, frame_index, t, len(data))
+        self._chunk += data
+        self._chunk_count += 1
+        if self._chunk_times is None:
+            self._chunk_times = [t, t]
+            self._chunk_first_frame = frame_index
+            self._chunk_started = time.monotonic()
+        self._chunk_times[0] = min(self._chunk_times[0], t)
+        self._chunk_times[1] = max(self._chunk_times[1], t)
+        self._chunk_first_frame = min(self._chunk_first_frame, frame_index)
+        if kind == FRAME:
+            self.recorded_frames += 1
+
+    def _flush_chunk(self):
+        if not self._chunk_count:
+            return
+        offset = self._file.tell()
+        t_first, t_last = self._chunk_times
+        self._file.write(
+            CHUNK_MAGIC + CHUNK_HEADER.pack(len(self._chunk), self._chunk_count, t_first, t_last)
+        )
+        self._file.write(self._chunk)
+        self._file.flush()
+        self._index.append([offset, self._chunk_count, t_first, t_last, self._chunk_first_frame])
+        self.bytes_written = self._file.tell()
+
+        self._chunk = bytearray()
+        self._chunk_count = 0
+        self._chunk_times = None
+
+    def _write_loop(self):
+        params = [int(cv2.IMWRITE_JPEG_QUALITY), int(self.config["jpeg_quality"])]
+        ring = deque(maxlen=max(1, self.config["pre_event_frames"]))
+        post_remaining = 0
+
+        while True:
+            try:
+                item = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                break
+
+            if item:
+                kind, frame_index, t = item[:3]
+                if kind == FRAME:
+                    frame, packed = item[3], item[4]
+                    array = frame.array if hasattr(frame, "array") else frame
+                    ok, jpeg = cv2.imencode(".jpg", array, params)
+                    if hasattr(frame, "release"):
+                        frame.release()
+
+                    self._append(DETECTIONS, frame_index, t, packed)
+                    if ok:
+                        if self.mode == "frames" or post_remaining > 0:
+                            self._append(FRAME, frame_index, t, jpeg.tobytes())
+                            post_remaining = max(0, post_remaining - 1)
+                        else:
+                            ring.append((frame_index, t, jpeg.tobytes()))
+
+                elif kind == EVENT:
+                    # Volcar los frames previos al evento y grabar los siguientes
+                    while ring:
+                        self._append(FRAME, *ring.popleft())
+                    post_remaining = self.config["post_event_frames"]
+                    self._append(EVENT, frame_index, t, json.dumps(item[3]).encode("utf-8"))
+
+                else:
+                    self._append(kind, frame_index, t, json.dumps(item[3]).encode("utf-8"))
+
+            if self._chunk_count >= self.config["chunk_records"] or (
+                self._chunk_count and time.monotonic() - self._chunk_started > 1.0
+            ):
+                self._flush_chunk()
+
+        self._flush_chunk()
+
+    def close(self):
+        """Vaciar la cola, escribir el índice y cerrar"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+        index_offset = self._file.tell()
+        index = json.dumps(self._index).encode("utf-8")
+        self._file.write(INDEX_MAGIC + struct.pack("<I", len(index)) + index)
+        self._file.write(FOOTER.pack(index_offset) + END_MAGIC)
+        self.bytes_written = self._file.tell()
+        self._file.close()
+        print(
+            f"⏹️  Sesión guardada: {self.recorded_frames} frames, {self.events} eventos, "
+            f"{self.dropped} descartados, {self.bytes_written / 1e6:.1f} MB"
+        )
+
+
+class SessionReader:
+    """Lectura por bloques con acceso aleatorio (por tiempo o por frame)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        if self._file.read(len(FILE_MAGIC)) != FILE_MAGIC:
+            raise ValueError(f"{path} no es una sesión grabada")
+        (size,) = struct.unpack("<I", self._file.read(4))
+        self.header = json.loads(self._file.read(size))
+        self.class_names = self.header.get("class_names", [])
+        self._data_start = self._file.tell()
+        self.complete = False
+        self.index = self._read_index()
+
+    def _read_index(self):
+        tail = len(END_MAGIC) + FOOTER.size
+        self._file.seek(0, os.SEEK_END)
+        if self._file.tell() - self._data_start >= tail:
+            self._file.seek(-tail, os.SEEK_END)
+            footer = self._file.read(tail)
+            if footer.endswith(END_MAGIC):
+                (offset,) = FOOTER.unpack(footer[: FOOTER.size])
+                self._file.seek(offset)
+                if self._file.read(len(INDEX_MAGIC)) == INDEX_MAGIC:
+                    (size,) = struct.unpack("<I", self._file.read(4))
+                    self.complete = True
+                    return json.loads(self._file.read(size))
+        return self._scan_chunks()
+
+    def _scan_chunks(self):
+        """Reconstruir el índice de una sesión cortada (sin footer)"""
+        index = []
+        self._file.seek(self._data_start)
+        while True:
+            offset = self._file.tell()
+            head = self._file.read(len(CHUNK_MAGIC) + CHUNK_HEADER.size)
+            if len(head) < len(CHUNK_MAGIC) + CHUNK_HEADER.size or not head.startswith(CHUNK_MAGIC):
+                break
+            size, count, t_first, t_last = CHUNK_HEADER.unpack(head[len(CHUNK_MAGIC):])
+            payload = self._file.read(size)
+            if len(payload) < size:
+                break
+            first_frame = min(
+                RECORD_HEADER.unpack_from(payload, pos)[1]
+                for pos in self._record_offsets(payload)
+            )
+            index.append([offset, count, t_first, t_last, first_frame])
+        return index
+
+    @staticmethod
+    def _record_offsets(payload):
+        pos = 0
+        while pos < len(payload):
+            yield pos
+            pos += RECORD_HEADER.size + RECORD_HEADER.unpack_from(payload, pos)[3]
+
+    @property
+    def duration(self):
+        return self.index[-1][3] if self.index else 0.0
+
+    def read_chunk(self, i):
+        """Registros del bloque i: [(tipo, frame, t, datos), ...]"""
+        offset = self.index[i][0]
+        self._file.seek(offset + len(CHUNK_MAGIC))
+        size = CHUNK_HEADER.unpack(self._file.read(CHUNK_HEADER.size))[0]
+        payload = self._file.read(size)
+        records = []
+        for pos in self._record_offsets(payload):
+            kind, frame_index, t, length = RECORD_HEADER.unpack_from(payload, pos)
+            start = pos + RECORD_HEADER.size
+            records.append((kind, frame_index, t, payload[start : start + length]))
+        return records
+
+    def chunk_at_time(self, t):
+        """Primer bloque que contiene registros en o después de t"""
+        for i, entry in enumerate(self.index):
+            if entry[3] >= t:
+                return i
+        return len(self.index)
+
+    def records(self, start_time=0.0):
+        """Todos los registros desde start_time (lee solo los bloques necesarios)"""
+        for i in range(self.chunk_at_time(start_time), len(self.index)):
+            for record in self.read_chunk(i):
+                if record[2] >= start_time:
+                    yield record
+
+    def load_timeline(self, start_time=0.0):
+        """Reagrupar por frame: {frame: {"t", "detections", "result", "jpeg", "commands"}}"""
+        timeline = {}
+        for kind, frame_index, t, data in self.records(start_time):
+            entry = timeline.setdefault(frame_index, {"t": t, "commands": []})
+            if kind == DETECTIONS:
+                entry["t"] = t
+                entry["detections"] = data
+            elif kind == FRAME:
+                entry["jpeg"] = data
+            elif kind == RESULT:
+                entry["result"] = json.loads(data)
+            elif kind == COMMAND:
+                entry["commands"].append(json.loads(data))
+        return timeline
+
+    def close(self):
+        self._file.close()
+
+
+class SessionDetector(DetectorBackend):
+    """Backend de replay: entrega las detecciones grabadas del frame actual"""
+
+    name = "session"
+
+    def __init__(self, class_names):
+        super().__init__()
+        self.class_names = list(class_names)
+        self.current = empty_detections()
+        self.loaded = True
+
+    def load(self):
+        pass
+
+    def warmup(self, shape=None, runs=None):
+        pass
+
+    def infer(self, image):
+        return self.current
+
+
+def apply_command(tracker, command, arg):
+    """Mismo efecto sobre el tracker que handle_command en main.py"""
+    if command == "target":
+        tracker.set_target_person(arg)
+    elif command == "reset":
+        tracker.reset()
+    elif command == "center":
+        tracker.reset()
+        tracker.current_tilt = 130
+
+
+def replay_session(path, speed="max", redetect=False, show=False, start_time=0.0):
+    """Pasar las entradas grabadas por FaceTracker.process_frame
+
+    Con las detecciones grabadas el resultado debe coincidir con el grabado
+    frame a frame (se reportan las diferencias). Con redetect=True se usa el
+    detector real sobre los JPEG grabados (solo frames disponibles).
+    """
+    from face_tracker import FaceTracker
+
+    reader = SessionReader(path)
+    header = reader.header
+    if not reader.complete:
+        print("⚠️  Sesión sin índice (cortada): índice reconstruido")
+
+    detector = None if redetect else SessionDetector(reader.class_names)
+    tracker = FaceTracker(load_model=redetect, detector=detector)
+    tracker.set_target_person(header.get("target"))
+    now = [0.0]
+    tracker.clock = lambda: now[0]  # Tiempos de la grabación (histéresis y espera)
+    tracker.current_tilt = header.get("tilt", tracker.current_tilt)
+    blank = np.zeros((header.get("height", 480), header.get("width", 640), 3), dtype=np.uint8)
+
+    timeline = reader.load_timeline(start_time)
+    replayed = mismatches = 0
+    first_mismatch = None
+    wall_start = time.perf_counter()
+    t_start = None
+
+    for frame_index in sorted(timeline):
+        entry = timeline[frame_index]
+        jpeg = entry.get("jpeg")
+        playable = jpeg is not None if redetect else "detections" in entry
+
+        if playable:
+            if speed == "realtime":
+                t_start = entry["t"] if t_start is None else t_start
+                delay = (entry["t"] - t_start) - (time.perf_counter() - wall_start)
+                if delay > 0:
+                    time.sleep(delay)
+
+            now[0] = entry["t"]
+            frame = blank
+            if jpeg is not None:
+                frame = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if detector is not None:
+                detector.current = unpack_detections(entry.get("detections", b""), reader.class_names)
+
+            # Reloj y latencia del tracker tal como estaban al grabar
+            recorded = entry.get("result")
+            if recorded and recorded.get("clock") is not None:
+                now[0] = recorded["clock"]
+            tracker.frame_latency = recorded.get("latency") if recorded else None
+
+            result = tracker.process_frame(frame, frame_index)
+            replayed += 1
+
+            if recorded is not None:
+                got = result_record(result, tracker.target_person)
+                if (
+                    got["pan"] != recorded["pan"]
+                    or abs(got["duration"] - recorded.get("duration", got["duration"])) > 1e-3
+                    or got["velocity"] != recorded.get("velocity", got["velocity"])
+                    or got["locked"] != recorded["locked"]
+                    or abs(got["tilt"] - recorded["tilt"]) > 1e-3
+                ):
+                    mismatches += 1
+                    if first_mismatch is None:
+                        first_mismatch = (frame_index, recorded, got)
+
+            if show and jpeg is not None:
+                annotated = tracker.draw_annotations(frame, result, 0.0)
+                cv2.imshow("Replay", annotated)
+                if cv2.waitKey(1) & 0xFF == ord("q"):
+                    break
+
+        for command in entry["commands"]:
+            apply_command(tracker, command["command"], command["arg"])
+
+    elapsed = time.perf_counter() - wall_start
+    reader.close()
+    if show:
+        cv2.destroyAllWindows()
+
+    print(
+        f"🔁 Replay: {replayed} frames en {elapsed:.2f}s "
+        f"({replayed / elapsed if elapsed else 0:.0f} frames/s) | "
+        f"diferencias con lo grabado: {mismatches}"
+    )
+    if first_mismatch:
+        frame_index, recorded, got = first_mismatch
+        print(f"   Primera diferencia en frame {frame_index}: grabado {recorded} | replay {got}")
+    return {"frames": replayed, "mismatches": mismatches, "elapsed_s": elapsed}
+
+
+def print_info(path):
+    reader = SessionReader(path)
+    counts = {}
+    for kind, _, _, _ in reader.records():
+        counts[RECORD_NAMES.get(kind, kind)] = counts.get(RECORD_NAMES.get(kind, kind), 0) + 1
+    print(f"📼 {path}")
+    print(f"   Modo: {reader.header.get('mode')} | Duración: {reader.duration:.1f}s | "
+          f"Bloques: {len(reader.index)} | Índice: {'sí' if reader.complete else 'reconstruido'}")
+    print(f"   Clases: {', '.join(reader.class_names) or '-'} | Objetivo inicial: {reader.header.get('target')}")
+    print("   Registros: " + ", ".join(f"{name} {n}" for name, n in counts.items()))
+    reader.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sesiones grabadas")
+    sub = parser.add_subparsers(dest="action", required=True)
+    info = sub.add_parser("info", help="Resumen de una sesión")
+    info.add_argument("path")
+    replay = sub.add_parser("replay", help="Reproducir por FaceTracker.process_frame")
+    replay.add_argument("path")
+    replay.add_argument("--speed", choices=("max", "realtime"), default="max")
+    replay.add_argument("--redetect", action="store_true", help="Detector real sobre los JPEG")
+    replay.add_argument("--show", action="store_true", help="Ventana con los frames anotados")
+    replay.add_argument("--start", type=float, default=0.0, help="Segundo desde el que empezar")
+    args = parser.parse_args()
+
+    if args.action == "info":
+        print_info(args.path)
+    else:
+        replay_session(args.path, args.speed, args.redetect, args.show, args.start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# cSpell: disable
+# pylint: disable=all
+# ruff: noqa
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class StartupReport:
+    """Ejecuta las fases de arranque en paralelo y mide cada una
+
+    Cada fase es una función sin argumentos; su resultado (o la excepción
+    que lanzó) queda guardado por nombre. mark() registra hitos como el
+    primer frame procesado.
+    """
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.phases = {}  # nombre -> (inicio, fin, ok)
+        self.marks = {}
+        self.results = {}
+        self.errors = {}
+
+    def _run(self, name, func):
+        start = time.perf_counter()
+        try:
+            self.results[name] = func()
+            ok = True
+        except Exception as e:
+            self.errors[name] = e
+            self.results[name] = None
+            ok = False
+        self.phases[name] = (start - self.t0, time.perf_counter() - self.t0, ok)
+        return self.results[name]
+
+    def run_parallel(self, phases):
+        """Ejecutar {nombre: función} en hilos y esperar a que terminen todas"""
+        with ThreadPoolExecutor(max_workers=len(phases)) as pool:
+            futures = [pool.submit(self._run, name, func) for name, func in phases.items()]
+            for future in futures:
+                future.result()
+        return self.results
+
+    def run(self, name, func):
+        """Ejecutar una fase secuencial (también queda en el reporte)"""
+        return self._run(name, func)
+
+    def mark(self, name):
+        """Registrar un hito (solo la primera vez)"""
+        if name not in self.marks:
+            self.marks[name] = time.perf_counter() - self.t0
+
+    def print_report(self):
+        """Mostrar tiempos por fase"""
+        print("\n" + "=" * 60)
+        print("⏱️  TIEMPOS DE ARRANQUE")
+        print("=" * 60)
+        serial_total = 0.0
+        for name, (start, end, ok) in sorted(self.phases.items(), key=lambda p: p[1][0]):
+            serial_total += end - start
+            status = "✅" if ok else "❌"
+            print(f"  {status} {name:<12} {end - start:6.2f}s  ({start:5.2f}s → {end:5.2f}s)")
+            if name in self.errors:
+                print(f"       {self.errors[name]}")
+        for name, at in self.marks.items():
+            print(f"  ⏩ {name:<12} en {at:6.2f}s")
+        print(f"  Suma de fases (secuencial): {serial_total:.2f}s")
+        print("=" * 60 + "\n")
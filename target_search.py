@@ -0,0 +1,115 @@
+# cSpell: disable
+# pylint: disable=all
+# ruff: noqa
+
+"""
+Búsqueda del objetivo perdido
+
+Estados: tracking -> grace (quieto un momento: suele reaparecer solo) ->
+return (pan hacia donde se lo vio por última vez, adelantado según su
+velocidad) -> sweep (barrido acotado alrededor de ese rumbo, empezando por
+el lado por donde se fue) -> idle (se rinde y espera quieto).
+
+Los rumbos son del mundo (pan_heading.PanHeading). Después de cada pulso se
+espera a que llegue el comando, termine el giro y el detector procese un
+frame ya quieto: así ningún frame se pierde en imágenes movidas.
+"""
+
+from config import SEARCH_CONFIG
+
+
+class TargetSearch:
+    def __init__(self, heading, config=SEARCH_CONFIG):
+        self.heading = heading  # PanHeading del tracker
+        self.config = config
+        self.searches = 0
+        self.reacquired = 0
+        self.given_up = 0
+        self.reset()
+
+    def reset(self):
+        """Olvidar al objetivo (p.ej. al cambiarlo)"""
+        self.state = "tracking"
+        self.lost_since = None
+        self.last_heading = None  # Rumbo del mundo donde se lo vio por última vez
+        self.velocity = 0.0  # °/s de ese rumbo
+        self._last_seen = None
+        self._waypoints = []
+        self._next_pulse = 0.0
+
+    def seen(self, face_heading, now):
+        """Objetivo visible en face_heading; retorna el tiempo de re-adquisición o None"""
+        reacquired = None
+        if self.state == "tracking" and self._last_seen is not None:
+            dt = now - self._last_seen
+            if dt > 0:
+                velocity = (face_heading - self.last_heading) / dt
+                self.velocity += self.config["velocity_smoothing"] * (velocity - self.velocity)
+        else:
+            if self.state in ("grace", "return", "sweep"):
+                reacquired = now - self.lost_since
+                self.reacquired += 1
+            self.velocity = 0.0
+
+        self.state = "tracking"
+        self.lost_since = None
+        self.last_heading = face_heading
+        self._last_seen = now
+        self._waypoints = []
+        return reacquired
+
+    def update(self, now, frame_latency):
+        """Sin objetivo en este frame: (dirección, duración) del pulso de búsqueda
+
+        frame_latency: s entre capturar un frame y tener su detección.
+        """
+        config = self.config
+        if self.last_heading is None or self.state == "idle":
+            return "stop", 0.0
+
+        if self.state == "tracking":
+            self.state = "grace"
+            self.lost_since = now
+            self.searches += 1
+            self._next_pulse = now + config["grace_time"]
+            return "stop", 0.0
+
+        if now < self._next_pulse:
+            return "stop", 0.0
+
+        if self.state == "grace":
+            # Adonde iba: último rumbo visto más su velocidad
+            center = self.last_heading + self.velocity * config["velocity_lookahead"]
+            side = 1.0 if (center - self.heading.heading or self.velocity or 1.0) > 0 else -1.0
+            self._waypoints = [center] + self._sweep(center, side)
+            self.state = "return"
+
+        # Llegado a un punto (dentro de lo que mueve el pulso mínimo): siguiente
+        while self._waypoints and abs(self._waypoints[0] - self.heading.heading) < config["arrive_tolerance"]:
+            self._waypoints.pop(0)
+            self.state = "sweep"
+        if not self._waypoints:
+            self.state = "idle"
+            self.given_up += 1
+            return "stop", 0.0
+
+        direction, duration = self.heading.pulse_towards(self._waypoints[0], config["max_pulse"])
+        duration = max(duration, config["min_pulse"])
+        # Llegada del comando + giro + un frame quieto capturado y detectado
+        self._next_pulse = now + config["command_latency"] + duration + 2 * frame_latency
+        return direction, duration
+
+    def _sweep(self, center, side):
+        """Rumbos del barrido: primero hacia side hasta width, luego al otro lado"""
+        config = self.config
+        step = config["sweep_step"]
+        width = config["sweep_width"]
+        offsets = []
+        offset = step
+        while offset < width:
+            offsets.append(offset)
+            offset += step
+        offsets.append(width)
+
+        one = [center + side * o for o in offsets] + [center - side * o for o in offsets] + [center]
+        return one * config["max_sweeps"]
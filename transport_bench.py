@@ -0,0 +1,217 @@
+# cSpell: disable
+# pylint: disable=all
+# ruff: noqa
+
+"""
+Latencia de los transportes de comandos en localhost (MQTT local vs UDP)
+
+Envía la misma secuencia de comandos con MQTTSender por cada transporte a
+un ESP32 simulado en el mismo proceso, que responde el ack como el
+firmware: por el topic de ack (MQTT, a través de LocalBroker) o al puerto
+de origen (UDP). Mide la latencia del comando (envío -> recepción en el
+"ESP32") y la ida y vuelta (envío -> ack), con percentiles y perdidos.
+
+    python transport_bench.py
+    python transport_bench.py --count 2000 --rate 200 --output transportes.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import socket
+import sys
+import threading
+import time
+
+from command_transport import TRANSPORTS, UDP_HEADER, UDPTransport
+from local_broker import LocalBroker
+from mqtt_sender import MQTTSender
+from perf_stats import LatencyHistogram
+
+TOPIC = "bench/servo"
+
+
+class TimedSender(MQTTSender):
+    """MQTTSender que anota cuándo llega el ack de cada seq"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ack_times = {}  # seq -> ns
+
+    def _on_ack(self, payload):
+        now = time.perf_counter_ns()
+        super()._on_ack(payload)
+        seq = (self.last_ack or {}).get("seq")
+        if seq is not None:
+            self.ack_times[seq] = now
+
+
+class FakeESP32:
+    """Recibe comandos y responde el ack con su seq (sin mover servos)"""
+
+    def __init__(self):
+        self.received = {}  # seq -> ns de llegada
+        self.running = True
+
+    def _receive(self, payload):
+        now = time.perf_counter_ns()
+        data = json.loads(payload)
+        self.received[data.get("seq")] = now
+        return json.dumps({"seq": data.get("seq"), "pan": 0.0, "moving": False})
+
+
+class FakeMQTTESP32(FakeESP32):
+    def __init__(self, port):
+        super().__init__()
+        import paho.mqtt.client as mqtt
+
+        self._connected = threading.Event()
+        self.client = mqtt.Client()
+        self.client.on_connect = lambda client, userdata, flags, rc: (
+            client.subscribe(TOPIC),
+            self._connected.set(),
+        )
+        self.client.on_message = self._on_message
+        self.client.connect("127.0.0.1", port, 60)
+        self.client.loop_start()
+        self._connected.wait(timeout=5)
+        time.sleep(0.1)  # Que llegue el SUBSCRIBE antes del primer comando
+
+    def _on_message(self, client, userdata, msg):
+        client.publish(TOPIC + "/ack", self._receive(msg.payload))
+
+    def close(self):
+        self.client.loop_stop()
+        self.client.disconnect()
+
+
+class FakeUDPESP32(FakeESP32):
+    def __init__(self):
+        super().__init__()
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.settimeout(0.2)
+        self.port = self.sock.getsockname()[1]
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def _loop(self):
+        while self.running:
+            try:
+                data, address = self.sock.recvfrom(2048)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            ack = self._receive(data[UDP_HEADER.size :])
+            self.sock.sendto(ack.encode("utf-8"), address)
+
+    def close(self):
+        self.running = False
+        self.sock.close()
+
+
+def _summary(histogram, expected):
+    ms = 1e6
+    return {
+        "count": histogram.count,
+        "lost": expected - histogram.count,
+        "p50_ms": histogram.percentile(50) / ms,
+        "p90_ms": histogram.percentile(90) / ms,
+        "p99_ms": histogram.percentile(99) / ms,
+        "max_ms": histogram.max_ns / ms,
+        "mean_ms": histogram.mean() / ms,
+    }
+
+
+def measure(name, count=500, rate=100.0, settle=0.5):
+    """Enviar count comandos a rate por segundo por el transporte name"""
+    broker = None
+    if name == "mqtt":
+        broker = LocalBroker().start()
+        esp32 = FakeMQTTESP32(broker.port)
+        sender = TimedSender(broker="127.0.0.1", port=broker.port, topic=TOPIC, transport="mqtt")
+    else:
+        esp32 = FakeUDPESP32()
+        sender = TimedSender(topic=TOPIC, transport=UDPTransport("127.0.0.1", esp32.port))
+
+    try:
+        if not sender.connect():
+            raise RuntimeError(f"No se pudo conectar por {name}")
+
+        sent = {}
+        period = 1.0 / rate
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):  # Sin el debug cada 50 mensajes
+            for seq in range(1, count + 1):
+                # Ritmo fijo (sin acumular el retraso de cada envío)
+                delay = start + (seq - 1) * period - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                sent[seq] = time.perf_counter_ns()
+                sender.send_servo_command("left", 130, 0.05, update_tilt=False, seq=seq)
+        time.sleep(settle)  # Acks en vuelo
+
+        command = LatencyHistogram()
+        round_trip = LatencyHistogram()
+        for seq, t in sent.items():
+            if seq in esp32.received:
+                command.record(esp32.received[seq] - t)
+            if seq in sender.ack_times:
+                round_trip.record(sender.ack_times[seq] - t)
+        return {
+            "transport": name,
+            "count": count,
+            "rate": rate,
+            "command": _summary(command, count),
+            "round_trip": _summary(round_trip, count),
+        }
+    finally:
+        sender.close()
+        esp32.close()
+        if broker is not None:
+            broker.stop()
+
+
+def print_report(report):
+    print(f"📡 {report['transport'].upper()}: {report['count']} comandos a {report['rate']:g}/s")
+    print(f"  {'':<11} {'p50':>8} {'p90':>8} {'p99':>8} {'máx':>8} {'media':>8}  (ms) perdidos")
+    for key, label in (("command", "comando"), ("round_trip", "ida+vuelta")):
+        s = report[key]
+        print(f"  {label:<11} {s['p50_ms']:>8.3f} {s['p90_ms']:>8.3f} {s['p99_ms']:>8.3f} "
+              f"{s['max_ms']:>8.3f} {s['mean_ms']:>8.3f}  {s['lost']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Latencia de MQTT local vs UDP en localhost")
+    parser.add_argument("--transports", default=",".join(TRANSPORTS), help="Separados por coma")
+    parser.add_argument("--count", type=int, default=500, help="Comandos por transporte")
+    parser.add_argument("--rate", type=float, default=100.0, help="Comandos por segundo")
+    parser.add_argument("--output", help="Guardar los reportes en JSON")
+    args = parser.parse_args(argv)
+
+    names = [n.strip() for n in args.transports.split(",") if n.strip()]
+    for name in names:
+        if name not in TRANSPORTS:
+            parser.error(f"Transporte desconocido: {name}")
+
+    reports = []
+    for name in names:
+        report = measure(name, args.count, args.rate)
+        print_report(report)
+        reports.append(report)
+
+    if len(reports) > 1:
+        base, other = reports[0], reports[1]
+        ratio = base["round_trip"]["p50_ms"] / max(other["round_trip"]["p50_ms"], 1e-6)
+        print(f"⚖️  ida+vuelta p50: {base['transport']} / {other['transport']} = {ratio:.1f}x")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2)
+        print(f"💾 Reportes guardados en {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
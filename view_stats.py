@@ -5,93 +5,258 @@
 """
 Script para visualizar estadísticas del log de detecciones
 Ejecutar: python view_stats.py
+          python view_stats.py "logs/*/detections_log.txt*" --json stats.json
+          python view_stats.py caja1=logs/caja1/*.txt* caja2=logs/caja2/*.txt* --csv -
 """
 
+import argparse
+import csv
+import glob
+import json
+import os
 import re
-from collections import defaultdict
-from datetime import datetime
+import sys
+from concurrent.futures import ProcessPoolExecutor
 
+from person_registry import default_registry
 
-def analyze_log(log_file="detections_log.txt"):
-    """Analizar el archivo de log y mostrar estadísticas"""
+PERSON_PATTERN = re.compile(r"Persona #\d+: (\S+) - (\d+\.\d+)%")
+TARGET_NEW_PATTERN = re.compile(r"Nuevo objetivo: (\S+)")
 
-    try:
-        with open(log_file, "r", encoding="utf-8") as f:
-            content = f.read()
-    except FileNotFoundError:
-        print(f"❌ No se encontró el archivo {log_file}")
-        print("💡 Ejecuta el sistema primero para generar el log")
-        return
+# Personas que siempre aparecen en el reporte de consola (aunque no se detecten),
+# en minúsculas como las cuenta parse_segment
+DEFAULT_PEOPLE = tuple(dict.fromkeys(name.lower() for name in default_registry().names))
 
-    # Extraer todas las detecciones
-    tuta_detections = re.findall(r"TUTA - (\d+\.\d+)%", content)
-    laura_detections = re.findall(r"LAURA - (\d+\.\d+)%", content)
+# Tamaño de segmento para repartir archivos grandes entre procesos
+CHUNK_BYTES = 4 * 1024 * 1024
+HISTOGRAM_BINS = 101  # Un bin por punto porcentual (0..100)
 
-    # Convertir a float
-    tuta_confidences = [float(x) for x in tuta_detections]
-    laura_confidences = [float(x) for x in laura_detections]
 
-    print("\n" + "=" * 70)
-    print("📊 ESTADÍSTICAS DE DETECCIÓN")
-    print("=" * 70)
+# ======================= AGREGADOS PARCIALES =======================
+def new_stats():
+    """Agregado vacío (mezclable de forma exacta)"""
+    return {"files": 0, "bytes": 0, "people": {}, "target_changes": []}
 
-    # Estadísticas de TUTA
-    if tuta_confidences:
-        print(f"\n👤 TUTA:")
-        print(f"   Total detecciones: {len(tuta_confidences)}")
-        print(
-            f"   Confianza promedio: {sum(tuta_confidences)/len(tuta_confidences):.2f}%"
-        )
-        print(f"   Confianza máxima: {max(tuta_confidences):.2f}%")
-        print(f"   Confianza mínima: {min(tuta_confidences):.2f}%")
 
-        # Contar detecciones por rango de confianza
-        high_conf = sum(1 for x in tuta_confidences if x >= 90)
-        med_conf = sum(1 for x in tuta_confidences if 70 <= x < 90)
-        low_conf = sum(1 for x in tuta_confidences if x < 70)
+def _new_person():
+    # Las confianzas se guardan en centésimas de punto (enteros) para que
+    # sumas y promedios no dependan del orden de mezcla
+    return {
+        "count": 0,
+        "sum_centi": 0,
+        "min_centi": None,
+        "max_centi": None,
+        "histogram": [0] * HISTOGRAM_BINS,
+    }
 
-        print(f"\n   Distribución:")
-        print(
-            f"   ✅ Alta (≥90%): {high_conf} ({high_conf/len(tuta_confidences)*100:.1f}%)"
-        )
-        print(
-            f"   ⚠️  Media (70-89%): {med_conf} ({med_conf/len(tuta_confidences)*100:.1f}%)"
-        )
-        print(
-            f"   ❌ Baja (<70%): {low_conf} ({low_conf/len(tuta_confidences)*100:.1f}%)"
-        )
+
+def _add_confidence(person, centi):
+    person["count"] += 1
+    person["sum_centi"] += centi
+    if person["min_centi"] is None or centi < person["min_centi"]:
+        person["min_centi"] = centi
+    if person["max_centi"] is None or centi > person["max_centi"]:
+        person["max_centi"] = centi
+    person["histogram"][min(centi // 100, HISTOGRAM_BINS - 1)] += 1
+
+
+def merge_stats(total, partial):
+    """Mezclar un agregado parcial dentro de total (in place)"""
+    total["files"] += partial["files"]
+    total["bytes"] += partial["bytes"]
+
+    for name, src in partial["people"].items():
+        dst = total["people"].setdefault(name, _new_person())
+        dst["count"] += src["count"]
+        dst["sum_centi"] += src["sum_centi"]
+        for key, pick in (("min_centi", min), ("max_centi", max)):
+            if src[key] is not None:
+                dst[key] = src[key] if dst[key] is None else pick(dst[key], src[key])
+        dst["histogram"] = [a + b for a, b in zip(dst["histogram"], src["histogram"])]
+
+    total["target_changes"].extend(partial["target_changes"])
+    return total
+
+
+# ======================= LECTURA EN PARALELO =======================
+def parse_segment(segment):
+    """Analizar un rango de bytes [start, end) de un archivo de log"""
+    path, start, end = segment
+    stats = new_stats()
+
+    with open(path, "rb") as f:
+        f.seek(start)
+        raw = f.read(end - start)
+
+    stats["bytes"] = len(raw)
+    stats["files"] = 1 if start == 0 else 0
+
+    pending_change = False
+    for line in raw.decode("utf-8", errors="replace").splitlines():
+        match = PERSON_PATTERN.search(line)
+        if match:
+            name = match.group(1).lower()
+            centi = int(round(float(match.group(2)) * 100))
+            _add_confidence(stats["people"].setdefault(name, _new_person()), centi)
+            continue
+
+        if "CAMBIO DE OBJETIVO" in line:
+            pending_change = True
+            continue
+
+        if pending_change:
+            match = TARGET_NEW_PATTERN.search(line)
+            stats["target_changes"].append(match.group(1) if match else "NINGUNO")
+            pending_change = False
+
+    return stats
+
+
+def plan_segments(path, chunk_bytes=CHUNK_BYTES):
+    """Dividir un archivo en segmentos alineados al inicio de un registro ("\\n[")"""
+    size = os.path.getsize(path)
+    if size <= chunk_bytes:
+        return [(path, 0, size)]
+
+    boundaries = [0]
+    with open(path, "rb") as f:
+        offset = chunk_bytes
+        while offset < size:
+            f.seek(offset)
+            window = b""
+            found = -1
+            # Buscar el siguiente inicio de registro a partir de offset
+            while found < 0 and offset + len(window) < size:
+                window += f.read(64 * 1024)
+                found = window.find(b"\n[")
+            if found < 0:
+                break
+            boundary = offset + found + 1
+            if boundary > boundaries[-1]:
+                boundaries.append(boundary)
+            offset = boundary + chunk_bytes
+
+    boundaries.append(size)
+    return [(path, a, b) for a, b in zip(boundaries, boundaries[1:]) if b > a]
+
+
+def resolve_inputs(patterns, host_from="dir"):
+    """Expandir globs y asignar cada archivo a un host"""
+    inputs = []
+    seen = set()
+
+    for pattern in patterns:
+        host = None
+        if "=" in pattern and not os.path.exists(pattern):
+            host, pattern = pattern.split("=", 1)
+
+        for path in sorted(glob.glob(pattern)) or []:
+            if not os.path.isfile(path) or path in seen:
+                continue
+            seen.add(path)
+
+            if host is not None:
+                file_host = host
+            elif host_from == "stem":
+                file_host = os.path.basename(path).split("_")[0].split(".")[0]
+            else:
+                file_host = os.path.basename(os.path.dirname(os.path.abspath(path)))
+
+            inputs.append((file_host, path))
+
+    return inputs
+
+
+def analyze_logs(patterns, workers=None, host_from="dir", chunk_bytes=CHUNK_BYTES):
+    """Analizar varios archivos en un pool de procesos
+
+    Retorna (por_host, combinado) con agregados exactos.
+    """
+    inputs = resolve_inputs(patterns, host_from)
+    if not inputs:
+        return None, None
+
+    segments = []
+    owners = []
+    for host, path in inputs:
+        for segment in plan_segments(path, chunk_bytes):
+            segments.append(segment)
+            owners.append(host)
+
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(segments) == 1:
+        partials = [parse_segment(s) for s in segments]
     else:
-        print(f"\n👤 TUTA: No detectado")
+        with ProcessPoolExecutor(max_workers=min(workers, len(segments))) as pool:
+            # map conserva el orden, así los cambios de objetivo quedan en orden
+            partials = list(pool.map(parse_segment, segments, chunksize=1))
 
-    # Estadísticas de LAURA
-    if laura_confidences:
-        print(f"\n👤 LAURA:")
-        print(f"   Total detecciones: {len(laura_confidences)}")
-        print(
-            f"   Confianza promedio: {sum(laura_confidences)/len(laura_confidences):.2f}%"
-        )
-        print(f"   Confianza máxima: {max(laura_confidences):.2f}%")
-        print(f"   Confianza mínima: {min(laura_confidences):.2f}%")
+    per_host = {}
+    combined = new_stats()
+    for host, partial in zip(owners, partials):
+        merge_stats(per_host.setdefault(host, new_stats()), partial)
+        merge_stats(combined, partial)
+
+    return per_host, combined
+
+
+# ======================= REPORTES =======================
+def summarize(stats):
+    """Resumen legible (y serializable) de un agregado"""
+    people = {}
+    for name, person in sorted(stats["people"].items()):
+        count = person["count"]
+        hist = person["histogram"]
+        people[name] = {
+            "count": count,
+            "mean": person["sum_centi"] / count / 100 if count else 0.0,
+            "min": person["min_centi"] / 100 if count else None,
+            "max": person["max_centi"] / 100 if count else None,
+            "high": sum(hist[90:]),
+            "medium": sum(hist[70:90]),
+            "low": sum(hist[:70]),
+            "histogram": hist,
+        }
+
+    return {
+        "files": stats["files"],
+        "bytes": stats["bytes"],
+        "people": people,
+        "target_changes": list(stats["target_changes"]),
+    }
+
+
+def print_report(summary, title="📊 ESTADÍSTICAS DE DETECCIÓN"):
+    """Mostrar resumen en consola"""
+    print("\n" + "=" * 70)
+    print(title)
+    print("=" * 70)
+
+    names = list(DEFAULT_PEOPLE) + [
+        n for n in summary["people"] if n not in DEFAULT_PEOPLE
+    ]
+
+    for name in names:
+        person = summary["people"].get(name)
+        if not person or not person["count"]:
+            print(f"\n👤 {name.upper()}: No detectado")
+            continue
 
-        high_conf = sum(1 for x in laura_confidences if x >= 90)
-        med_conf = sum(1 for x in laura_confidences if 70 <= x < 90)
-        low_conf = sum(1 for x in laura_confidences if x < 70)
+        count = person["count"]
+        print(f"\n👤 {name.upper()}:")
+        print(f"   Total detecciones: {count}")
+        print(f"   Confianza promedio: {person['mean']:.2f}%")
+        print(f"   Confianza máxima: {person['max']:.2f}%")
+        print(f"   Confianza mínima: {person['min']:.2f}%")
 
         print(f"\n   Distribución:")
+        print(f"   ✅ Alta (≥90%): {person['high']} ({person['high']/count*100:.1f}%)")
         print(
-            f"   ✅ Alta (≥90%): {high_conf} ({high_conf/len(laura_confidences)*100:.1f}%)"
+            f"   ⚠️  Media (70-89%): {person['medium']} ({person['medium']/count*100:.1f}%)"
         )
-        print(
-            f"   ⚠️  Media (70-89%): {med_conf} ({med_conf/len(laura_confidences)*100:.1f}%)"
-        )
-        print(
-            f"   ❌ Baja (<70%): {low_conf} ({low_conf/len(laura_confidences)*100:.1f}%)"
-        )
-    else:
-        print(f"\n👤 LAURA: No detectado")
+        print(f"   ❌ Baja (<70%): {person['low']} ({person['low']/count*100:.1f}%)")
 
-    # Cambios de objetivo
-    target_changes = re.findall(r"CAMBIO DE OBJETIVO.*?Nuevo objetivo: (\w+)", content)
+    target_changes = summary["target_changes"]
     if target_changes:
         print(f"\n🎯 Cambios de objetivo: {len(target_changes)}")
         for i, target in enumerate(target_changes, 1):
@@ -100,5 +265,103 @@ def analyze_log(log_file="detections_log.txt"):
     print("\n" + "=" * 70)
 
 
+def _open_output(path):
+    if path == "-":
+        return sys.stdout, False
+    return open(path, "w", encoding="utf-8", newline=""), True
+
+
+def write_json(path, per_host, combined):
+    """Exportar reporte por host y combinado en JSON"""
+    data = {
+        "hosts": {host: summarize(stats) for host, stats in per_host.items()},
+        "combined": summarize(combined),
+    }
+    f, close = _open_output(path)
+    try:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    finally:
+        if close:
+            f.close()
+
+
+def write_csv(path, per_host, combined):
+    """Exportar una fila por (host, persona) en CSV; host "*" es el combinado"""
+    rows = [(host, summarize(stats)) for host, stats in per_host.items()]
+    rows.append(("*", summarize(combined)))
+
+    f, close = _open_output(path)
+    try:
+        writer = csv.writer(f)
+        writer.writerow(
+            ["host", "person", "count", "mean", "min", "max", "high", "medium", "low"]
+        )
+        for host, summary in rows:
+            for name, p in summary["people"].items():
+                writer.writerow(
+                    [
+                        host,
+                        name,
+                        p["count"],
+                        f"{p['mean']:.4f}",
+                        p["min"],
+                        p["max"],
+                        p["high"],
+                        p["medium"],
+                        p["low"],
+                    ]
+                )
+    finally:
+        if close:
+            f.close()
+
+
+def analyze_log(log_file="detections_log.txt"):
+    """Analizar el archivo de log y mostrar estadísticas"""
+    per_host, combined = analyze_logs([log_file], workers=1)
+    if combined is None:
+        print(f"❌ No se encontró el archivo {log_file}")
+        print("💡 Ejecuta el sistema primero para generar el log")
+        return
+
+    print_report(summarize(combined))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Estadísticas de detecciones")
+    parser.add_argument(
+        "inputs",
+        nargs="*",
+        default=["detections_log.txt"],
+        help="Archivos o globs (opcional host=glob)",
+    )
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--host-from", choices=("dir", "stem"), default="dir")
+    parser.add_argument("--json", dest="json_path", help="Ruta JSON ('-' = stdout)")
+    parser.add_argument("--csv", dest="csv_path", help="Ruta CSV ('-' = stdout)")
+    parser.add_argument("--quiet", action="store_true", help="Sin reporte de consola")
+    args = parser.parse_args(argv)
+
+    per_host, combined = analyze_logs(args.inputs, args.workers, args.host_from)
+    if combined is None:
+        print(f"❌ No se encontraron logs: {' '.join(args.inputs)}")
+        print("💡 Ejecuta el sistema primero para generar el log")
+        return 1
+
+    if not args.quiet:
+        if len(per_host) > 1:
+            for host, stats in per_host.items():
+                print_report(summarize(stats), f"📊 HOST: {host}")
+        print_report(summarize(combined))
+
+    if args.json_path:
+        write_json(args.json_path, per_host, combined)
+    if args.csv_path:
+        write_csv(args.csv_path, per_host, combined)
+
+    return 0
+
+
 if __name__ == "__main__":
-    analyze_log()
+    sys.exit(main())